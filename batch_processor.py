@@ -0,0 +1,374 @@
+"""Headless batch processing of recorded video files"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List
+import cv2
+import config
+from calibration import get_calibration
+from clock import VideoClock
+from data_logger import get_speed_limit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def box_iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+_detector = None  # Kept warm across the tasks a worker process runs
+
+
+def init_worker(threads: int, warm: bool = True):
+    """Load the detector once per worker process and warm it up"""
+    global _detector
+    # Split the cores between workers instead of oversubscribing them
+    cv2.setNumThreads(1)
+    if config.DETECTOR_BACKEND == 'onnx':
+        if not config.ONNX_INTRA_OP_THREADS:
+            config.ONNX_INTRA_OP_THREADS = threads
+    else:
+        import torch
+        torch.set_num_threads(threads)
+
+    from detector import VehicleDetector
+    _detector = VehicleDetector()
+    if warm:
+        _detector.warmup()
+
+
+def worker_detector(threads: int):
+    """This process's detector, with no tracks left over from an earlier task"""
+    if _detector is None:
+        init_worker(threads, warm=False)
+    else:
+        _detector.reset()
+    return _detector
+
+
+def process_segment(task: dict) -> dict:
+    """Detect and track one frame range of a file, writing records to a part file.
+
+    Frames in ``[start - warmup, start)`` are processed only to warm up the
+    tracker and to give the parent boxes for stitching to the previous
+    segment; records are written for ``[start, end)`` only.
+    """
+    from motion_gate import MotionGate
+    from speed_tracker import BatchSpeedTracker
+
+    detector = worker_detector(task['threads'])
+    cap = cv2.VideoCapture(task['path'])
+    clock = VideoClock(cap.get(cv2.CAP_PROP_FPS))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    calibration = get_calibration(frame_height, config.__dict__,
+                                  int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    tracker = BatchSpeedTracker(clock=clock, calibration=calibration)
+    gate = None
+    if task['motion_gate']:
+        gate = MotionGate(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), frame_height)
+
+    first = max(0, task['start'] - task['warmup'])
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    head_boxes: Dict[int, list] = {}
+    tail_boxes: Dict[int, list] = {}
+    tail_start = task['end'] - task['overlap']
+    frames = 0
+    with open(task['part_path'], 'w') as part:
+        for index in range(first, task['end']):
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                break
+            if index >= task['start']:
+                frames += 1
+            # Absolute frame numbers, so adjacent segments detect on the same frames
+            if index % task['detect_every']:
+                continue
+
+            timestamp = clock.stamp(cap, index)
+            # Warm-up and overlap frames always run: stitching needs their boxes
+            gated = gate is not None and task['start'] <= index < tail_start
+            if gated and not gate.should_detect(frame, timestamp):
+                continue
+            detections = detector.detect(frame, timestamp)
+            speeds = tracker.update_frame(detections, frame_height)
+            boxes = [(d.track_id, [float(c) for c in d.bbox]) for d in detections]
+
+            if index < task['start']:
+                head_boxes[index] = boxes
+                continue
+            if index >= tail_start:
+                tail_boxes[index] = boxes
+            for det in detections:
+                part.write(json.dumps({
+                    'type': 'speed',
+                    'frame': index,
+                    'time': round(timestamp, 4),
+                    'track_id': det.track_id,
+                    'class': det.class_name,
+                    'speed': round(speeds[det.track_id], 2),
+                    'bbox': [round(float(c), 1) for c in det.bbox],
+                }) + '\n')
+    cap.release()
+    return {
+        'index': task['index'],
+        'frames': frames,
+        'part_path': task['part_path'],
+        'head_boxes': head_boxes,
+        'tail_boxes': tail_boxes,
+        'motion_skipped': gate.skipped if gate is not None else 0,
+    }
+
+
+def match_tracks(tail_boxes: Dict[int, list], head_boxes: Dict[int, list],
+                 min_iou: float = 0.3) -> Dict[int, int]:
+    """Map next-segment local track IDs to previous-segment ones by box overlap"""
+    scores: Dict[tuple, float] = {}
+    for frame, previous in tail_boxes.items():
+        for next_id, next_box in head_boxes.get(frame, []):
+            for prev_id, prev_box in previous:
+                iou = box_iou(prev_box, next_box)
+                if iou >= min_iou:
+                    scores[(prev_id, next_id)] = scores.get((prev_id, next_id), 0.0) + iou
+
+    mapping = {}
+    used = set()
+    for (prev_id, next_id), _ in sorted(scores.items(), key=lambda item: -item[1]):
+        if next_id in mapping or prev_id in used:
+            continue
+        mapping[next_id] = prev_id
+        used.add(prev_id)
+    return mapping
+
+
+class WorkerPool:
+    """Processes that keep one warm detector each across many clip jobs.
+
+    Spawned workers load the detector when they start. With ``preload``
+    (fork start method, Linux) it is loaded once here and forked workers
+    inherit it, so none of them import or load anything. One worker runs
+    tasks in this process.
+    """
+
+    def __init__(self, workers: int = 1, preload: bool = False):
+        self.workers = max(1, workers)
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.executor = None
+        if self.workers == 1 or preload:
+            init_worker(self.threads)
+        if self.workers > 1:
+            if preload:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=get_context('fork'))
+            else:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=get_context('spawn'),
+                                                    initializer=init_worker, initargs=(self.threads,))
+
+    def map(self, fn, tasks: List[dict]) -> list:
+        if self.executor is None:
+            return [fn(task) for task in tasks]
+        return list(self.executor.map(fn, tasks))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BatchProcessor:
+    """Runs a recorded file through detection and tracking without any display"""
+
+    def __init__(self, path: str, workers: int = 1, segments: int = None,
+                 overlap: int = 30, detect_every: int = 1, motion_gate: bool = None):
+        self.path = path
+        self.workers = max(1, workers)
+        self.segments = segments or self.workers
+        self.overlap = overlap
+        self.detect_every = detect_every
+        self.motion_gate = config.MOTION_GATE_ENABLED if motion_gate is None else motion_gate
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video source: {path}")
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    def _tasks(self, tmp: str, threads: int) -> List[dict]:
+        length = math.ceil(self.total_frames / self.segments)
+        tasks = []
+        for index in range(self.segments):
+            start = index * length
+            end = min(self.total_frames, start + length)
+            if start >= end:
+                break
+            tasks.append({
+                'path': self.path,
+                'index': index,
+                'start': start,
+                'end': end,
+                'warmup': self.overlap if index > 0 else 0,
+                'overlap': self.overlap,
+                'detect_every': self.detect_every,
+                'motion_gate': self.motion_gate,
+                'threads': threads,
+                'part_path': os.path.join(tmp, f'part-{index:04d}.jsonl'),
+            })
+        return tasks
+
+    def run(self, output_path: str, pool: WorkerPool = None) -> dict:
+        """Process the file and write speed and violation records as JSONL.
+
+        Pass a ``WorkerPool`` to reuse its warm workers across files;
+        otherwise one is started (and stopped) for this file.
+        """
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            if pool is None:
+                with WorkerPool(self.workers) as own_pool:
+                    results = own_pool.map(process_segment, self._tasks(tmp, own_pool.threads))
+            else:
+                results = pool.map(process_segment, self._tasks(tmp, pool.threads))
+            summary = self._stitch(results, output_path)
+
+        elapsed = time.perf_counter() - start
+        summary['frames'] = sum(r['frames'] for r in results)
+        summary['motion_skipped'] = sum(r['motion_skipped'] for r in results)
+        summary['seconds'] = elapsed
+        summary['fps'] = summary['frames'] / elapsed if elapsed > 0 else 0.0
+        return summary
+
+    def _stitch(self, results: List[dict], output_path: str) -> dict:
+        """Concatenate part files, giving tracks one ID across segment boundaries"""
+        next_global = 0
+        previous_ids: Dict[int, int] = {}
+        violated = set()
+        records = violations = 0
+
+        with open(output_path, 'w') as out:
+            for i, result in enumerate(results):
+                if i > 0:
+                    matches = match_tracks(results[i - 1]['tail_boxes'], result['head_boxes'])
+                    global_ids = {local: previous_ids[prev] for local, prev in matches.items()
+                                  if prev in previous_ids}
+                else:
+                    global_ids = {}
+
+                with open(result['part_path']) as part:
+                    for line in part:
+                        record = json.loads(line)
+                        local = record['track_id']
+                        if local not in global_ids:
+                            global_ids[local] = next_global
+                            next_global += 1
+                        record['track_id'] = global_ids[local]
+                        out.write(json.dumps(record) + '\n')
+                        records += 1
+
+                        # One violation record per vehicle
+                        speed_limit = get_speed_limit(record['class'])
+                        if record['speed'] > speed_limit and record['track_id'] not in violated:
+                            violated.add(record['track_id'])
+                            out.write(json.dumps({
+                                'type': 'violation',
+                                'frame': record['frame'],
+                                'time': record['time'],
+                                'track_id': record['track_id'],
+                                'class': record['class'],
+                                'speed': record['speed'],
+                                'speed_limit': speed_limit,
+                                'excess': round(record['speed'] - speed_limit, 2),
+                            }) + '\n')
+                            violations += 1
+                previous_ids = global_ids
+
+        return {'tracks': next_global, 'records': records, 'violations': violations}
+
+
+def read_jobs(path: str):
+    """Clip paths from a file, one per line; '-' reads stdin as jobs arrive"""
+    stream = sys.stdin if path == '-' else open(path)
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch processing of recorded videos")
+    parser.add_argument('sources', nargs='*', help='video files to process')
+    parser.add_argument('-o', '--output', default='speed_records.jsonl',
+                        help='JSONL output file (one source)')
+    parser.add_argument('--output-dir', default=None,
+                        help='write <name>.jsonl per source here (several sources or --jobs)')
+    parser.add_argument('--jobs', default=None,
+                        help="file of video paths, one per line; '-' reads them from stdin")
+    parser.add_argument('-w', '--workers', type=int, default=1, help='parallel worker processes')
+    parser.add_argument('--preload', action='store_true',
+                        help='load the model once and fork the workers from it (Linux)')
+    parser.add_argument('--segments', type=int, default=None, help='time segments (default: workers)')
+    parser.add_argument('--overlap', type=int, default=30,
+                        help='frames shared by adjacent segments for track stitching')
+    parser.add_argument('--detect-every', type=int, default=1, help='run detection every N frames')
+    parser.add_argument('--motion-gate', action='store_true', default=None,
+                        help='skip detection on frames without motion (see MOTION_* in config.py)')
+    args = parser.parse_args()
+
+    jobs = list(args.sources)
+    if args.jobs:
+        jobs = itertools.chain(jobs, read_jobs(args.jobs))
+    elif not jobs:
+        parser.error('give at least one video file or --jobs')
+    several = args.jobs is not None or len(args.sources) > 1
+    if several and args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # The model stays loaded from one clip to the next
+    with WorkerPool(args.workers, args.preload) as pool:
+        for source in jobs:
+            if not os.path.exists(source):
+                logger.error(f"Video file not found: {source}")
+                continue
+            output = args.output
+            if several:
+                name = os.path.splitext(os.path.basename(source))[0] + '.jsonl'
+                output = os.path.join(args.output_dir or os.path.dirname(source) or '.', name)
+            try:
+                processor = BatchProcessor(source, args.workers, args.segments, args.overlap,
+                                           args.detect_every, args.motion_gate)
+                summary = processor.run(output, pool)
+            except Exception as e:
+                logger.error(f"Failed to process {source}: {str(e)}")
+                continue
+            logger.info(
+                f"Processed {summary['frames']} frames of {source} in {summary['seconds']:.1f}s "
+                f"({summary['fps']:.1f} fps): {summary['tracks']} tracks, "
+                f"{summary['violations']} violations, {summary['motion_skipped']} frames skipped "
+                f"without motion -> {output}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""Benchmarks for the vehicle speed detection system.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_violation_sink``.
+"""
@@ -0,0 +1,104 @@
+"""Ground-plane lookup table vs per-detection trig calibration.
+
+Checks that the table reproduces get_scaling_factor, that a homography
+fitted from reference points maps back onto them, and how close each
+speed method gets to the true speed of a vehicle driving straight away
+from the camera. Then times the scale lookups.
+
+    python -m benchmarks.bench_calibration --detections 100000
+"""
+import argparse
+import logging
+import time
+import numpy as np
+import config
+from calibration import GroundPlaneCalibration, get_scaling_factor
+from speed_calculator import calculate_speed
+
+FRAME_WIDTH = 1280
+FRAME_HEIGHT = 720
+
+
+def random_boxes(n, rng):
+    centres = np.column_stack([rng.uniform(0, FRAME_WIDTH, n), rng.uniform(0, FRAME_HEIGHT, n)])
+    half = rng.uniform(10, 80, size=(n, 1))
+    return np.hstack([centres - half, centres + half])
+
+
+def check_lut(calibration, rng):
+    boxes = random_boxes(2000, rng)
+    expected = np.array([get_scaling_factor(b, FRAME_HEIGHT, config.__dict__) for b in boxes])
+    actual = calibration.scale_for_boxes(boxes)
+    return float(np.max(np.abs(actual - expected) / expected))
+
+
+def check_homography():
+    # Road rectangle 7 m wide, 10-60 m ahead, seen as a trapezoid
+    image_points = [(400, 700), (880, 700), (610, 250), (670, 250)]
+    world_points = [(-3.5, 10), (3.5, 10), (-3.5, 60), (3.5, 60)]
+    calibration = GroundPlaneCalibration.from_reference_points(
+        image_points, world_points, FRAME_HEIGHT, config.__dict__, FRAME_WIDTH)
+    mapped = calibration.pixels_to_world(np.array(image_points, dtype=float))
+    return float(np.max(np.abs(mapped - np.array(world_points))))
+
+
+def check_speed(calibration, speed_kmh, fps=30.0, frames=10):
+    """Vehicle at a constant road speed, moving up the image from the bottom"""
+    ground = calibration.ground_y
+    travelled = speed_kmh / 3.6 * np.arange(frames) / fps
+    # Invert the monotonic row -> road distance table (road distance grows towards row 0)
+    start = ground[-1] - 2.0
+    rows = np.interp(start - travelled, ground, calibration.rows)
+    positions = [(FRAME_WIDTH / 2, y, i / fps) for i, y in enumerate(rows)]
+
+    world = calculate_speed(positions, to_world=calibration.pixels_to_world)
+    # Previous method: pixel distance times the scale at the newest box
+    scale = get_scaling_factor((0, rows[-1], 0, rows[-1]), FRAME_HEIGHT, config.__dict__)
+    legacy = calculate_speed(positions, scale)
+    return world, legacy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--detections', type=int, default=100000)
+    args = parser.parse_args()
+    logging.getLogger('speed_calculator').setLevel(logging.ERROR)
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    calibration = GroundPlaneCalibration(FRAME_HEIGHT, config.__dict__, FRAME_WIDTH)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"table build             : {build_ms:.3f} ms for {FRAME_HEIGHT + 1} rows")
+    print(f"LUT vs trig scale       : max relative error {check_lut(calibration, rng):.2e}")
+    print(f"homography round trip   : max error {check_homography():.2e} m")
+    print(f"{'true km/h':>10} {'world km/h':>11} {'legacy km/h':>12}")
+    for speed in (30, 60, 90, 120):
+        world, legacy = check_speed(calibration, speed)
+        print(f"{speed:>10} {world:>11.1f} {legacy:>12.1f}")
+
+    boxes = random_boxes(args.detections, rng)
+    start = time.perf_counter()
+    for box in boxes:
+        get_scaling_factor(box, FRAME_HEIGHT, config.__dict__)
+    trig = time.perf_counter() - start
+    start = time.perf_counter()
+    for y in ((boxes[:, 1] + boxes[:, 3]) / 2).tolist():
+        calibration.scale_at(y)
+    lut_scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    calibration.scale_for_boxes(boxes)
+    lut_vector = time.perf_counter() - start
+    start = time.perf_counter()
+    calibration.pixels_to_world(boxes[:, :2])
+    to_world = time.perf_counter() - start
+
+    per = 1e6 / args.detections
+    print(f"get_scaling_factor      : {trig * per:8.3f} us/detection")
+    print(f"scale_at (scalar)       : {lut_scalar * per:8.3f} us/detection")
+    print(f"scale_for_boxes (batch) : {lut_vector * per:8.3f} us/detection")
+    print(f"pixels_to_world (batch) : {to_world * per:8.3f} us/point")
+
+
+if __name__ == '__main__':
+    main()
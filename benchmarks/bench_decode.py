@@ -0,0 +1,88 @@
+"""Decode + resize throughput of ThreadedVideoCapture at 1080p and 4K.
+
+Reads a synthetic clip through ThreadedVideoCapture with each decode
+option and reports frames/s and per-frame cost as seen by the consumer:
+full-resolution decode only (the old path), decode plus one resize to
+INFERENCE_WIDTH into reusable buffers with and without keeping the full
+frame, and the ffmpeg pipe with and without decoder-side scaling (skipped
+when no ffmpeg binary is found).
+
+    python -m benchmarks.bench_decode --sizes 1920x1080 3840x2160 --inference-width 640
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import cv2
+import numpy as np
+import config
+from video_capture import ThreadedVideoCapture
+from benchmarks.synthetic import write_clip
+
+
+def run(path, **options):
+    capture = ThreadedVideoCapture(path, drop_policy='block', **options)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame, _ = capture.read_timestamped()
+        if not ret:
+            break
+        capture.inference_frame()
+        frames += 1
+    elapsed = time.perf_counter() - start
+    size = capture.inference_size or (capture.frame_width, capture.frame_height)
+    capture.release()
+    return frames / elapsed, size
+
+
+def resize_ms(width, height, inference_width, repeats=50):
+    """Cost of shrinking one full frame to the detector input, as the letterbox does"""
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    size = (inference_width, int(round(height * inference_width / width)))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['1920x1080', '3840x2160'])
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--inference-width', type=int, default=640)
+    args = parser.parse_args()
+
+    has_ffmpeg = shutil.which(config.FFMPEG_BINARY) is not None
+    modes = [
+        ('opencv, full frames', dict(decoder='opencv')),
+        ('opencv + resize, keep full', dict(decoder='opencv', inference_width=args.inference_width)),
+        ('opencv + resize, reduced only', dict(decoder='opencv', inference_width=args.inference_width,
+                                               keep_full=False)),
+    ]
+    if has_ffmpeg:
+        modes += [
+            ('ffmpeg, full frames', dict(decoder='ffmpeg')),
+            ('ffmpeg + resize, keep full', dict(decoder='ffmpeg', inference_width=args.inference_width)),
+            ('ffmpeg scales, reduced only', dict(decoder='ffmpeg', inference_width=args.inference_width,
+                                                 keep_full=False)),
+        ]
+    else:
+        print(f"'{config.FFMPEG_BINARY}' not found; ffmpeg modes skipped")
+
+    print(f"{'source':>10} {'mode':<31} {'detector input':>14} {'fps':>7} {'ms/frame':>9} {'total ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            width, height = (int(v) for v in size.split('x'))
+            path = write_clip(os.path.join(tmp, f'{size}.mp4'), width=width, height=height,
+                              frames=args.frames)
+            letterbox = resize_ms(width, height, args.inference_width)
+            for name, options in modes:
+                fps, (w, h) = run(path, **options)
+                total = 1000 / fps + (letterbox if w == width else 0.0)
+                print(f"{size:>10} {name:<31} {f'{w}x{h}':>14} {fps:>7.1f} {1000 / fps:>9.2f} {total:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Startup, latency and agreement of the detector backends.
+
+Loads each backend (the ultralytics predictor, the fused PyTorch model
+with our own NMS, ONNX Runtime and its INT8 copy), timing a cold start that
+exports into an empty cache and a warm start from the cache. Then times
+inference on synthetic road frames and matches every backend's boxes
+against the ultralytics reference (same class, IoU >= --match-iou).
+
+With random weights (--model yolov8n.yaml, or any untrained checkpoint)
+scores are tiny, so pass a --conf low enough that boxes survive; the
+agreement numbers still compare the backends box for box.
+
+    python -m benchmarks.bench_detector_backends --model yolov8n.pt --frames 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+import config
+from detector_backends import create_backend
+from benchmarks.synthetic import write_clip
+
+BACKENDS = ['torch', 'onnx', 'onnx-int8']
+
+
+class UltralyticsReference:
+    """model.predict, as VehicleDetector calls it when DETECTOR_BACKEND = 'ultralytics'"""
+    name = 'ultralytics'
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    def predict(self, frames, conf, iou, classes=None):
+        results = self.model.predict(frames, conf=conf, iou=iou, classes=classes,
+                                     imgsz=config.DETECTOR_IMGSZ, verbose=False)
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+
+def load(name, model_path, cache_dir, threads):
+    if name == 'ultralytics':
+        backend = UltralyticsReference(model_path)
+        frame = np.full((360, 640, 3), 114, dtype=np.uint8)
+        backend.predict([frame, frame], 0.5, 0.7)  # Same warm-up as create_backend
+        return backend
+    if name == 'torch':
+        return create_backend('torch', model_path=model_path)
+    return create_backend('onnx', model_path=model_path, int8=name == 'onnx-int8',
+                          intra_op_threads=threads, cache_dir=cache_dir)
+
+
+def read_frames(count, width, height):
+    with tempfile.TemporaryDirectory() as tmp:
+        cap = cv2.VideoCapture(write_clip(os.path.join(tmp, 'clip.mp4'), width=width, height=height,
+                                          frames=count))
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def box_iou(box, boxes):
+    w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = w * h
+    union = (box[2] - box[0]) * (box[3] - box[1]) + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(union - inter, 1e-9)
+
+
+def agreement(reference, boxes, match_iou):
+    """(matched, reference count, candidate count) by greedy same-class IoU matching"""
+    matched = 0
+    used = np.zeros(len(boxes), dtype=bool)
+    for row in reference:
+        same = (boxes[:, 5] == row[5]) & ~used
+        if not same.any():
+            continue
+        ious = np.where(same, box_iou(row[:4], boxes[:, :4]), 0.0)
+        best = int(ious.argmax())
+        if ious[best] >= match_iou:
+            used[best] = True
+            matched += 1
+    return matched, len(reference), len(boxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None, help='override config.YOLO_MODEL')
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--conf', type=float, default=config.CONFIDENCE_THRESHOLD)
+    parser.add_argument('--match-iou', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=0, help='ONNX intra-op threads, 0 for default')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS)
+    args = parser.parse_args()
+    model_path = args.model or config.YOLO_MODEL
+
+    width, height = (int(v) for v in args.size.split('x'))
+    frames = read_frames(args.frames, width, height)
+    iou = config.NMS_IOU_THRESHOLD
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        reference = load('ultralytics', model_path, cache_dir, args.threads)
+        startup = {'ultralytics': (time.perf_counter() - start, None)}
+        backends = [reference]
+        for name in args.backends:
+            start = time.perf_counter()
+            load(name, model_path, cache_dir, args.threads)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            backends.append(load(name, model_path, cache_dir, args.threads))
+            startup[name] = (cold, time.perf_counter() - start)
+
+        expected = [reference.predict([frame], args.conf, iou)[0] for frame in frames]
+        print(f"{args.size}, {len(frames)} frames, conf {args.conf}, "
+              f"{sum(len(e) for e in expected)} reference boxes")
+        print(f"{'backend':<12} {'cold start s':>12} {'cached s':>9} {'ms/frame':>9} "
+              f"{'recall':>7} {'precision':>10}")
+        for backend in backends:
+            matched = total_expected = total_found = 0
+            elapsed = 0.0
+            for frame, reference_boxes in zip(frames, expected):
+                start = time.perf_counter()
+                boxes = backend.predict([frame], args.conf, iou)[0]
+                elapsed += time.perf_counter() - start
+                m, e, f = agreement(reference_boxes, boxes, args.match_iou)
+                matched, total_expected, total_found = matched + m, total_expected + e, total_found + f
+            cold, cached = startup[backend.name]
+            recall = matched / total_expected if total_expected else 1.0
+            precision = matched / total_found if total_found else 1.0
+            cached_text = f"{cached:>9.2f}" if cached is not None else f"{'-':>9}"
+            print(f"{backend.name:<12} {cold:>12.2f} {cached_text} {elapsed / len(frames) * 1000:>9.1f} "
+                  f"{recall:>7.1%} {precision:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Recall vs latency of input sizes, far-field tiling and load-aware level switching on small vehicles.
+
+Renders a highway in perspective, where vehicles shrink from ~200 px to
+~7 px wide towards the horizon and traffic goes quiet, busy, quiet, and
+runs VehicleDetector over it with fixed input sizes, with far-field tiles,
+and with DETECTOR_LEVELS switching between them under a latency budget.
+The model is benchmarks.stub_detector.InputBlobBackend: it finds vehicles
+in the resized model input, so small ones are lost as a real model loses
+them, while the same input runs through a randomly initialised YOLO graph
+for real latency. Reports recall overall and for far vehicles (under
+16 px tall), false positives, detect() latency and track-ID switches of
+ground-truth vehicles; for the levels run, time spent at each level.
+
+    python -m benchmarks.bench_detector_levels --frames 180 --budgets-ms 120 250
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+import cv2
+import numpy as np
+import config
+import detector_backends
+from detector import VehicleDetector
+from benchmarks.stub_detector import InputBlobBackend
+from benchmarks.synthetic import write_highway_clip
+
+SMALL = 16  # Box height in source pixels below which a vehicle counts as far
+
+
+def iou_matrix(a, b):
+    a, b = np.asarray(a, dtype=float).reshape(-1, 4), np.asarray(b, dtype=float).reshape(-1, 4)
+    w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = w * h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match(truth, detections, threshold=0.3):
+    """Greedy (truth id, detection index) pairs by IoU"""
+    ids = list(truth)
+    if not ids or not detections:
+        return []
+    overlaps = iou_matrix([truth[i] for i in ids], [d.bbox for d in detections])
+    pairs = []
+    while overlaps.size and overlaps.max() >= threshold:
+        t, d = np.unravel_index(np.argmax(overlaps), overlaps.shape)
+        pairs.append((ids[t], int(d)))
+        overlaps[t, :] = -1
+        overlaps[:, d] = -1
+    return pairs
+
+
+def run(clip, settings):
+    """Recall, latency and identity counts for one detector configuration"""
+    saved = {name: getattr(config, name) for name in settings}
+    for name, value in settings.items():
+        setattr(config, name, value)
+    try:
+        detector = VehicleDetector()
+        detector.warmup(1920, 1080)
+        cap = cv2.VideoCapture(clip['path'])
+        times, levels = [], Counter()
+        found = Counter()
+        total = Counter()
+        false_positives = 0
+        last_track = {}
+        id_switches = 0
+        for i, truth in enumerate(clip['boxes']):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if detector.policy is not None:
+                levels[detector.policy.index] += 1
+            start = time.perf_counter()
+            detections = detector.detect(frame, i / clip['fps'])
+            times.append(time.perf_counter() - start)
+            pairs = match(truth, detections)
+            for vehicle_id, box in truth.items():
+                total['small' if box[3] - box[1] < SMALL else 'large'] += 1
+            for vehicle_id, index in pairs:
+                box = truth[vehicle_id]
+                found['small' if box[3] - box[1] < SMALL else 'large'] += 1
+                track_id = detections[index].track_id
+                if last_track.get(vehicle_id, track_id) != track_id:
+                    id_switches += 1
+                last_track[vehicle_id] = track_id
+            false_positives += len(detections) - len(pairs)
+        cap.release()
+        switches = detector.policy.switches if detector.policy is not None else 0
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+    times = np.array(times) * 1000
+    return {
+        'recall': sum(found.values()) / max(1, sum(total.values())),
+        'recall_small': found['small'] / max(1, total['small']),
+        'recall_large': found['large'] / max(1, total['large']),
+        'false_positives': false_positives / max(1, len(times)),
+        'mean_ms': times.mean(),
+        'p95_ms': np.percentile(times, 95),
+        'id_switches': id_switches,
+        'vehicles': len(last_track),
+        'levels': levels,
+        'switches': switches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--frames', type=int, default=180)
+    parser.add_argument('--model', default='yolov8n.yaml', help='YOLO graph run for latency')
+    parser.add_argument('--far-field', default='0.19,0.45', help='band rows as fractions of the height')
+    parser.add_argument('--budgets-ms', type=float, nargs='+', default=[120.0, 250.0],
+                        help='DETECTOR_LATENCY_BUDGET_MS of each levels run')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    width, height = (int(v) for v in args.size.split('x'))
+    top, bottom = (float(v) * height for v in args.far_field.split(','))
+    detector_backends.BACKENDS[InputBlobBackend.name] = InputBlobBackend
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_highway_clip(os.path.join(tmp, 'highway.mp4'), width=width, height=height,
+                                  frames=args.frames, quiet=0.1, seed=args.seed)
+        common = {
+            'DETECTOR_BACKEND': InputBlobBackend.name,
+            'YOLO_MODEL': args.model,
+            'ROI_POLYGON': clip['road'],
+            'FAR_FIELD_BAND': (top, bottom),
+        }
+        levels = [{'imgsz': 320}, {'imgsz': 640}, {'imgsz': 640, 'far_field': True}]
+        modes = [
+            ('imgsz 320', {'DETECTOR_IMGSZ': 320, 'FAR_FIELD_BAND': None}),
+            ('imgsz 640', {'DETECTOR_IMGSZ': 640, 'FAR_FIELD_BAND': None}),
+            ('imgsz 1280', {'DETECTOR_IMGSZ': 1280, 'FAR_FIELD_BAND': None}),
+            ('imgsz 640 + far-field tiles', {'DETECTOR_IMGSZ': 640}),
+        ]
+        modes += [(f'levels, budget {budget:.0f} ms', {'DETECTOR_LEVELS': levels, 'DETECTOR_SWITCH_CALLS': 10,
+                                                        'DETECTOR_LATENCY_BUDGET_MS': budget})
+                  for budget in args.budgets_ms]
+        sizes = [b[3] - b[1] for frame in clip['boxes'] for b in frame.values()]
+        counts = [len(frame) for frame in clip['boxes']]
+        print(f"{args.size}, {len(clip['boxes'])} frames, {clip['vehicles']} vehicles "
+              f"({min(counts)}-{max(counts)} in view), {np.mean(np.array(sizes) < SMALL):.0%} of boxes "
+              f"under {SMALL}px tall; latency from {args.model}; far field rows {top:.0f}-{bottom:.0f}")
+        print(f"{'mode':<28} {'recall':>7} {'far':>6} {'near':>6} {'FP/frame':>9} {'mean ms':>8} "
+              f"{'p95 ms':>7} {'ID switches':>12}")
+        for name, settings in modes:
+            result = run(clip, {**common, **settings})
+            print(f"{name:<28} {result['recall']:>7.1%} {result['recall_small']:>6.1%} "
+                  f"{result['recall_large']:>6.1%} {result['false_positives']:>9.2f} {result['mean_ms']:>8.1f} "
+                  f"{result['p95_ms']:>7.1f} {result['id_switches']:>5} / {result['vehicles']:<4}")
+            if result['levels']:
+                frames = sum(result['levels'].values())
+                shares = ', '.join(f"{levels[i]}: {n / frames:.0%}" for i, n in sorted(result['levels'].items()))
+                print(f"  {result['switches']} level switches; frames at {shares}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Processing-loop latency with violation evidence off, in the background, and written inline.
+
+Runs a synthetic clip of speeding vehicles through the detect, track and
+log loop (stub detector, no display) three times: without evidence, with
+EvidenceRecorder, and with a naive recorder that keeps raw frames and
+writes the snapshot and pre-roll clip synchronously when a violation
+fires. Reports per-frame loop time, the worst frame, the mean time of frames
+on which a violation fired, memory held for the pre-roll and the
+evidence files written. The clip starts with empty road so the pre-roll
+is full by the first violation.
+
+    python -m benchmarks.bench_evidence --size 1920x1080 --frames 600
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+import cv2
+import numpy as np
+import config
+from calibration import get_calibration
+from data_logger import SpeedLogger, get_speed_limit
+from evidence import EvidenceRecorder
+from speed_tracker import BatchSpeedTracker
+from track_store import TrackStore
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.synthetic import write_traffic_clip
+
+
+class InlineEvidence:
+    """The straightforward version: raw frames in a deque, files written on the loop"""
+
+    def __init__(self, directory, preroll, fps):
+        self.directory = directory
+        self.fps = fps
+        self.frames = deque(maxlen=int(preroll * fps))
+        self.last_sample = None
+        self.written = 0
+
+    def add_frame(self, frame, timestamp):
+        if self.last_sample is not None and timestamp - self.last_sample < 0.999 / self.fps:
+            return
+        self.last_sample = timestamp
+        self.frames.append(frame.copy())
+
+    def trigger(self, violation_id, detection, speed, speed_limit, frame, timestamp):
+        x1, y1, x2, y2 = [int(c) for c in detection.bbox]
+        base = os.path.join(self.directory, violation_id)
+        cv2.imwrite(base + '.jpg', frame[max(0, y1):y2, max(0, x1):x2])
+        height, width = frame.shape[:2]
+        writer = cv2.VideoWriter(base + '.mp4', cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        for image in self.frames:
+            writer.write(image)
+        writer.release()
+        self.written += 1
+
+    def memory_mb(self):
+        return sum(f.nbytes for f in self.frames) / (1024 * 1024)
+
+    def close(self):
+        pass
+
+
+def run(frames, fps, tmp, evidence):
+    detector = ColorBlobDetector()
+    height, width = frames[0].shape[:2]
+    tracker = BatchSpeedTracker(calibration=get_calibration(height, config.__dict__, width))
+    speed_logger = SpeedLogger(log_file=os.path.join(tmp, 'violations.csv'),
+                               export_file=os.path.join(tmp, 'violations.xlsx'),
+                               summary_file=os.path.join(tmp, 'vehicles.jsonl'))
+    store = TrackStore(on_evict=[lambda s: tracker.remove(s.track_id), speed_logger.log_vehicle])
+    times = []
+    trigger_times = []
+    peak_mb = 0.0
+    for i, frame in enumerate(frames):
+        timestamp = i / fps
+        start = time.perf_counter()
+        if evidence is not None:
+            evidence.add_frame(frame, timestamp)
+        detections = detector.detect(frame, timestamp)
+        speeds = tracker.update_frame(detections, height)
+        speeding = store.observe(detections, speeds, timestamp)
+        store.expire(timestamp)
+        if evidence is not None:
+            for violation_id, det, speed in speeding:
+                evidence.trigger(violation_id, det, speed, get_speed_limit(det.class_name), frame, timestamp)
+        times.append(time.perf_counter() - start)
+        if speeding:
+            trigger_times.append(times[-1])
+        if evidence is not None:
+            memory = (evidence.memory_mb() if isinstance(evidence, InlineEvidence)
+                      else evidence.ring.bytes / (1024 * 1024))
+            peak_mb = max(peak_mb, memory)
+    store.flush()
+    if evidence is not None:
+        evidence.close()
+    speed_logger.close()
+    return np.array(times) * 1000, np.array(trigger_times) * 1000, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--vehicles', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger('speed_calculator').setLevel(logging.ERROR)
+    width, height = (int(v) for v in args.size.split('x'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        truth = write_traffic_clip(os.path.join(tmp, 'clip.mp4'), width=width, height=height,
+                                   frames=args.frames, vehicles=args.vehicles, seed=args.seed,
+                                   min_speed=90, max_speed=160)
+        cap = cv2.VideoCapture(truth['path'])
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        # Empty road first, so the pre-roll is full when the first violation fires
+        road = np.full_like(frames[0], 90)
+        frames = [road] * int(config.EVIDENCE_PREROLL * truth['fps']) + frames
+        speeding = sum(s > get_speed_limit('Car') for s in truth['speeds_kmh'])
+        print(f"{args.size}, {len(frames)} frames, {speeding} of {args.vehicles} vehicles speeding, "
+              f"pre-roll {config.EVIDENCE_PREROLL:.0f}s at {config.EVIDENCE_FPS:.0f} fps")
+        print(f"{'evidence':<12} {'mean ms':>8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+              f"{'trigger frame ms':>17} {'pre-roll MB':>12} {'files':>6}")
+        modes = [
+            ('off', lambda d: None),
+            ('background', lambda d: EvidenceRecorder(directory=d)),
+            ('inline', lambda d: InlineEvidence(d, config.EVIDENCE_PREROLL, config.EVIDENCE_FPS)),
+        ]
+        for name, make in modes:
+            directory = os.path.join(tmp, name)
+            os.makedirs(directory)
+            times, trigger_times, peak_mb = run(frames, truth['fps'], directory, make(directory))
+            files = len([f for f in os.listdir(directory) if f.endswith(('.jpg', '.mp4'))])
+            trigger_ms = trigger_times.mean() if len(trigger_times) else 0.0
+            print(f"{name:<12} {times.mean():>8.2f} {np.percentile(times, 50):>7.2f} "
+                  f"{np.percentile(times, 99):>7.2f} {times.max():>7.1f} {trigger_ms:>17.1f} "
+                  f"{peak_mb:>12.1f} {files:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""ThreadedVideoCapture: Queue of fresh frames vs preallocated frame ring.
+
+Reads a synthetic clip with a consumer that spends --work-ms per frame and
+reports consumer fps, dropped frames and capture-to-consume latency for
+each buffer mode and drop policy.
+
+    python -m benchmarks.bench_frame_ring --width 1920 --height 1080 --work-ms 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from video_capture import ThreadedVideoCapture
+from benchmarks.synthetic import write_clip
+
+MODES = [
+    ('queue', 'block'),
+    ('ring', 'block'),
+    ('ring', 'drop_oldest'),
+]
+
+
+def run(clip, buffer_mode, drop_policy, work_ms):
+    capture = ThreadedVideoCapture(clip, buffer_mode=buffer_mode, drop_policy=drop_policy)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame, _ = capture.read_timestamped()
+        if not ret:
+            break
+        frames += 1
+        if work_ms:
+            time.sleep(work_ms / 1000.0)
+    elapsed = time.perf_counter() - start
+    stats = capture.stats()
+    capture.release()
+    return frames / elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--work-ms', type=float, nargs='+', default=[0, 5, 20],
+                        help='simulated per-frame processing time')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_clip(os.path.join(tmp, 'clip.mp4'), args.width, args.height, args.frames)
+        print(f"{'mode':<18} {'work ms':>7} {'fps':>8} {'dropped':>8} {'lat p50 ms':>11} {'lat p95 ms':>11}")
+        for work_ms in args.work_ms:
+            for buffer_mode, drop_policy in MODES:
+                fps, stats = run(clip, buffer_mode, drop_policy, work_ms)
+                print(f"{buffer_mode + '/' + drop_policy:<18} {work_ms:>7.0f} {fps:>8.1f} "
+                      f"{stats['dropped_frames']:>8} {stats['latency_ms_p50']:>11.2f} "
+                      f"{stats['latency_ms_p95']:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
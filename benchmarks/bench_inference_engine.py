@@ -0,0 +1,81 @@
+"""Frames/sec scaling of the shared batched inference engine on CPU.
+
+Each stream is a ThreadedVideoCapture over the same synthetic clip. The
+baseline runs one VehicleDetector per stream, as separate VideoProcessor
+processes would, but sequentially on the same thread.
+
+    python -m benchmarks.bench_inference_engine --streams 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from detector import VehicleDetector
+from inference_engine import BatchInferenceEngine
+from video_capture import ThreadedVideoCapture
+from benchmarks.synthetic import write_clip
+
+
+def run_engine(clip, streams, max_batch_size, max_wait_ms):
+    engine = BatchInferenceEngine(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    # Warm up so model fusing and allocation are not counted
+    engine.detect('warmup', np.zeros((640, 640, 3), dtype=np.uint8))
+
+    captures = {f'cam{i}': ThreadedVideoCapture(clip) for i in range(streams)}
+    start = time.perf_counter()
+    for thread in engine.run_streams(captures):
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    engine.close()
+    for capture in captures.values():
+        capture.release()
+
+    frames = sum(s['frames'] for sid, s in stats['streams'].items() if sid != 'warmup')
+    return frames / elapsed, stats
+
+
+def run_baseline(clip, streams):
+    detectors = [VehicleDetector() for _ in range(streams)]
+    captures = [ThreadedVideoCapture(clip) for _ in range(streams)]
+    frames = 0
+    start = time.perf_counter()
+    active = list(range(streams))
+    while active:
+        for i in list(active):
+            ret, frame = captures[i].read()
+            if not ret or frame is None:
+                active.remove(i)
+                continue
+            detectors[i].detect(frame)
+            frames += 1
+    elapsed = time.perf_counter() - start
+    for capture in captures:
+        capture.release()
+    return frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--frames', type=int, default=90, help='frames per synthetic clip')
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+    parser.add_argument('--skip-baseline', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_clip(os.path.join(tmp, 'clip.mp4'), frames=args.frames)
+        print(f"{'streams':>7} {'engine fps':>11} {'baseline fps':>13} {'batch':>6} "
+              f"{'p50 ms':>8} {'p95 ms':>8}")
+        for n in args.streams:
+            fps, stats = run_engine(clip, n, args.max_batch_size, args.max_wait_ms)
+            baseline = '-' if args.skip_baseline else f"{run_baseline(clip, n):.1f}"
+            agg = stats['aggregate']
+            print(f"{n:>7} {fps:>11.1f} {baseline:>13} {agg['mean_batch_size']:>6.2f} "
+                  f"{agg['latency_ms_p50']:>8.1f} {agg['latency_ms_p95']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Overhead of the metrics layer, disabled and enabled.
+
+Times an empty stage block, gauge updates and per-frame samples with
+metrics off and on, plus the cost of building a snapshot and the
+Prometheus text for a loop-sized set of stages.
+
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+import argparse
+import time
+from metrics import Metrics
+
+STAGES = ('read', 'detect', 'track', 'draw', 'log', 'display', 'frame')
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    fn(calls)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def stage_loop(metrics):
+    def run(calls):
+        for _ in range(calls):
+            with metrics.stage('detect'):
+                pass
+    return run
+
+
+def gauge_loop(metrics):
+    def run(calls):
+        for i in range(calls):
+            metrics.set_gauge('capture_backlog', i)
+    return run
+
+
+def record_loop(metrics):
+    def run(calls):
+        for i in range(calls):
+            metrics.record('detections_per_frame', i)
+    return run
+
+
+def baseline(calls):
+    for _ in range(calls):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    empty = per_call_ns(baseline, args.calls)
+    print(f"{'operation':<12} {'disabled ns':>12} {'enabled ns':>11}  (empty loop {empty:.0f} ns)")
+    for name, loop in (('stage', stage_loop), ('set_gauge', gauge_loop), ('record', record_loop)):
+        off = per_call_ns(loop(Metrics(enabled=False)), args.calls)
+        on = per_call_ns(loop(Metrics(enabled=True)), args.calls)
+        print(f"{name:<12} {off - empty:>12.0f} {on - empty:>11.0f}")
+
+    metrics = Metrics(enabled=True)
+    for stage in STAGES:
+        for i in range(metrics.window):
+            metrics.observe_stage(stage, i * 1e-5)
+    metrics.snapshot()  # Warm-up
+    start = time.perf_counter()
+    metrics.snapshot()
+    snapshot_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    metrics.prometheus_text()
+    text_ms = (time.perf_counter() - start) * 1000
+    print(f"snapshot ({len(STAGES)} full stages) : {snapshot_ms:.2f} ms")
+    print(f"prometheus text            : {text_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
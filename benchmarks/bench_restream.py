@@ -0,0 +1,190 @@
+"""Glass-to-glass latency of live ingest and restream, and recovery from a dropped stream.
+
+Replays a synthetic clip from benchmarks.replay_server, which stamps each
+frame with its send time, into VideoProcessor as a network stream, and
+reads the annotated output back as a viewer would: from the MJPEG
+restream, or by polling the HLS playlist. Latency runs from a frame
+leaving the stand-in camera to the viewer decoding the annotated frame;
+for HLS, to its segment being listed, to which a player adds its buffer
+(typically three segments). The detector is the colour-blob stub with
+--detect-ms of extra work per call on every frame, so processing is
+slower than the source: 'latest' skips to the newest frame, 'block'
+leaves frames waiting in the capture and socket buffers. The outage run
+takes the stream down for --outage seconds part way through and reports
+reconnects and the longest stall in the output.
+
+    python -m benchmarks.bench_restream --duration 10 --detect-ms 45
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+import cv2
+import numpy as np
+import config
+from video_processor import VideoProcessor
+from benchmarks.replay_server import ReplayServer, read_stamp, stamp_age, stamp_height
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.synthetic import write_traffic_clip
+
+WARMUP = 1.0  # Seconds of output ignored after the first frame arrives
+
+
+class SlowStampDetector(ColorBlobDetector):
+    """ColorBlobDetector that leaves out the stamp strip and takes ``delay`` seconds longer"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def detect(self, frame, timestamp: float = None, frame_size: tuple = None):
+        time.sleep(self.delay)
+        return super().detect(frame[:-stamp_height(frame)], timestamp)
+
+
+def watch_mjpeg(url, stopped, samples):
+    """Append (arrival time, age in seconds) for every frame of an MJPEG stream"""
+    stream = urllib.request.urlopen(url, timeout=10)
+    while not stopped.is_set():
+        line = stream.readline()
+        if not line:
+            return
+        if not line.startswith(b'--'):
+            continue
+        length = 0
+        while True:
+            header = stream.readline().strip()
+            if not header:
+                break
+            name, _, value = header.partition(b':')
+            if name.lower() == b'content-length':
+                length = int(value)
+        frame = cv2.imdecode(np.frombuffer(stream.read(length), np.uint8), cv2.IMREAD_COLOR)
+        now = time.time()
+        samples.append((now, stamp_age(read_stamp(frame), now)))
+
+
+def watch_hls(directory, stopped, samples):
+    """Append (listing time, age of the segment's first frame) for every new HLS segment"""
+    playlist = os.path.join(directory, 'index.m3u8')
+    seen = set()
+    while not stopped.is_set():
+        time.sleep(0.02)
+        if not os.path.exists(playlist):
+            continue
+        with open(playlist) as f:
+            names = [line.strip() for line in f if line.strip().endswith('.ts')]
+        now = time.time()
+        for name in names:
+            if name in seen:
+                continue
+            seen.add(name)
+            cap = cv2.VideoCapture(os.path.join(directory, name))
+            ret, frame = cap.read()
+            cap.release()
+            if ret:
+                samples.append((now, stamp_age(read_stamp(frame), now)))
+
+
+def run(server, directory, settings, duration, detect_ms, outage=None):
+    saved = {name: getattr(config, name) for name in settings}
+    for name, value in settings.items():
+        setattr(config, name, value)
+    try:
+        processor = VideoProcessor(server.url, display=False, detector=SlowStampDetector(detect_ms / 1000.0),
+                                   output_dir=directory)
+        worker = threading.Thread(target=processor.process_video)
+        worker.start()
+        stopped = threading.Event()
+        samples = []
+        if config.RESTREAM == 'mjpeg':
+            viewer = threading.Thread(target=watch_mjpeg, args=(processor.restream.url, stopped, samples))
+        else:
+            viewer = threading.Thread(target=watch_hls, args=(processor.restream.directory, stopped, samples))
+        viewer.daemon = True
+        viewer.start()
+        if outage:
+            time.sleep(duration / 3)
+            server.outage(outage)
+            time.sleep(duration * 2 / 3 - outage)
+        else:
+            time.sleep(duration)
+        stopped.set()
+        processor.stop()
+        worker.join()
+        capture = processor.video.stats()
+        restream = processor.restream.metrics()
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+    if not samples:
+        return None
+    arrivals = np.array([t for t, _ in samples])
+    ages = np.array([age for t, age in samples if t >= arrivals[0] + WARMUP]) * 1000
+    return {
+        'output_fps': len(ages) / max(1e-9, arrivals[-1] - arrivals[0] - WARMUP) if settings['RESTREAM'] == 'mjpeg' else None,
+        'p50_ms': np.percentile(ages, 50),
+        'p95_ms': np.percentile(ages, 95),
+        'max_ms': ages.max(),
+        'max_gap_s': np.diff(arrivals).max() if len(arrivals) > 1 else 0.0,
+        'dropped': capture['dropped_frames'],
+        'captured': capture['captured_frames'],
+        'reconnects': capture['reconnects'],
+        'restream_dropped': restream['restream_dropped'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per run')
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--fps', type=float, default=30.0, help='rate the stand-in camera sends at')
+    parser.add_argument('--detect-ms', type=float, default=45.0, help='extra detector time per frame')
+    parser.add_argument('--outage', type=float, default=2.0, help='seconds the stream is down in the outage run')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # video_processor set INFO on import
+    width, height = (int(v) for v in args.size.split('x'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_traffic_clip(os.path.join(tmp, 'clip.mp4'), width=width, height=height, frames=150,
+                                  fps=args.fps, vehicles=4)
+        server = ReplayServer(clip['path'], fps=args.fps)
+        common = {
+            'RESTREAM_PORT': 0,
+            'ADAPTIVE_DETECTION': False,
+            'DETECTION_INTERVAL': 1,
+            'VEHICLE_SUMMARY_FILE': None,
+            'CAPTURE_RECONNECT_INITIAL': 0.25,
+            'CAPTURE_RECONNECT_MAX': 1.0,
+        }
+        runs = [
+            ('mjpeg, latest', {'RESTREAM': 'mjpeg', 'CAPTURE_DROP_POLICY': 'latest'}, None),
+            ('mjpeg, block', {'RESTREAM': 'mjpeg', 'CAPTURE_DROP_POLICY': 'block'}, None),
+            (f'hls {config.HLS_SEGMENT_SECONDS:g}s segments, latest',
+             {'RESTREAM': 'hls', 'CAPTURE_DROP_POLICY': 'latest'}, None),
+            (f'mjpeg, latest, {args.outage:g}s outage', {'RESTREAM': 'mjpeg', 'CAPTURE_DROP_POLICY': 'latest'},
+             args.outage),
+        ]
+        print(f"{args.size} at {args.fps:g} fps from {server.url}, detector {args.detect_ms:g} ms/frame, "
+              f"{args.duration:g}s per run")
+        print(f"{'run':<30} {'out fps':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'max gap s':>10} "
+              f"{'dropped':>12} {'reconnects':>11}")
+        for i, (name, settings, outage) in enumerate(runs):
+            result = run(server, os.path.join(tmp, f'run{i}'), {**common, **settings}, args.duration,
+                         args.detect_ms, outage)
+            if result is None:
+                print(f"{name:<30} no output")
+                continue
+            fps = '-' if result['output_fps'] is None else f"{result['output_fps']:.1f}"
+            print(f"{name:<30} {fps:>8} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+                  f"{result['max_ms']:>8.0f} {result['max_gap_s']:>10.2f} "
+                  f"{result['dropped']:>5}/{result['captured']:<6} {result['reconnects']:>11}")
+        server.close()
+        print("HLS latency is to the segment being listed; players buffer about three more segments")
+
+
+if __name__ == '__main__':
+    main()
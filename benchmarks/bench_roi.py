@@ -0,0 +1,85 @@
+"""Detector latency with region-of-interest cropping and tiling.
+
+Runs VehicleDetector over frames of a synthetic clip with the full frame,
+the bounding box of a road band, and that band split into tiles, and
+reports the share of pixels sent to the model and the mean detect() time.
+With the default yolov8n.pt unavailable, pass --model yolov8n.yaml to time
+randomly initialised weights (same architecture, same cost).
+
+    python -m benchmarks.bench_roi --sizes 1280x720 1920x1080 --tile-width 640
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import config
+from detector import VehicleDetector
+from benchmarks.synthetic import write_clip
+
+
+def road_band(width, height, top, bottom):
+    """Trapezoid covering rows top..bottom (fractions of the height), narrowing upwards"""
+    y0, y1 = int(height * top), int(height * bottom)
+    inset = int(width * 0.15)
+    return [(inset, y0), (width - inset, y0), (width, y1), (0, y1)]
+
+
+def read_frames(width, height, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip.mp4')
+        write_clip(path, width=width, height=height, frames=count)
+        cap = cv2.VideoCapture(path)
+        frames = []
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def time_detector(frames, polygon, tile_width):
+    config.ROI_POLYGON, config.ROI_TILE_WIDTH = polygon, tile_width
+    detector = VehicleDetector()
+    detector.detect(frames[0], 0.0)  # Warm-up: model fusing and allocation
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        detector.detect(frame, i / 30.0)
+    elapsed = time.perf_counter() - start
+    return detector.roi, elapsed / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['1280x720', '1920x1080'])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--top', type=float, default=0.35, help='road band top, fraction of height')
+    parser.add_argument('--bottom', type=float, default=0.85, help='road band bottom')
+    parser.add_argument('--tile-width', type=int, default=640)
+    parser.add_argument('--model', default=None, help='override config.YOLO_MODEL')
+    args = parser.parse_args()
+
+    saved = config.YOLO_MODEL, config.ROI_POLYGON, config.ROI_TILE_WIDTH
+    if args.model:
+        config.YOLO_MODEL = args.model
+    print(f"{'size':>10} {'mode':<6} {'tiles':>5} {'pixels':>7} {'ms/frame':>9} {'speedup':>8}")
+    try:
+        for size in args.sizes:
+            width, height = (int(v) for v in size.split('x'))
+            frames = read_frames(width, height, args.frames)
+            band = road_band(width, height, args.top, args.bottom)
+            baseline = None
+            for mode, polygon, tile_width in [('full', None, None), ('crop', band, None),
+                                              ('tiled', band, args.tile_width)]:
+                roi, ms = time_detector(frames, polygon, tile_width)
+                baseline = baseline or ms
+                print(f"{size:>10} {mode:<6} {len(roi.tiles):>5} {roi.pixel_fraction():>7.0%} "
+                      f"{ms:>9.1f} {baseline / ms:>7.2f}x")
+    finally:
+        config.YOLO_MODEL, config.ROI_POLYGON, config.ROI_TILE_WIDTH = saved
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Streaming Kalman estimator vs the median/z-score estimator.
+
+Records stub-detector tracks from a synthetic clip with known speeds,
+optionally corrupts a fraction of the boxes with large jumps, and replays
+them through SpeedTracker and BatchSpeedTracker with each estimator and
+history window. Reports per-update cost, speed error against the truth,
+and the largest difference between the scalar and batched Kalman filters.
+
+    python -m benchmarks.bench_speed_estimator --outliers 0.05
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import warnings
+from dataclasses import replace
+import numpy as np
+import config
+from calibration import get_calibration
+from speed_tracker import SpeedTracker, BatchSpeedTracker
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.suite import match_truth
+from benchmarks.synthetic import write_traffic_clip
+
+SETUPS = [
+    ('median', 10),
+    ('median', 30),
+    ('median', 60),
+    ('kalman', 10),
+    ('kalman', 60),
+]
+
+
+def record_tracks(frames, vehicles, seed):
+    import cv2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        truth = write_traffic_clip(os.path.join(tmp, 'clip.mp4'), frames=frames,
+                                   vehicles=vehicles, seed=seed, min_speed=40, max_speed=90)
+        detector = ColorBlobDetector()
+        cap = cv2.VideoCapture(truth['path'])
+        recorded = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            detections = detector.detect(frame, timestamp)
+            matches = match_truth(detections, truth['boxes'][len(recorded)])
+            recorded.append((timestamp, detections, matches))
+        cap.release()
+    return recorded, truth
+
+
+def corrupt(recorded, fraction, seed):
+    """Move a fraction of boxes by 20-60 px, as a mis-detection or ID switch would"""
+    rng = np.random.default_rng(seed)
+    corrupted = []
+    for timestamp, detections, matches in recorded:
+        noisy = []
+        for det in detections:
+            if rng.random() < fraction:
+                dx, dy = rng.uniform(20, 60, 2) * rng.choice([-1, 1], 2)
+                x1, y1, x2, y2 = det.bbox
+                det = replace(det, bbox=(x1 + dx, y1 + dy, x2 + dx, y2 + dy))
+            noisy.append(det)
+        corrupted.append((timestamp, noisy, matches))
+    return corrupted
+
+
+def replay(recorded, truth, frame_size, batch):
+    frame_width, frame_height = frame_size
+    calibration = get_calibration(frame_height, config.__dict__, frame_width)
+    tracker = BatchSpeedTracker(calibration=calibration) if batch else SpeedTracker(calibration=calibration)
+    errors = {}
+    updates = 0
+    speeds_log = []
+    start = time.perf_counter()
+    for timestamp, detections, matches in recorded:
+        if batch:
+            speeds = tracker.update_frame(detections, frame_height, timestamp)
+        else:
+            speeds = {d.track_id: tracker.update(d, frame_height, timestamp) for d in detections}
+        updates += len(detections)
+        speeds_log.append(speeds)
+        for i, vehicle in matches.items():
+            speed = speeds[detections[i].track_id]
+            if speed > 0:
+                errors.setdefault(vehicle, []).append(speed - truth['speeds_kmh'][vehicle])
+    elapsed = time.perf_counter() - start
+    # Error of what each vehicle reads over the second half of its track
+    settled = [np.median(np.abs(e[len(e) // 2:])) for e in errors.values() if e]
+    return {
+        'us_per_update': elapsed / max(updates, 1) * 1e6,
+        'mae': float(np.mean(settled)) if settled else float('nan'),
+        'p95': float(np.percentile(np.abs(np.concatenate([e for e in errors.values()])), 95)) if errors else float('nan'),
+        'speeds': speeds_log,
+    }
+
+
+def max_difference(a, b):
+    return max((abs(x[k] - y[k]) for x, y in zip(a, b) for k in x), default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--vehicles', type=int, default=6)
+    parser.add_argument('--outliers', type=float, nargs='+', default=[0.0, 0.05],
+                        help='fraction of boxes to corrupt')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger('speed_calculator').setLevel(logging.ERROR)
+    # scipy's z-score warns on windows with identical speeds
+    warnings.filterwarnings('ignore', category=RuntimeWarning)
+
+    recorded, truth = record_tracks(args.frames, args.vehicles, args.seed)
+    frame_size = (1280, 720)  # write_traffic_clip's default
+    estimator, buffer = config.SPEED_ESTIMATOR, config.FRAME_BUFFER
+    print(f"{'outliers':>8} {'estimator':<9} {'window':>6} {'per-det us':>11} {'batch us':>9} "
+          f"{'MAE km/h':>9} {'p95 km/h':>9}")
+    try:
+        for fraction in args.outliers:
+            tracks = corrupt(recorded, fraction, args.seed) if fraction else recorded
+            for name, window in SETUPS:
+                config.SPEED_ESTIMATOR, config.FRAME_BUFFER = name, window
+                scalar = replay(tracks, truth, frame_size, batch=False)
+                batch = replay(tracks, truth, frame_size, batch=True)
+                note = ''
+                if name == 'kalman':
+                    note = f"  scalar vs batch max |diff| {max_difference(scalar['speeds'], batch['speeds']):.1e}"
+                print(f"{fraction:>8.0%} {name:<9} {window:>6} {scalar['us_per_update']:>11.1f} "
+                      f"{batch['us_per_update']:>9.1f} {scalar['mae']:>9.2f} {scalar['p95']:>9.2f}{note}")
+    finally:
+        config.SPEED_ESTIMATOR, config.FRAME_BUFFER = estimator, buffer
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Per-frame cost of BatchSpeedTracker vs per-detection SpeedTracker.update.
+
+Both trackers see identical synthetic tracks and timestamps; the script
+also reports the largest difference between their speeds.
+
+    python -m benchmarks.bench_speed_tracker --tracks 10 50 100 --frames 300
+"""
+import argparse
+import time
+import numpy as np
+import config
+from calibration import get_calibration
+from detector import Detection
+from speed_tracker import SpeedTracker, BatchSpeedTracker
+
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+
+
+def synthetic_frames(n_tracks, n_frames, fps=30.0, seed=0):
+    """Yield (timestamp, detections) with noisy constant-velocity boxes"""
+    rng = np.random.default_rng(seed)
+    starts = np.column_stack([rng.uniform(0, 1200, n_tracks), rng.uniform(200, 650, n_tracks)])
+    velocities = rng.uniform(-8, 8, size=(n_tracks, 2))
+    sizes = rng.uniform(40, 120, size=n_tracks)
+    for frame in range(n_frames):
+        # Jittered frame clock, with the odd duplicate timestamp
+        timestamp = frame / fps + rng.normal(0, 0.002)
+        centres = starts + velocities * frame + rng.normal(0, 1.5, size=(n_tracks, 2))
+        detections = [
+            Detection(
+                track_id=i,
+                class_name='Car',
+                bbox=(cx - sizes[i] / 2, cy - sizes[i] / 4, cx + sizes[i] / 2, cy + sizes[i] / 4),
+                confidence=0.9
+            )
+            for i, (cx, cy) in enumerate(centres)
+        ]
+        yield timestamp, detections
+
+
+def run(n_tracks, n_frames):
+    frames = list(synthetic_frames(n_tracks, n_frames))
+    calibration = get_calibration(FRAME_HEIGHT, config.__dict__, FRAME_WIDTH)
+    per_detection = SpeedTracker(calibration=calibration)
+    batch = BatchSpeedTracker(max_tracks=max(config.MAX_TRACKS, n_tracks), calibration=calibration)
+
+    start = time.perf_counter()
+    expected = []
+    for timestamp, detections in frames:
+        expected.append([per_detection.update(d, FRAME_HEIGHT, timestamp) for d in detections])
+    per_detection_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = []
+    for timestamp, detections in frames:
+        speeds = batch.update_frame(detections, FRAME_HEIGHT, timestamp)
+        actual.append([speeds[d.track_id] for d in detections])
+    batch_time = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(np.array(expected) - np.array(actual))))
+    return per_detection_time / n_frames * 1000, batch_time / n_frames * 1000, max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tracks', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'tracks':>6} {'per-det ms/frame':>17} {'batch ms/frame':>15} {'speedup':>8} {'max |diff|':>11}")
+    for n in args.tracks:
+        per_det, batch, diff = run(n, args.frames)
+        print(f"{n:>6} {per_det:>17.3f} {batch:>15.3f} {per_det / batch:>7.1f}x {diff:>11.2e}")
+
+
+if __name__ == '__main__':
+    main()
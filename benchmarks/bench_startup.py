@@ -0,0 +1,125 @@
+"""Time to first processed frame, from a cold interpreter and from a warm worker.
+
+Each cold run starts a fresh Python process that does what main.py does
+(import video_processor, build a VideoProcessor) and then reads and
+detects the first frame; the clock runs from process launch to that
+frame's detections. "eager imports" first imports ultralytics, scipy.stats
+and openpyxl, as the modules did before they were made lazy. The warm rows
+run short clips through one batch_processor.WorkerPool, where every clip
+after the first reuses the loaded model.
+
+    python -m benchmarks.bench_startup --model yolov8n.pt --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import config
+from benchmarks.synthetic import write_clip
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import time, json
+start = time.perf_counter()
+import config
+config.__dict__.update({settings!r})
+if {eager!r}:
+    import ultralytics, scipy.stats, openpyxl
+import video_processor
+imported = time.perf_counter()
+processor = video_processor.VideoProcessor({clip!r})
+loaded = time.perf_counter()
+ret, frame, timestamp = processor.video.read_timestamped()
+processor._detect(timestamp)
+done = time.perf_counter()
+print(json.dumps({{"import": imported - start, "load": loaded - imported, "first_frame": done - loaded}}),
+      flush=True)
+processor.video.release()
+'''
+
+
+def cold_start(clip, settings, eager):
+    """(seconds from launch to first detections, child's own split)"""
+    code = CHILD.format(settings=settings, eager=eager, clip=clip)
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, text=True)
+    for line in child.stdout:
+        if line.startswith('{'):
+            elapsed = time.perf_counter() - start
+            child.wait()
+            return elapsed, json.loads(line)
+    child.wait()
+    raise RuntimeError(f"Child process failed with exit code {child.returncode}")
+
+
+def warm_jobs(clips, tmp):
+    """Seconds per clip through one single-worker pool; the first includes loading"""
+    from batch_processor import BatchProcessor, WorkerPool
+
+    times = []
+    start = time.perf_counter()
+    with WorkerPool(1) as pool:
+        for i, clip in enumerate(clips):
+            BatchProcessor(clip).run(os.path.join(tmp, f'job{i}.jsonl'), pool)
+            times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None, help='override config.YOLO_MODEL')
+    parser.add_argument('--runs', type=int, default=3, help='cold starts per mode (median reported)')
+    parser.add_argument('--jobs', type=int, default=4, help='clips through the warm worker')
+    parser.add_argument('--size', default='1280x720')
+    args = parser.parse_args()
+    model = os.path.abspath(args.model) if args.model else config.YOLO_MODEL
+    width, height = (int(v) for v in args.size.split('x'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_clip(os.path.join(tmp, 'clip.mp4'), width=width, height=height, frames=5)
+        base = {
+            'YOLO_MODEL': model,
+            'MODEL_CACHE_DIR': os.path.join(tmp, 'model_cache'),
+            'VIOLATION_LOG_FILE': os.path.join(tmp, 'violations.csv'),
+            'VIOLATION_EXPORT_FILE': os.path.join(tmp, 'violations.xlsx'),
+            'VEHICLE_SUMMARY_FILE': os.path.join(tmp, 'summaries.jsonl'),
+        }
+        modes = [
+            ('eager imports, ultralytics', dict(base), True),
+            ('lazy imports, ultralytics', dict(base), False),
+            ('lazy imports, onnx + iou tracker',
+             dict(base, DETECTOR_BACKEND='onnx', DETECTION_TRACKER='iou'), False),
+        ]
+        try:
+            import onnxruntime  # noqa: F401
+            from detector_backends import cached_onnx_model
+            config.YOLO_MODEL = model
+            cached_onnx_model(model, cache_dir=base['MODEL_CACHE_DIR'])  # Cold export isn't startup
+        except ImportError:
+            print("onnxruntime not installed; onnx mode skipped")
+            modes = modes[:2]
+
+        print(f"{'mode':<34} {'to first frame s':>17} {'import s':>9} {'load s':>7} {'frame s':>8}")
+        for name, settings, eager in modes:
+            runs = sorted((cold_start(clip, settings, eager) for _ in range(args.runs)),
+                          key=lambda run: run[0])
+            total, split = runs[len(runs) // 2]
+            print(f"{name:<34} {total:>17.2f} {split['import']:>9.2f} {split['load']:>7.2f} "
+                  f"{split['first_frame']:>8.2f}")
+
+        clips = [write_clip(os.path.join(tmp, f'job{i}.mp4'), width=width, height=height, frames=1, seed=i)
+                 for i in range(args.jobs)]
+        config.__dict__.update(base)
+        times = warm_jobs(clips, tmp)
+        print(f"warm worker, 1-frame clips: first job {times[0]:.2f}s (loads the model), "
+              f"later jobs {sum(times[1:]) / max(len(times) - 1, 1):.2f}s each")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Aggregate throughput and recovery of the multi-camera supervisor, with files as cameras.
+
+Renders one synthetic clip per camera and runs them, looped, under
+supervisor.Supervisor: a process per camera with and without CPU pinning
+and, with --model, one shared batched model. Reports aggregate and
+per-camera fps. The fault run adds a camera whose source doesn't exist
+and freezes one worker with SIGSTOP part way through, then reports
+restarts, stalls and how long the frozen camera took to produce frames
+again. "steady fps" counts the second half of a run only, after every
+worker has loaded its model. Uses the stub detector unless --model is
+given.
+
+    python -m benchmarks.bench_supervisor --cameras 3 --duration 20
+    python -m benchmarks.bench_supervisor --model yolov8n.pt --detector-width 640
+"""
+import argparse
+import logging
+import os
+import signal
+import tempfile
+import threading
+import time
+import config
+from supervisor import Supervisor
+from benchmarks.synthetic import write_traffic_clip
+
+STUB = 'benchmarks.stub_detector:ColorBlobDetector'
+
+
+def freeze(worker, after, recovered):
+    """SIGSTOP the worker ``after`` seconds in, once it produces frames; record when frames resume"""
+    time.sleep(after)
+    while not worker.frames.value:
+        time.sleep(0.05)
+    frames = worker.frames.value
+    os.kill(worker.process.pid, signal.SIGSTOP)
+    stopped = time.time()
+    while time.time() - stopped < 120:
+        time.sleep(0.05)
+        if worker.frames.value > frames:
+            recovered.append(time.time() - stopped)
+            return
+
+
+def run(cameras, defaults, directory, mode, pin, duration, fault=False):
+    supervisor = Supervisor(cameras, defaults, directory, mode, pin_cpus=pin)
+    recovered = []
+    if fault:
+        thread = threading.Thread(target=freeze, args=(supervisor.workers[0], duration / 3, recovered),
+                                  daemon=True)
+        thread.start()
+    status = supervisor.run(duration)
+    return status, recovered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cameras', type=int, default=3)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per run')
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--model', default=None, help='run YOLO (and shared mode) instead of the stub')
+    parser.add_argument('--detector-width', type=int, default=None, help='INFERENCE_WIDTH for the cameras')
+    parser.add_argument('--stall-timeout', type=float, default=3.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)  # Before video_processor sets INFO
+    width, height = (int(v) for v in args.size.split('x'))
+    config.SUPERVISOR_STALL_TIMEOUT = args.stall_timeout
+    config.SUPERVISOR_REPORT_INTERVAL = args.duration / 2  # The final report covers the second half
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cameras = []
+        for i in range(args.cameras):
+            clip = write_traffic_clip(os.path.join(tmp, f'cam{i}.mp4'), width=width, height=height,
+                                      frames=150, vehicles=4, seed=i)
+            camera = {'name': f'cam{i}', 'source': clip['path'], 'loop': True}
+            if not args.model:
+                camera['detector'] = STUB
+            cameras.append(camera)
+        defaults = {'VEHICLE_SUMMARY_FILE': None}
+        if args.model:
+            defaults['YOLO_MODEL'] = os.path.abspath(args.model)
+        if args.detector_width:
+            defaults['INFERENCE_WIDTH'] = args.detector_width
+
+        runs = [('process, pinned', 'process', True), ('process, unpinned', 'process', False)]
+        if args.model:
+            runs.append(('shared batched model', 'shared', False))
+        print(f"{args.cameras} cameras, {args.size}, {os.cpu_count()} cpus, "
+              f"{'model ' + args.model if args.model else 'stub detector'}, {args.duration:.0f}s per run")
+        print(f"{'mode':<22} {'mean fps':>9} {'steady fps':>11} {'steady per camera':>24} {'restarts':>9}")
+        for name, mode, pin in runs:
+            status = run(cameras, defaults, os.path.join(tmp, name.replace(' ', '')), mode, pin,
+                         args.duration)[0]
+            per_camera = ' '.join(f"{c['fps']:.1f}" for c in status['cameras'].values())
+            print(f"{name:<22} {status['mean_fps']:>9.1f} {status['fps']:>11.1f} {per_camera:>24} "
+                  f"{status['restarts']:>9}")
+
+        broken = {'name': 'broken', 'source': os.path.join(tmp, 'missing.mp4'), 'detector': STUB}
+        status, recovered = run(cameras + [broken], defaults, os.path.join(tmp, 'fault'), 'process', True,
+                                args.duration, fault=True)
+        frozen = status['cameras']['cam0']
+        recovery = f"{recovered[0]:.1f}s" if recovered else 'not recovered'
+        print(f"fault run: cam0 frozen at {args.duration / 3:.0f}s -> {frozen['stalls']} stall(s), "
+              f"frames again after {recovery} (stall timeout {args.stall_timeout:.0f}s); "
+              f"missing source restarted {status['cameras']['broken']['restarts']} times with backoff; "
+              f"{status['mean_fps']:.1f} fps total")
+
+
+if __name__ == '__main__':
+    main()
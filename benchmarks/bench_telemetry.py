@@ -0,0 +1,165 @@
+"""Telemetry ingest rate and query latency over a synthetic month of traffic.
+
+Feeds a month of vehicles (diurnal volume, per-type speeds, a few lanes
+and cameras) through one TelemetryWriter per camera, exactly as
+VideoProcessor calls it: ``observe`` once per sampled point and
+``log_vehicle`` when each track ends. Reports rows per second, the time
+the calls take on the processing loop, files and bytes on disk. Then
+times typical questions through TelemetryStore (partition pruning,
+row-group statistics, memory-mapped reads of only the needed columns)
+on the hourly files as written and again after ``compact`` has merged
+each day, against reading the whole dataset and filtering in pandas.
+
+    python -m benchmarks.bench_telemetry --days 30 --vehicles-per-hour 300
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pyarrow.dataset as ds
+import config
+from detector import Detection
+from telemetry import PARTITIONING, SCHEMAS, TelemetryStore, TelemetryWriter
+from track_store import TrackSummary
+
+TYPES = ['Car', 'Truck', 'Bus', 'Motorcycle']
+TYPE_SHARE = [0.8, 0.1, 0.03, 0.07]
+TYPE_SPEED = {'Car': (95, 15), 'Truck': (80, 8), 'Bus': (75, 8), 'Motorcycle': (100, 20)}
+LANES = ['lane1', 'lane2', 'lane3']
+
+
+def ingest(directory, start, days, per_hour, cameras, points, seed):
+    """(rows written, seconds in writer calls, seconds in total)"""
+    rng = np.random.default_rng(seed)
+    writers = [TelemetryWriter(directory, camera=f'cam{c}', sample_interval=1.0, origin=start)
+               for c in range(cameras)]
+    next_id = [1] * cameras
+    rows = 0
+    in_calls = 0.0
+    begin = time.perf_counter()
+    for hour in range(days * 24):
+        # Quiet nights, busy afternoons
+        volume = per_hour * (0.55 + 0.45 * np.sin((hour % 24 - 9) / 24 * 2 * np.pi))
+        for c, writer in enumerate(writers):
+            count = rng.poisson(volume / cameras)
+            entries = hour * 3600 + np.sort(rng.uniform(0, 3600 - points - 1, count))
+            kinds = rng.choice(len(TYPES), count, p=TYPE_SHARE)
+            lanes = rng.integers(0, len(LANES), count)
+            for entry, kind, lane in zip(entries.tolist(), kinds.tolist(), lanes.tolist()):
+                vehicle_type = TYPES[kind]
+                mean, std = TYPE_SPEED[vehicle_type]
+                speeds = np.clip(rng.normal(mean, std) + rng.normal(0, 2, points), 5, None).tolist()
+                track_id = next_id[c]
+                next_id[c] += 1
+                detection = Detection(track_id, vehicle_type, (100.0, 200.0, 220.0, 240.0), 0.9,
+                                      lane=LANES[lane])
+                call = time.perf_counter()
+                for i, speed in enumerate(speeds):
+                    writer.observe([detection], {track_id: speed}, entry + i)
+                in_calls += time.perf_counter() - call
+                summary = TrackSummary(track_id, vehicle_type, entry, entry + points - 1, points * 10,
+                                       max(speeds), float(np.median(speeds)), 120.0, max(speeds) > 120.0,
+                                       'expired')
+                call = time.perf_counter()
+                writer.log_vehicle(summary)
+                in_calls += time.perf_counter() - call
+                rows += points + 1
+    for writer in writers:
+        writer.close()
+    return rows, in_calls, time.perf_counter() - begin
+
+
+def full_scan(directory, table):
+    """Everything in the table as a DataFrame: the no-pushdown baseline"""
+    return ds.dataset(os.path.join(directory, table), schema=SCHEMAS[table], format='parquet',
+                      partitioning=PARTITIONING).to_table().to_pandas()
+
+
+def disk_usage(directory):
+    """(files, bytes) under directory"""
+    files = [os.path.join(d, f) for d, _, names in os.walk(directory) for f in names]
+    return len(files), sum(os.path.getsize(f) for f in files)
+
+
+def timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--vehicles-per-hour', type=int, default=300, help='all cameras together')
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--points', type=int, default=5, help='speed points per vehicle')
+    parser.add_argument('--runs', type=int, default=5, help='runs per query (median reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    start = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows, in_calls, elapsed = ingest(tmp, start.timestamp(), args.days, args.vehicles_per_hour,
+                                         args.cameras, args.points, args.seed)
+        files, size = disk_usage(tmp)
+        print(f"{args.days} days, {args.cameras} cameras, ~{args.vehicles_per_hour} vehicles/h, "
+              f"{args.points} points per vehicle; row group {config.TELEMETRY_BATCH_ROWS} rows")
+        print(f"ingest: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s incl. generating them), "
+              f"{in_calls / rows * 1e6:.2f} us per row on the processing loop; "
+              f"{files} files, {size / 2**20:.1f} MB ({size / rows:.1f} bytes/row)")
+
+        store = TelemetryStore(tmp)
+        day = start + timedelta(days=min(10, args.days - 1))
+        week = (start + timedelta(days=7), start + timedelta(days=min(14, args.days)))
+        month = (start, start + timedelta(days=args.days))
+        tracks = lambda: full_scan(tmp, 'tracks')  # noqa: E731
+        points = lambda: full_scan(tmp, 'points')  # noqa: E731
+
+        def scan_volume():
+            frame = tracks()
+            frame = frame[(frame['time'] >= day) & (frame['time'] < day + timedelta(days=1))]
+            return frame.groupby([frame['time'].dt.floor('h'), 'vehicle_type']).size()
+
+        def scan_speeds():
+            frame = tracks()
+            frame = frame[(frame['time'] >= week[0]) & (frame['time'] < week[1]) & (frame['camera'] == 'cam1')]
+            return frame.groupby('lane')['median_speed'].describe(percentiles=[0.5, 0.85, 0.95])
+
+        def scan_mix():
+            return tracks()['vehicle_type'].value_counts()
+
+        def scan_points():
+            frame = points()
+            frame = frame[frame['lane'] == 'lane2']
+            return frame.groupby('vehicle_type')['speed'].describe(percentiles=[0.5, 0.85, 0.95])
+
+        queries = [
+            ('hourly volume, 1 day', lambda: store.hourly_volume(day, day + timedelta(days=1)), scan_volume),
+            ('lane speeds, 1 camera, 1 week',
+             lambda: store.speed_distribution(*week, by='lane', camera='cam1'), scan_speeds),
+            ('class mix, whole range', lambda: store.class_mix(*month), scan_mix),
+            ('point speeds by type, 1 lane, whole range',
+             lambda: store.speed_distribution(*month, by='vehicle_type', table='points', lane='lane2'),
+             scan_points),
+        ]
+        hourly = [timed(query, args.runs) for _, query, _ in queries]
+        scans = [timed(scan, args.runs)[0] for _, _, scan in queries]
+        begin = time.perf_counter()
+        store.compact(month[1])
+        elapsed = time.perf_counter() - begin
+        files, size = disk_usage(tmp)
+        print(f"compact: {elapsed:.1f}s, now {files} files, {size / 2**20:.1f} MB ({size / rows:.1f} bytes/row)")
+        print(f"{'query':<44} {'hourly ms':>10} {'compacted ms':>13} {'full scan ms':>13} {'rows out':>9}")
+        for (name, query, _), (hourly_ms, result), scan_ms in zip(queries, hourly, scans):
+            compacted_ms, compacted = timed(query, args.runs)
+            assert len(compacted) == len(result)
+            print(f"{name:<44} {hourly_ms:>10.1f} {compacted_ms:>13.1f} {scan_ms:>13.1f} {len(result):>9}")
+
+
+if __name__ == '__main__':
+    main()
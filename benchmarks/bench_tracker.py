@@ -0,0 +1,97 @@
+"""Tracker update time vs number of objects: IoUTracker against ultralytics ByteTrack.
+
+Simulates vehicles moving at constant velocity with box jitter, missed
+detections and shuffled detection order, feeds the same boxes to each
+tracker and reports mean update time per frame, ID switches (a vehicle
+reported under a different ID than before) and distinct IDs handed out.
+Also times IoUTracker.predict, which moves tracks on skipped frames.
+
+    python -m benchmarks.bench_tracker --objects 10 50 100 200
+"""
+import argparse
+import time
+import numpy as np
+from detector import StreamTracker
+from tracker import IoUTracker
+
+
+def simulate(objects, frames, fps, rng, width=3840, height=2160, miss_rate=0.1):
+    """Per frame: (rows, truth) with rows (n, 6) in random order and truth the vehicle of each row"""
+    size = np.array([80.0, 40.0])
+    start = rng.uniform(0, 1, (objects, 2)) * [width, height]
+    velocity = rng.uniform(-200, 200, (objects, 2))
+    classes = rng.choice([2, 3, 5, 7], objects)
+    sequence = []
+    for i in range(frames):
+        position = start + velocity * i / fps
+        rows = np.column_stack([position, position + size, rng.uniform(0.5, 0.95, objects), classes])
+        rows[:, :4] += rng.normal(0, 1.0, (objects, 4))
+        visible = np.nonzero(rng.random(objects) >= miss_rate)[0]
+        visible = visible[rng.permutation(len(visible))]
+        sequence.append((rows[visible].astype(np.float32), visible))
+    return sequence
+
+
+def run(tracker, sequence, fps, wrap=None):
+    """(mean ms per update, ID switches, distinct IDs)"""
+    elapsed = 0.0
+    assigned = {}
+    switches = 0
+    for i, (rows, truth) in enumerate(sequence):
+        boxes = wrap(rows) if wrap else rows
+        start = time.perf_counter()
+        detections = tracker.update(boxes, timestamp=i / fps)
+        elapsed += time.perf_counter() - start
+        if not detections or not len(rows):
+            continue
+        # Detections come back in any order (ByteTrack reports smoothed boxes);
+        # the vehicle is the detected box with the nearest centre
+        centres = (rows[:, :2] + rows[:, 2:4]) / 2
+        for det in detections:
+            x1, y1, x2, y2 = det.bbox
+            distance = np.hypot(centres[:, 0] - (x1 + x2) / 2, centres[:, 1] - (y1 + y2) / 2)
+            nearest = int(distance.argmin())
+            if distance[nearest] > 10:
+                continue
+            vehicle = int(truth[nearest])
+            if vehicle in assigned and assigned[vehicle] != det.track_id:
+                switches += 1
+            assigned[vehicle] = det.track_id
+    return elapsed / len(sequence) * 1000, switches, len(set(assigned.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from ultralytics.engine.results import Boxes
+
+    def as_boxes(rows):
+        return Boxes(rows, (2160, 3840))
+
+    run(IoUTracker(), simulate(5, 3, args.fps, np.random.default_rng(0)), args.fps)  # Imports scipy
+    print(f"{'objects':>7} {'tracker':<18} {'update ms':>10} {'switches':>9} {'ids':>5} {'predict ms':>11}")
+    for objects in args.objects:
+        sequence = simulate(objects, args.frames, args.fps, np.random.default_rng(args.seed))
+        trackers = [
+            ('iou (hungarian)', IoUTracker(frame_rate=args.fps, assignment='hungarian'), None),
+            ('iou (greedy)', IoUTracker(frame_rate=args.fps, assignment='greedy'), None),
+            ('ultralytics byte', StreamTracker(frame_rate=args.fps), as_boxes),
+        ]
+        for name, tracker, wrap in trackers:
+            update_ms, switches, ids = run(tracker, sequence, args.fps, wrap)
+            predict_text = f"{'-':>11}"
+            if hasattr(tracker, 'predict'):
+                start = time.perf_counter()
+                for _ in range(100):
+                    tracker.predict(args.frames / args.fps)
+                predict_text = f"{(time.perf_counter() - start) * 10:>11.3f}"
+            print(f"{objects:>7} {name:<18} {update_ms:>10.3f} {switches:>9} {ids:>5} {predict_text}")
+
+
+if __name__ == '__main__':
+    main()
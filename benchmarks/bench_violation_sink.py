@@ -0,0 +1,94 @@
+"""Per-violation latency and sustained throughput of SpeedLogger backends.
+
+Compares the original load_workbook/save-per-violation logger with the
+buffered csv, jsonl and sqlite sinks.
+
+    python -m benchmarks.bench_violation_sink --count 500
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from data_logger import SpeedLogger
+
+
+class LegacyExcelLogger:
+    """The original per-violation load_workbook/save implementation"""
+
+    def __init__(self, filename):
+        from openpyxl import Workbook
+        self.filename = filename
+        wb = Workbook()
+        wb.active.append(["Timestamp", "Vehicle Type", "Speed", "Speed Limit", "Excess"])
+        wb.save(filename)
+
+    def log_violation(self, vehicle_type, speed):
+        from openpyxl import load_workbook
+        wb = load_workbook(self.filename)
+        ws = wb.active
+        ws.append([
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            vehicle_type.capitalize(),
+            f"{speed:.1f} km/h",
+            "120 km/h",
+            f"{speed - 120:.1f} km/h"
+        ])
+        wb.save(self.filename)
+
+    def save(self):
+        pass
+
+
+def run(logger, count):
+    latencies = np.empty(count)
+    start = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        logger.log_violation('car', 130.0 + i % 20)
+        latencies[i] = time.perf_counter() - t0
+    if hasattr(logger, 'flush'):
+        logger.flush()
+    elapsed = time.perf_counter() - start
+    return {
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'max_ms': float(latencies.max() * 1000),
+        'violations_per_s': count / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500, help='violations per backend')
+    parser.add_argument('--skip-legacy', action='store_true', help='skip the slow legacy backend')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        if not args.skip_legacy:
+            results['legacy-xlsx'] = run(LegacyExcelLogger(os.path.join(tmp, 'legacy.xlsx')), args.count)
+
+        for kind in ('csv', 'jsonl', 'sqlite'):
+            logger = SpeedLogger(
+                log_file=os.path.join(tmp, f'violations.{kind}'),
+                export_file=os.path.join(tmp, f'export-{kind}.xlsx'),
+                sink_kind=kind,
+                summary_file=os.path.join(tmp, f'vehicles-{kind}.jsonl')
+            )
+            results[kind] = run(logger, args.count)
+            t0 = time.perf_counter()
+            logger.save()
+            results[kind]['export_ms'] = (time.perf_counter() - t0) * 1000
+            logger.close()
+
+    print(f"{'backend':<12} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'viol/s':>10} {'export ms':>10}")
+    for name, r in results.items():
+        export = f"{r['export_ms']:.1f}" if 'export_ms' in r else '-'
+        print(f"{name:<12} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['max_ms']:>9.3f} "
+              f"{r['violations_per_s']:>10.0f} {export:>10}")
+
+
+if __name__ == '__main__':
+    main()
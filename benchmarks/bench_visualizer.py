@@ -0,0 +1,110 @@
+"""Overlay render time vs number of boxes: cached label sprites vs per-box text drawing.
+
+The legacy renderer below is the previous Visualizer.draw: two
+getTextSize calls, two filled rectangles and two putText calls per box.
+Also times drawing onto a PREVIEW_WIDTH-wide display frame, including the
+resize, and checks that both renderers put the same pixels on the frame.
+
+    python -m benchmarks.bench_visualizer --boxes 1 10 50 200
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from detector import Detection
+from visualizer import Visualizer
+
+CLASSES = ['Car', 'Bus', 'Truck', 'Motorcycle']
+
+
+def legacy_draw(frame, detection, speed, colors, limits):
+    x1, y1, x2, y2 = [int(c) for c in detection.bbox]
+    vehicle_color = colors.get(detection.class_name.lower(), (0, 255, 0))
+    speed_limit = limits[detection.class_name]
+    if speed < speed_limit * 0.8:
+        speed_color = (0, 255, 0)
+    elif speed < speed_limit:
+        speed_color = (0, 255, 255)
+    else:
+        speed_color = (0, 0, 255)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), vehicle_color, 2)
+    texts = [detection.class_name, f"{speed:.1f} km/h"]
+    for i, text in enumerate(texts):
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        text_y = y1 - 10 - (i * (text_h + 5))
+        cv2.rectangle(frame, (x1, text_y - text_h - 5), (x1 + text_w + 10, text_y + 5),
+                      vehicle_color if i == 0 else speed_color, -1)
+        cv2.putText(frame, text, (x1 + 5, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+
+def make_frames(count, boxes, width, height, rng):
+    """Per frame: detections drifting right and speeds wandering by ~0.5 km/h a frame"""
+    x = rng.uniform(0, width - 150, boxes)
+    y = rng.uniform(60, height - 60, boxes)
+    classes = rng.choice(CLASSES, boxes)
+    speed = rng.uniform(40, 140, boxes)
+    frames = []
+    for i in range(count):
+        detections = [Detection(track_id=t, class_name=str(c), bbox=(a + i, b, a + i + 120, b + 50),
+                                confidence=0.9)
+                      for t, (c, a, b) in enumerate(zip(classes, x.tolist(), y.tolist()))]
+        speed = speed + rng.normal(0, 0.5, boxes)
+        speeds = {t: float(s) for t, s in enumerate(speed)}
+        frames.append((detections, speeds))
+    return frames
+
+
+def time_render(frames, image, render):
+    """Mean ms per frame, not counting the reset of the canvas between frames"""
+    canvas = image.copy()
+    elapsed = 0.0
+    for detections, speeds in frames:
+        canvas[:] = image
+        start = time.perf_counter()
+        render(canvas, detections, speeds)
+        elapsed += time.perf_counter() - start
+    return elapsed / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boxes', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--preview-width', type=int, default=960)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    rng = np.random.default_rng(args.seed)
+    image = np.full((height, width, 3), 90, dtype=np.uint8)
+    visualizer = Visualizer(preview_width=args.preview_width)
+    limits = {c: visualizer.speed_limit(c) for c in CLASSES}
+
+    def legacy(canvas, detections, speeds):
+        for det in detections:
+            legacy_draw(canvas, det, speeds[det.track_id], visualizer.colors, limits)
+
+    def preview(canvas, detections, speeds):
+        shown, scale = visualizer.preview(canvas)
+        visualizer.draw_all(shown, detections, speeds, scale)
+
+    print(f"{args.size}, preview {args.preview_width}px wide")
+    print(f"{'boxes':>6} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8} {'preview ms':>11} "
+          f"{'differing px':>13}")
+    for boxes in args.boxes:
+        frames = make_frames(args.frames, boxes, width, height, rng)
+        legacy_ms = time_render(frames, image, legacy)
+        batched_ms = time_render(frames, image, visualizer.draw_all)
+        preview_ms = time_render(frames, image, preview)
+
+        expected, actual = image.copy(), image.copy()
+        legacy(expected, *frames[-1])
+        visualizer.draw_all(actual, *frames[-1])
+        differing = int(np.count_nonzero(np.any(expected != actual, axis=2)))
+        print(f"{boxes:>6} {legacy_ms:>10.3f} {batched_ms:>11.3f} {legacy_ms / batched_ms:>7.1f}x "
+              f"{preview_ms:>11.3f} {differing:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Report whether speeds depend on processing speed.
+
+Replays a synthetic clip through ThreadedVideoCapture, the stub detector
+and the speed tracker while throttling the consumer to 0.25x-8x real time,
+and compares every run's speeds with the slowest. A wall-clock run is
+shown for comparison. tests/test_clock_replay.py asserts the same with
+``replay`` on a shorter clip.
+
+    python -m benchmarks.check_clock_replay
+"""
+import argparse
+import os
+import tempfile
+import time
+import config
+from calibration import get_calibration
+from clock import WallClock
+from speed_tracker import BatchSpeedTracker, SpeedTracker
+from video_capture import ThreadedVideoCapture
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.synthetic import write_clip
+
+
+def replay(clip, factor, tracker_cls, wall_clock=False):
+    """Run the clip with each frame taking 1 / (fps * factor) seconds to process"""
+    capture = ThreadedVideoCapture(clip)
+    clock = WallClock() if wall_clock else capture.clock
+    calibration = get_calibration(capture.frame_height, config.__dict__, capture.frame_width)
+    tracker = tracker_cls(clock=clock, calibration=calibration)
+    detector = ColorBlobDetector()
+    frame_time = 1.0 / (capture.fps * factor)
+    speeds = []
+    while True:
+        started = time.perf_counter()
+        ret, frame, timestamp = capture.read_timestamped()
+        if not ret or frame is None:
+            break
+        detections = detector.detect(frame, None if wall_clock else timestamp)
+        if isinstance(tracker, BatchSpeedTracker):
+            frame_speeds = tracker.update_frame(detections, capture.frame_height)
+        else:
+            frame_speeds = {d.track_id: tracker.update(d, capture.frame_height) for d in detections}
+        speeds.append(tuple(sorted(frame_speeds.items())))
+        remaining = frame_time - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+    capture.release()
+    return speeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=float, nargs='+', default=[0.25, 0.5, 1, 2, 4, 8])
+    parser.add_argument('--frames', type=int, default=45)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_clip(os.path.join(tmp, 'clip.mp4'), frames=args.frames)
+        for tracker_cls in (SpeedTracker, BatchSpeedTracker):
+            reference = replay(clip, args.factors[0], tracker_cls)
+            for factor in args.factors[1:]:
+                same = replay(clip, factor, tracker_cls) == reference
+                print(f"{tracker_cls.__name__:<18} {factor:>5}x vs {args.factors[0]}x: "
+                      f"{'identical' if same else 'DIFFERENT'}")
+
+        slow = replay(clip, args.factors[0], SpeedTracker, wall_clock=True)
+        fast = replay(clip, args.factors[-1], SpeedTracker, wall_clock=True)
+        print(f"{'wall clock':<18} {args.factors[-1]:>5}x vs {args.factors[0]}x: "
+              f"{'identical' if slow == fast else 'different (expected)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Stand-in network camera: replays a video file as a live MJPEG stream over HTTP.
+
+Frames are sent at the file's frame rate, looped, through
+restream.MjpegServer, so a client that falls behind misses frames just
+as with a real camera. Each frame can carry its send time as a strip of
+black and white cells along the bottom edge (``stamp_frame``); reading
+it back from the annotated output (``read_stamp``) gives glass-to-glass
+latency. ``outage`` drops every client and refuses connections for a
+while, to exercise reconnects.
+
+    python -m benchmarks.replay_server clip.mp4 --port 8554
+    python main.py http://127.0.0.1:8554/stream.mjpg
+"""
+import argparse
+import logging
+import threading
+import time
+import cv2
+from restream import MjpegServer
+
+STAMP_BITS = 32
+STAMP_COLUMNS = 64  # Cells across the full width; the stamp fills the left half
+STAMP_ROWS = 36  # Cell height as a fraction of the frame height
+
+
+def stamp_height(frame) -> int:
+    """Rows at the bottom of the frame taken by the stamp"""
+    return max(1, int(round(frame.shape[0] / STAMP_ROWS)))
+
+
+def stamp_frame(frame, now: float = None):
+    """Write ``now`` (wall time, ms mod 2**32) into the bottom-left corner, sized relative to the frame"""
+    value = int((time.time() if now is None else now) * 1000) % 2**STAMP_BITS
+    height, width = frame.shape[:2]
+    top = height - stamp_height(frame)
+    for bit in range(STAMP_BITS):
+        x0, x1 = int(bit * width / STAMP_COLUMNS), int((bit + 1) * width / STAMP_COLUMNS)
+        frame[top:, x0:x1] = 255 if value >> (STAMP_BITS - 1 - bit) & 1 else 0
+
+
+def read_stamp(frame) -> int:
+    """The stamp of a frame that may since have been resized or compressed"""
+    height, width = frame.shape[:2]
+    y = height - stamp_height(frame) // 2 - 1
+    value = 0
+    for bit in range(STAMP_BITS):
+        x = int((bit + 0.5) * width / STAMP_COLUMNS)
+        value = value << 1 | int(frame[y, x].mean() > 127)
+    return value
+
+
+def stamp_age(stamp: int, now: float = None) -> float:
+    """Seconds since the stamp was written"""
+    now_ms = int((time.time() if now is None else now) * 1000) % 2**STAMP_BITS
+    return ((now_ms - stamp) % 2**STAMP_BITS) / 1000.0
+
+
+class ReplayServer:
+    """Serves ``path`` on http://host:port/stream.mjpg in real time until closed"""
+
+    def __init__(self, path: str, port: int = 0, host: str = '127.0.0.1', fps: float = None,
+                 stamp: bool = True, quality: int = 80):
+        self.frames = []
+        cap = cv2.VideoCapture(path)
+        self.fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.frames.append(frame)
+        cap.release()
+        if not self.frames:
+            raise RuntimeError(f"No frames in {path}")
+        self.host = host
+        self.quality = quality
+        self.stamp = stamp
+        self.server = MjpegServer(port, host, quality)
+        self.port = self.server.port
+        self.url = self.server.url
+        self.sent = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        start = time.perf_counter()
+        while not self.stopped.is_set():
+            delay = start + self.sent / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            frame = self.frames[self.sent % len(self.frames)].copy()
+            if self.stamp:
+                stamp_frame(frame)
+            with self.lock:
+                if self.server is not None:
+                    self.server.publish(frame)
+            self.sent += 1
+
+    def outage(self, seconds: float):
+        """Disconnect every client and refuse connections for ``seconds``; blocks until back up"""
+        with self.lock:
+            server, self.server = self.server, None
+        server.close()
+        time.sleep(seconds)
+        server = MjpegServer(self.port, self.host, self.quality)
+        with self.lock:
+            self.server = server
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        with self.lock:
+            if self.server is not None:
+                self.server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--port', type=int, default=8554)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--fps', type=float, default=None, help="defaults to the file's")
+    parser.add_argument('--no-stamp', action='store_true', help="don't stamp send times into frames")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = ReplayServer(args.path, args.port, args.host, args.fps, stamp=not args.no_stamp)
+    print(f"Replaying {args.path} ({len(server.frames)} frames at {server.fps:g} fps) on {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
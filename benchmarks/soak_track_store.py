@@ -0,0 +1,109 @@
+"""Soak test: memory stays flat while millions of tracks come and go.
+
+Streams synthetic frames with --concurrent live vehicles, each visible for
+a random number of frames, through BatchSpeedTracker, TrackStore and
+SpeedLogger (writing to /dev/null) exactly as VideoProcessor wires them.
+Prints live-track counts and resident memory as tracks finish; both
+should level off after the first report.
+
+    python -m benchmarks.soak_track_store --tracks 1000000
+"""
+import argparse
+import logging
+import os
+import resource
+import time
+import warnings
+import numpy as np
+import config
+from calibration import get_calibration
+from data_logger import SpeedLogger
+from detector import Detection
+from speed_tracker import BatchSpeedTracker
+from track_store import TrackStore
+
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+FPS = 30.0
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=1000000, help='vehicles to simulate')
+    parser.add_argument('--concurrent', type=int, default=100, help='vehicles in view at once')
+    parser.add_argument('--report', type=int, default=100000, help='print every N finished tracks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger('speed_calculator').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', category=RuntimeWarning)
+
+    rng = np.random.default_rng(args.seed)
+    tracker = BatchSpeedTracker(calibration=get_calibration(FRAME_HEIGHT, config.__dict__, FRAME_WIDTH))
+    speed_logger = SpeedLogger(log_file=os.devnull, export_file=os.devnull, summary_file=os.devnull)
+    violations = []
+    store = TrackStore(on_evict=[
+        lambda s: tracker.remove(s.track_id),
+        speed_logger.log_vehicle,
+        lambda s: s.violation and violations.append(1),
+    ])
+
+    n = args.concurrent
+    ids = np.arange(n)
+    next_id = n
+    remaining = rng.integers(10, 60, n)  # Frames left in view
+    x = rng.uniform(0, 1100, n)
+    y = rng.uniform(150, 400, n)
+    vx = rng.uniform(2, 20, n)
+
+    print(f"{'tracks ended':>12} {'frames':>9} {'store':>6} {'tracker':>8} {'rss MB':>8} "
+          f"{'violations':>10} {'frames/s':>9}")
+    frame = 0
+    next_report = args.report
+    start = time.perf_counter()
+    while store.ended < args.tracks:
+        timestamp = frame / FPS
+        x1 = x + vx * (frame % 1000)
+        detections = [
+            Detection(track_id=int(t), class_name='Car', bbox=(a, b, a + 80, b + 40),
+                      confidence=0.9, timestamp=timestamp)
+            for t, a, b in zip(ids.tolist(), (x1 % 1100).tolist(), y.tolist())
+        ]
+        speeds = tracker.update_frame(detections, FRAME_HEIGHT)
+        store.observe(detections, speeds, timestamp)
+        store.expire(timestamp)
+
+        # Vehicles leave; new ones take their place
+        remaining -= 1
+        done = remaining <= 0
+        count = int(done.sum())
+        if count:
+            ids[done] = np.arange(next_id, next_id + count)
+            next_id += count
+            remaining[done] = rng.integers(10, 60, count)
+            x[done] = rng.uniform(0, 1100, count)
+            y[done] = rng.uniform(150, 400, count)
+            vx[done] = rng.uniform(2, 20, count)
+        frame += 1
+
+        if store.ended >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"{store.ended:>12} {frame:>9} {len(store):>6} {tracker.track_count():>8} "
+                  f"{rss_mb():>8.1f} {len(violations):>10} {frame / elapsed:>9.0f}")
+            next_report += args.report
+
+    store.flush()
+    speed_logger.close()
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB, "
+          f"writer dropped {speed_logger.writer.dropped} violation records")
+
+
+if __name__ == '__main__':
+    main()
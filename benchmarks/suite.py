@@ -0,0 +1,227 @@
+"""End-to-end benchmark suite with ground-truth speeds and regression checks.
+
+Each scenario renders a synthetic traffic clip with known vehicle speeds
+(benchmarks.synthetic.write_traffic_clip), then runs capture -> detect ->
+track -> draw -> log on it in a fresh process and records end-to-end
+fps, per-stage latency, peak RSS, and how far measured speeds are from
+the truth. Runs on CPU with the stub detector; pass --detector
+detector:VehicleDetector to include YOLO.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --output new.json --compare bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+SCENARIOS = {
+    'light_720p': dict(width=1280, height=720, frames=150, vehicles=3, seed=1),
+    'busy_720p': dict(width=1280, height=720, frames=150, vehicles=6, seed=2),
+    'busy_1080p': dict(width=1920, height=1080, frames=150, vehicles=8, seed=3),
+}
+
+# Default regression thresholds for --compare
+FPS_TOLERANCE = 0.10  # Relative fps drop
+LATENCY_TOLERANCE = 0.25  # Relative growth of a stage's p95
+SPEED_TOLERANCE = 1.0  # km/h growth of the mean absolute speed error
+RECALL_TOLERANCE = 0.02  # Absolute drop in matched detections
+MATCH_DISTANCE = 30.0  # Max pixels between a detection and its true box
+
+
+def match_truth(detections, truth_boxes):
+    """Map detection index -> vehicle index by nearest visible true box centre"""
+    visible = np.flatnonzero(np.isfinite(truth_boxes[:, 0]))
+    if not detections or len(visible) == 0:
+        return {}
+    centres = (truth_boxes[visible, :2] + truth_boxes[visible, 2:]) / 2
+    matches = {}
+    for i, det in enumerate(detections):
+        x1, y1, x2, y2 = det.bbox
+        dist = np.hypot(centres[:, 0] - (x1 + x2) / 2, centres[:, 1] - (y1 + y2) / 2)
+        best = int(np.argmin(dist))
+        if dist[best] <= MATCH_DISTANCE:
+            matches[i] = int(visible[best])
+    return matches
+
+
+def run_scenario(name, params, detector_path):
+    """Generate the clip and run the loop on it (in a fresh process, for peak RSS)"""
+    import config
+    from calibration import get_calibration
+    from data_logger import SpeedLogger
+    from metrics import Metrics
+    from pipeline import load_factory
+    from speed_tracker import BatchSpeedTracker, SpeedTracker
+    from track_store import TrackStore
+    from video_capture import ThreadedVideoCapture
+    from visualizer import Visualizer
+    from benchmarks.synthetic import write_traffic_clip
+
+    logging.getLogger('speed_calculator').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        truth = write_traffic_clip(os.path.join(tmp, f'{name}.mp4'), **params)
+        detector = load_factory(detector_path)()
+        capture = ThreadedVideoCapture(truth['path'], drop_policy='block')
+        calibration = get_calibration(capture.frame_height, config.__dict__, capture.frame_width)
+        if config.TRACKER_MODE == 'batch':
+            tracker = BatchSpeedTracker(clock=capture.clock, calibration=calibration)
+        else:
+            tracker = SpeedTracker(clock=capture.clock, calibration=calibration)
+        visualizer = Visualizer()
+        speed_logger = SpeedLogger(log_file=os.path.join(tmp, 'violations.csv'),
+                                   export_file=os.path.join(tmp, 'violations.xlsx'),
+                                   summary_file=os.path.join(tmp, 'vehicles.jsonl'))
+        track_store = TrackStore(on_evict=[lambda s: tracker.remove(s.track_id), speed_logger.log_vehicle])
+        metrics = Metrics(enabled=True)
+
+        errors = {}  # vehicle -> measured - true, per warmed-up frame
+        matched = 0
+        frames = 0
+        start = time.perf_counter()
+        while True:
+            frame_start = time.perf_counter()
+            with metrics.stage('read'):
+                ret, frame, timestamp = capture.read_timestamped()
+            if not ret:
+                break
+            with metrics.stage('detect'):
+                detections = detector.detect(frame, timestamp)
+            with metrics.stage('track'):
+                if isinstance(tracker, BatchSpeedTracker):
+                    speeds = tracker.update_frame(detections, capture.frame_height)
+                else:
+                    speeds = {d.track_id: tracker.update(d, capture.frame_height) for d in detections}
+            with metrics.stage('draw'):
+                visualizer.draw_all(frame, detections, speeds)
+            with metrics.stage('log'):
+                track_store.observe(detections, speeds, timestamp)
+                track_store.expire(timestamp)
+            metrics.observe_stage('frame', time.perf_counter() - frame_start)
+
+            matches = match_truth(detections, truth['boxes'][frames])
+            matched += len(matches)
+            for i, vehicle in matches.items():
+                speed = speeds[detections[i].track_id]
+                if speed > 0:
+                    errors.setdefault(vehicle, []).append(speed - truth['speeds_kmh'][vehicle])
+            frames += 1
+        elapsed = time.perf_counter() - start
+        track_store.flush()
+        capture.release()
+        speed_logger.close()
+
+    visible = int(np.isfinite(truth['boxes'][:, :, 0]).sum())
+    per_vehicle = {v: float(np.median(e)) for v, e in errors.items()}
+    all_errors = np.abs(np.concatenate([np.asarray(e) for e in errors.values()])) if errors else np.zeros(1)
+    stages = metrics.snapshot()['stages']
+    return {
+        'frames': frames,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'stages': {s: {k: v[k] for k in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')} for s, v in stages.items()},
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != 'darwin' else 1024 ** 2),
+        'recall': matched / visible if visible else 0.0,
+        'vehicles_measured': len(per_vehicle),
+        'vehicles': len(truth['speeds_kmh']),
+        # Per-vehicle median error, i.e. what the vehicle would be logged at
+        'speed_mae_kmh': float(np.mean(np.abs(list(per_vehicle.values())))) if per_vehicle else None,
+        'speed_p95_abs_err_kmh': float(np.percentile(all_errors, 95)),
+        'speed_mape': float(np.mean([abs(e) / truth['speeds_kmh'][v] for v, e in per_vehicle.items()])) if per_vehicle else None,
+    }
+
+
+def environment() -> dict:
+    import cv2
+    import config
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'tracker_mode': config.TRACKER_MODE,
+        'speed_from_world': config.SPEED_FROM_WORLD,
+        'capture_buffer_mode': config.CAPTURE_BUFFER_MODE,
+    }
+
+
+def compare(current: dict, baseline: dict, fps_tol: float, latency_tol: float,
+            speed_tol: float, recall_tol: float) -> list:
+    """Regressions of current vs baseline, as human-readable strings"""
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        cur = current['scenarios'].get(name)
+        if cur is None:
+            continue
+        if cur['fps'] < base['fps'] * (1 - fps_tol):
+            regressions.append(f"{name}: fps {base['fps']:.1f} -> {cur['fps']:.1f}")
+        for stage, stats in base['stages'].items():
+            now = cur['stages'].get(stage)
+            # Ignore sub-millisecond stages, where timer noise dominates
+            if now and stats['p95_ms'] >= 1.0 and now['p95_ms'] > stats['p95_ms'] * (1 + latency_tol):
+                regressions.append(f"{name}: {stage} p95 {stats['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms")
+        if base['speed_mae_kmh'] is not None:
+            if cur['speed_mae_kmh'] is None:
+                regressions.append(f"{name}: no speeds measured")
+            elif cur['speed_mae_kmh'] > base['speed_mae_kmh'] + speed_tol:
+                regressions.append(f"{name}: speed error {base['speed_mae_kmh']:.2f} -> "
+                                   f"{cur['speed_mae_kmh']:.2f} km/h")
+        if cur['recall'] < base['recall'] - recall_tol:
+            regressions.append(f"{name}: recall {base['recall']:.3f} -> {cur['recall']:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench.json', help='where to write the results')
+    parser.add_argument('--compare', help='baseline results to check for regressions')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--detector', default='benchmarks.stub_detector:ColorBlobDetector')
+    parser.add_argument('--fps-tolerance', type=float, default=FPS_TOLERANCE)
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument('--speed-tolerance', type=float, default=SPEED_TOLERANCE)
+    parser.add_argument('--recall-tolerance', type=float, default=RECALL_TOLERANCE)
+    args = parser.parse_args()
+
+    results = {'environment': environment(), 'detector': args.detector, 'scenarios': {}}
+    print(f"{'scenario':<12} {'fps':>7} {'frame p95':>10} {'rss MB':>7} {'recall':>7} {'MAE km/h':>9} {'MAPE':>6}")
+    for name in args.scenarios:
+        # A fresh process per scenario keeps peak RSS separate
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(run_scenario, name, SCENARIOS[name], args.detector).result()
+        results['scenarios'][name] = result
+        mae = result['speed_mae_kmh']
+        mape = result['speed_mape']
+        print(f"{name:<12} {result['fps']:>7.1f} {result['stages']['frame']['p95_ms']:>8.2f}ms "
+              f"{result['peak_rss_mb']:>7.0f} {result['recall']:>7.3f} "
+              f"{mae if mae is not None else float('nan'):>9.2f} "
+              f"{mape if mape is not None else float('nan'):>6.1%}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.fps_tolerance, args.latency_tolerance,
+                              args.speed_tolerance, args.recall_tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions vs {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
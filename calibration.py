@@ -1,5 +1,6 @@
 """Camera calibration and real-world measurements"""
 import math
+import cv2
 import numpy as np
 from typing import Tuple
 
@@ -33,4 +34,124 @@ def get_scaling_factor(
     distance = calculate_real_distance(y2 - y1, center_y, frame_height, config)
     
     # Calculate scaling factor
-    return config['REAL_WORLD_WIDTH'] / distance
\ No newline at end of file
+    return config['REAL_WORLD_WIDTH'] / distance
+
+def get_scaling_factors(
+    bboxes: np.ndarray,
+    frame_height: float,
+    config: dict
+) -> np.ndarray:
+    """Vectorized get_scaling_factor for an (n, 4) array of boxes"""
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    center_y = (bboxes[:, 1] + bboxes[:, 3]) / 2
+
+    angle_rad = math.radians(config['CAMERA_ANGLE'])
+    relative_y = (frame_height - center_y) / frame_height
+    distance = config['CAMERA_HEIGHT'] * np.tan(angle_rad +
+               np.arctan(relative_y * math.tan(math.pi/3)))
+
+    return config['REAL_WORLD_WIDTH'] / distance
+
+
+class GroundPlaneCalibration:
+    """Image-to-road mapping for one frame size and camera setup.
+
+    Without reference points, the perspective model of
+    calculate_real_distance is evaluated once per pixel row into a
+    metres-per-pixel table; road position along the image y axis is the
+    running sum of that table and across it the offset from the centre
+    column times the row's scale. With four or more reference points a
+    homography maps image points straight onto the road plane instead.
+    """
+    def __init__(self, frame_height: float, config: dict, frame_width: float = None,
+                 homography: np.ndarray = None):
+        self.frame_height = int(round(frame_height))
+        self.center_x = frame_width / 2 if frame_width else 0.0
+        self.homography = None if homography is None else np.asarray(homography, dtype=float)
+
+        # Metres per pixel at every row boundary 0..frame_height
+        self.rows = np.arange(self.frame_height + 1, dtype=float)
+        angle_rad = math.radians(config['CAMERA_ANGLE'])
+        relative_y = (frame_height - self.rows) / frame_height
+        distance = config['CAMERA_HEIGHT'] * np.tan(angle_rad +
+                   np.arctan(relative_y * math.tan(math.pi/3)))
+        self.scale_lut = config['REAL_WORLD_WIDTH'] / distance
+        self._scale_list = self.scale_lut.tolist()
+
+        # Road distance from row 0 (trapezoidal sum of the per-row scale)
+        steps = (self.scale_lut[1:] + self.scale_lut[:-1]) / 2
+        self.ground_y = np.concatenate(([0.0], np.cumsum(steps)))
+
+    @classmethod
+    def from_reference_points(cls, image_points, world_points, frame_height: float,
+                              config: dict, frame_width: float = None) -> 'GroundPlaneCalibration':
+        """Fit a homography from >= 4 image points (pixels) to road points (metres)"""
+        image_points = np.asarray(image_points, dtype=np.float64).reshape(-1, 2)
+        world_points = np.asarray(world_points, dtype=np.float64).reshape(-1, 2)
+        if len(image_points) < 4 or len(image_points) != len(world_points):
+            raise ValueError("A homography needs at least 4 matching image/world points")
+        homography, _ = cv2.findHomography(image_points, world_points, 0)
+        if homography is None:
+            raise ValueError("Reference points are degenerate (e.g. collinear)")
+        return cls(frame_height, config, frame_width, homography)
+
+    def scale_at(self, y):
+        """Metres per pixel at image row(s) ``y``; matches get_scaling_factor"""
+        if isinstance(y, (int, float)):
+            # Scalar fast path; np.interp's call overhead dominates here
+            row = min(max(y, 0.0), self.frame_height)
+            i = min(int(row), self.frame_height - 1)
+            frac = row - i
+            return self._scale_list[i] * (1 - frac) + self._scale_list[i + 1] * frac
+        return np.interp(y, self.rows, self.scale_lut)
+
+    def scale_for_boxes(self, bboxes) -> np.ndarray:
+        """Table-based get_scaling_factors for an (n, 4) array of boxes"""
+        bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        return self.scale_at((bboxes[:, 1] + bboxes[:, 3]) / 2)
+
+    def metres_per_pixel(self, points) -> np.ndarray:
+        """Local road-plane size of one pixel at each of an (..., 2) array of points"""
+        points = np.asarray(points, dtype=float)
+        if self.homography is None:
+            return self.scale_at(points[..., 1])
+        origin = self.pixels_to_world(points)
+        dx = self.pixels_to_world(points + (1.0, 0.0)) - origin
+        dy = self.pixels_to_world(points + (0.0, 1.0)) - origin
+        # Square root of the area one pixel covers on the road
+        return np.sqrt(np.abs(dx[..., 0] * dy[..., 1] - dx[..., 1] * dy[..., 0]))
+
+    def pixels_to_world(self, points) -> np.ndarray:
+        """Map an (..., 2) array of image points to road-plane metres"""
+        points = np.asarray(points, dtype=float)
+        x, y = points[..., 0], points[..., 1]
+        if self.homography is not None:
+            h = self.homography
+            w = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+            return np.stack(((h[0, 0] * x + h[0, 1] * y + h[0, 2]) / w,
+                             (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / w), axis=-1)
+        return np.stack(((x - self.center_x) * self.scale_at(y),
+                         np.interp(y, self.rows, self.ground_y)), axis=-1)
+
+
+_calibrations = {}
+
+def get_calibration(frame_height: float, config: dict,
+                    frame_width: float = None) -> GroundPlaneCalibration:
+    """Shared calibration for a frame size and the current camera settings"""
+    image_points = config.get('HOMOGRAPHY_IMAGE_POINTS')
+    world_points = config.get('HOMOGRAPHY_WORLD_POINTS')
+    key = (
+        frame_height, frame_width,
+        config['CAMERA_HEIGHT'], config['CAMERA_ANGLE'], config['REAL_WORLD_WIDTH'],
+        str(image_points), str(world_points),
+    )
+    calibration = _calibrations.get(key)
+    if calibration is None:
+        if image_points and world_points:
+            calibration = GroundPlaneCalibration.from_reference_points(
+                image_points, world_points, frame_height, config, frame_width)
+        else:
+            calibration = GroundPlaneCalibration(frame_height, config, frame_width)
+        _calibrations[key] = calibration
+    return calibration
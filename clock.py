@@ -0,0 +1,67 @@
+"""Frame timestamps for speed calculation.
+
+Speeds must be computed from when a frame was *captured*, not from when
+the processing loop got around to it. Files are stamped with their
+presentation timestamps and live sources with the time the frame was
+read off the device, so speeds don't change with processing throughput.
+"""
+import time
+import cv2
+
+
+class Clock:
+    """Source of per-frame timestamps in seconds"""
+
+    def now(self) -> float:
+        raise NotImplementedError
+
+    def stamp(self, cap, frame_index: int) -> float:
+        """Timestamp for the frame just read from ``cap``"""
+        return self.now()
+
+    def stamp_index(self, frame_index: int) -> float:
+        """Timestamp for a frame from a decoder that reports no positions"""
+        return self.now()
+
+
+class WallClock(Clock):
+    """Monotonic wall-clock time, for live cameras"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class VideoClock(Clock):
+    """Presentation timestamps from a video container"""
+
+    def __init__(self, fps: float = 30.0):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.last = 0.0
+
+    def now(self) -> float:
+        return self.last
+
+    def stamp(self, cap, frame_index: int) -> float:
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if msec > 0 or frame_index == 0:
+            timestamp = msec / 1000.0
+        else:
+            # Some backends don't report positions; fall back to the frame index
+            timestamp = frame_index / self.fps
+        self.last = timestamp
+        return timestamp
+
+    def stamp_index(self, frame_index: int) -> float:
+        self.last = frame_index / self.fps
+        return self.last
+
+
+def is_live_source(source) -> bool:
+    """Webcam indices and network streams are live; anything else is a file"""
+    if isinstance(source, int):
+        return True
+    return str(source).split('://', 1)[0].lower() in ('rtsp', 'rtmp', 'http', 'https', 'udp', 'tcp')
+
+
+def clock_for_source(source, fps: float = 30.0) -> Clock:
+    return WallClock() if is_live_source(source) else VideoClock(fps)
@@ -3,6 +3,13 @@
 # Model settings
 YOLO_MODEL = 'yolov8n.pt'  # Using smaller model for better webcam performance
 CONFIDENCE_THRESHOLD = 0.5
+NMS_IOU_THRESHOLD = 0.7  # As ultralytics' default, for the torch/onnx backends
+DETECTOR_BACKEND = 'ultralytics'  # 'ultralytics' (model.track), 'torch' or 'onnx' (own NMS + StreamTracker)
+DETECTOR_IMGSZ = 640  # Long side of the model input, e.g. 320 for half resolution
+MODEL_CACHE_DIR = 'model_cache'  # ONNX exports, created on first use
+ONNX_INT8 = False  # Dynamically quantized weights
+ONNX_INTRA_OP_THREADS = 0  # 0: ONNX Runtime's default
+ONNX_INTER_OP_THREADS = 0
 
 # Speed calculation
 FRAME_BUFFER = 10  # Increased for smoother speed calculations
@@ -36,4 +43,166 @@ VEHICLE_CLASSES = {
     4: 'airplane',
     6: 'train',
     8: 'boat',
-}
\ No newline at end of file
+}
+
+# Violation logging
+VIOLATION_SINK = 'csv'  # 'csv', 'jsonl' or 'sqlite' (WAL)
+VIOLATION_LOG_FILE = 'speed_violations.csv'  # Append-only primary log
+VIOLATION_EXPORT_FILE = 'speed_violations.xlsx'  # Written by SpeedLogger.save()
+VIOLATION_QUEUE_SIZE = 1024
+VIOLATION_FLUSH_COUNT = 50  # Flush after this many queued violations
+VIOLATION_FLUSH_INTERVAL = 1.0  # ...or after this many seconds
+
+VEHICLE_SUMMARY_FILE = 'vehicle_summaries.jsonl'  # One record per vehicle; None disables
+
+# Telemetry: every vehicle and sampled speeds as Parquet, for analytics (telemetry.py, needs pyarrow)
+TELEMETRY_ENABLED = False
+TELEMETRY_DIR = 'telemetry'  # tracks/ and points/, partitioned by UTC date=YYYY-MM-DD, a file per hour
+TELEMETRY_CAMERA = None  # Value of the camera column; None: the source file name
+TELEMETRY_SAMPLE_INTERVAL = 1.0  # Seconds between speed points kept per track; 0 keeps none
+TELEMETRY_BATCH_ROWS = 10000  # Rows per Parquet row group
+TELEMETRY_FLUSH_INTERVAL = 60.0  # ...or seconds, whichever comes first
+TELEMETRY_QUEUE_SIZE = 100000
+TELEMETRY_COMPACT_ROWS = 100000  # Row group size of compacted day files
+
+# Violation evidence: snapshot and clip per violation, named by violation ID
+EVIDENCE_ENABLED = False
+EVIDENCE_DIR = 'evidence'
+EVIDENCE_PREROLL = 3.0  # Seconds of video kept before the violation
+EVIDENCE_POSTROLL = 2.0  # Seconds recorded after it
+EVIDENCE_FPS = 10.0  # Frames per second kept for clips
+EVIDENCE_WIDTH = 960  # Clip frames are shrunk to this width
+EVIDENCE_JPEG_QUALITY = 80
+EVIDENCE_MAX_MEMORY_MB = 64  # Cap on the compressed pre-roll
+EVIDENCE_WORKERS = 2  # Threads writing evidence files
+EVIDENCE_MAX_PENDING = 16  # Violations waiting for their post-roll; more are dropped
+EVIDENCE_SNAPSHOT_PADDING = 0.25  # Snapshot margin around the box, as a share of its size
+
+# Batched multi-stream inference
+BATCH_MAX_SIZE = 8  # Frames per forward pass
+BATCH_MAX_WAIT_MS = 10.0  # Max wait to fill a batch after its first frame
+
+# Speed tracking
+TRACKER_MODE = 'batch'  # 'batch' (vectorized per frame) or 'per_detection'
+MAX_TRACKS = 256  # Live-track capacity; least recently seen tracks are evicted beyond it
+TRACK_MAX_AGE = 2.0  # Seconds of stream time without a detection before a track ends
+TRACK_SPEED_SAMPLES = 64  # Recent speeds kept per live track for its median
+SPEED_FROM_WORLD = True  # Measure displacement on the road plane, not pixels x one scale
+SPEED_ESTIMATOR = 'median'  # 'median' (z-score filtered history) or 'kalman' (streaming)
+KALMAN_ACCEL_NOISE = 2.0  # m/s^2; lower remembers longer, higher follows speed changes faster
+KALMAN_PIXEL_NOISE = 1.0  # Expected box-centre jitter, pixels
+KALMAN_GATE = 13.8  # Reject observations beyond this squared Mahalanobis distance
+KALMAN_MAX_REJECTS = 3  # Restart a track after this many rejections in a row
+KALMAN_INITIAL_SPEED_STD = 30.0  # m/s, prior uncertainty of a new track's velocity
+
+# Detection tracking (track IDs across frames)
+DETECTION_TRACKER = 'bytetrack'  # 'bytetrack' (ultralytics) or 'iou' (tracker.py; predicts skipped frames)
+TRACK_HIGH_THRESHOLD = 0.25  # Boxes at least this confident are matched first
+TRACK_LOW_THRESHOLD = 0.1  # Weaker boxes only extend tracks seen on the previous frame
+TRACK_NEW_THRESHOLD = 0.25  # Unmatched boxes at least this confident start a track
+TRACK_MATCH_IOU = 0.2  # Minimum score-weighted IoU with a track's predicted box
+TRACK_LOST_TIME = 1.0  # Seconds a track survives without a match
+TRACK_MIN_HITS = 2  # Matches before a new track gets an ID
+TRACK_ASSIGNMENT = 'hungarian'  # 'hungarian' (optimal, scipy) or 'greedy'
+TRACK_VELOCITY_SMOOTHING = 0.5  # Weight of the latest measured velocity
+
+# Ground-plane calibration: >= 4 matching points enable a homography;
+# otherwise the camera model above (CAMERA_HEIGHT, CAMERA_ANGLE) is used
+HOMOGRAPHY_IMAGE_POINTS = None  # e.g. [(x, y), ...] in pixels
+HOMOGRAPHY_WORLD_POINTS = None  # Matching road points in metres
+
+# Region of interest: polygons are [(x, y), ...] in full-frame pixels
+ROI_POLYGON = None  # Road area; the detector only sees its bounding box
+MEASUREMENT_ZONE = None  # Where speeds are measured (defaults to ROI_POLYGON)
+LANE_POLYGONS = None  # e.g. {'left': [...], 'right': [...]}; vehicles outside every lane are dropped
+MEASURED_CLASSES = None  # e.g. ['Car', 'Motorcycle', 'Bus', 'Truck']; None keeps all VEHICLE_CLASSES
+ROI_TILE_WIDTH = None  # Split wider crops into tiles of this many pixels (e.g. 640)
+ROI_TILE_OVERLAP = 64  # Pixels shared by neighbouring tiles
+ROI_TILE_NMS_IOU = 0.5  # Merge duplicate boxes from overlapping tiles above this IoU
+ROI_MASK_OUTSIDE = False  # Blank pixels of the crop outside ROI_POLYGON
+FAR_FIELD_BAND = None  # (top, bottom) rows where vehicles are small, e.g. (180, 420); also detected in tiles
+FAR_FIELD_TILE_SIZE = 640  # Square tiles, detected at their own resolution
+FAR_FIELD_TILE_OVERLAP = 128  # Pixels shared by neighbouring tiles
+FAR_FIELD_MERGE_IOS = 0.6  # Merge a tile box into a box of the same class covering this share of the smaller one
+
+# Detection scheduling
+DETECTION_INTERVAL = 2  # Initial frames per detection (fixed if not adaptive)
+ADAPTIVE_DETECTION = True  # Adjust the interval to detector latency and backlog
+MIN_DETECTION_INTERVAL = 1
+MAX_DETECTION_INTERVAL = 6
+TARGET_OUTPUT_FPS = None  # None: keep up with the source FPS
+FRAME_LATENCY_BUDGET_MS = None  # Optional tighter per-frame budget
+
+# Load-aware detector levels, cheapest first; each may set 'model', 'imgsz' and 'far_field'
+DETECTOR_LEVELS = None  # e.g. [{'imgsz': 320}, {'imgsz': 640}, {'imgsz': 640, 'far_field': True}]
+DETECTOR_DEFAULT_LEVEL = 1  # Levels below it are only used while the scene is quiet
+DETECTOR_LATENCY_BUDGET_MS = 100.0  # Step down when a detector call takes longer than this
+DETECTOR_QUIET_COUNT = 1.0  # Step down while fewer vehicles than this are detected (average)
+DETECTOR_BUSY_COUNT = 4.0  # Step up past the default level from this many, if the next level fits the budget
+DETECTOR_SWITCH_CALLS = 20  # Detector calls between level changes
+
+# Motion gate: skip detection on frames where nothing in the ROI changed
+MOTION_GATE_ENABLED = False
+MOTION_GATE_WIDTH = 160  # Pixels across the downscaled ROI that is compared
+MOTION_PIXEL_THRESHOLD = 20  # Per-channel level change that counts as motion
+MOTION_MIN_AREA = 0.002  # Share of the ROI that must change to run the detector
+MOTION_KEYFRAME_INTERVAL = 1.0  # Seconds; detect at least this often regardless
+MOTION_BACKGROUND_RATE = 0.05  # Running-average update rate of the background
+
+# Video capture
+CAPTURE_BUFFER_MODE = 'ring'  # 'ring' (preallocated, in-place decode) or 'queue'
+CAPTURE_DROP_POLICY = None  # 'latest', 'drop_oldest', 'block', or None: 'latest' for network streams, 'drop_oldest' for webcams, 'block' for files
+CAPTURE_DECODER = 'opencv'  # 'opencv' or 'ffmpeg' (subprocess pipe; files and streams only)
+INFERENCE_WIDTH = None  # e.g. 640: resize once at decode and detect on that; boxes are mapped back
+FFMPEG_BINARY = 'ffmpeg'
+FFMPEG_THREADS = 0  # Decoder threads; 0 lets ffmpeg choose
+
+# Network streams (rtsp://, http://, udp://, ...)
+CAPTURE_FFMPEG_OPTIONS = 'rtsp_transport;tcp|fflags;nobuffer|flags;low_delay'  # FFmpeg demuxer options, 'key;value|...'
+CAPTURE_OPEN_TIMEOUT = 10.0  # Seconds allowed to connect
+CAPTURE_READ_TIMEOUT = 5.0  # Seconds without a frame before the stream counts as lost
+CAPTURE_RECONNECT_INITIAL = 0.5  # Seconds before the first reconnect attempt, doubled per failure
+CAPTURE_RECONNECT_MAX = 10.0
+CAPTURE_RECONNECT_GIVE_UP = None  # Seconds of failed attempts before the stream ends; None retries forever
+
+# Multi-process pipeline
+PIPELINE_SLOTS = 8  # Shared-memory frame slots (bounds frames in flight)
+PIPELINE_QUEUE_SIZE = 4  # Max items waiting between stages
+PIPELINE_STOP_TIMEOUT = 5.0  # Seconds a stage gets to finish after a failure or stop before it is terminated
+
+# Multi-camera supervisor (supervisor.py)
+SUPERVISOR_MODE = 'process'  # 'process' (one worker per camera) or 'shared' (one batched model, a thread per camera)
+SUPERVISOR_OUTPUT_DIR = 'cameras'  # <name>/ per camera for logs and evidence, plus status.json
+SUPERVISOR_PIN_CPUS = True  # Split the available cores between camera workers (Linux)
+SUPERVISOR_STALL_TIMEOUT = 10.0  # Seconds without a processed frame before a worker is restarted
+SUPERVISOR_STARTUP_TIMEOUT = 120.0  # ...allowed before the first frame (model load, connect)
+SUPERVISOR_BACKOFF_INITIAL = 1.0  # Seconds before the first restart, doubled per failure
+SUPERVISOR_BACKOFF_MAX = 60.0
+SUPERVISOR_HEALTHY_TIME = 30.0  # A worker running this long resets its backoff
+SUPERVISOR_REPORT_INTERVAL = 5.0  # Seconds between throughput reports
+
+# Display
+PREVIEW_WIDTH = None  # e.g. 960: draw on and show a frame this wide; None shows full resolution
+
+# Restream of the annotated frames (restream.py), e.g. from a headless server
+RESTREAM = None  # 'mjpeg' (multipart JPEG over HTTP) or 'hls' (MPEG-TS segments and a playlist)
+RESTREAM_HOST = '127.0.0.1'
+RESTREAM_PORT = 8090  # MJPEG on http://host:port/stream.mjpg, the latest frame on /snapshot.jpg
+RESTREAM_JPEG_QUALITY = 80
+RESTREAM_MAX_FPS = None  # Encode at most this often; None keeps up with the processing loop
+HLS_DIR = 'hls'  # index.m3u8 and its segments; serve the directory with any static web server
+HLS_SEGMENT_SECONDS = 2.0
+HLS_PLAYLIST_SIZE = 5  # Segments listed in the playlist
+HLS_ENCODER = 'opencv'  # 'opencv' (cv2.VideoWriter with HLS_FOURCC) or 'ffmpeg' (libx264 via FFMPEG_BINARY)
+HLS_FOURCC = 'mp4v'  # MPEG-4 Part 2 plays in VLC/ffplay; browsers need H.264 ('avc1' if OpenCV has it, or 'ffmpeg')
+HLS_QUEUE_SIZE = 60  # Frames waiting for the encoder; more are dropped
+
+# Metrics and profiling
+METRICS_ENABLED = False  # Per-stage timers, gauges and exporters
+METRICS_WINDOW = 1000  # Recent samples kept per histogram
+METRICS_HTTP_PORT = None  # e.g. 9108: Prometheus text on http://127.0.0.1:9108/metrics
+METRICS_JSONL_FILE = None  # e.g. 'metrics.jsonl': periodic snapshots
+METRICS_JSONL_INTERVAL = 10.0  # Seconds between JSONL snapshots
+METRICS_OVERLAY = False  # Draw stage latencies on the frame
+PROFILE_FRAMES = 300  # Frames per on-demand profile ('p' key or SIGUSR1)
+PROFILE_OUTPUT = 'profile_{time}.prof'
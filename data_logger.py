@@ -1,62 +1,149 @@
 """Logger for recording vehicle speed data in real-time"""
-from openpyxl import Workbook, load_workbook
 from datetime import datetime
-import os
+import atexit
 import logging
+import os
+import config
+from violation_sink import BufferedSinkWriter, JsonlViolationSink, create_sink
 
 logger = logging.getLogger(__name__)
 
 # Speed limits per vehicle type (km/h)
 SPEED_LIMITS = {
     'car': 120,
-    'motorcycle': 120, 
+    'motorcycle': 120,
     'bus': 80,
     'truck': 100,
     'van': 120
 }
 
+def get_speed_limit(vehicle_type: str) -> float:
+    """Speed limit for a vehicle type, falling back to the default limit"""
+    vehicle_type = vehicle_type.lower()
+    if vehicle_type not in SPEED_LIMITS:
+        logger.warning(f"Unknown vehicle type: {vehicle_type}, using default limit")
+        return 150
+    return SPEED_LIMITS[vehicle_type]
+
+EXCEL_HEADERS = ["Timestamp", "Vehicle Type", "Speed", "Speed Limit", "Excess", "Violation ID"]
+
 class SpeedLogger:
-    def __init__(self):
-        self.filename = "speed_violations.xlsx"
-        self._initialize_excel()
-        
-    def _initialize_excel(self):
-        """Initialize Excel file if it doesn't exist"""
-        if not os.path.exists(self.filename):
-            wb = Workbook()
-            ws = wb.active
-            headers = ["Timestamp", "Vehicle Type", "Speed", "Speed Limit", "Excess"]
-            ws.append(headers)
-            wb.save(self.filename)
-        
-    def log_violation(self, vehicle_type: str, speed: float):
-        """Log speed violation immediately to Excel file"""
+    def __init__(self, log_file: str = None, export_file: str = None, sink_kind: str = None,
+                 summary_file: str = None):
+        self.log_file = log_file or config.VIOLATION_LOG_FILE
+        self.filename = export_file or config.VIOLATION_EXPORT_FILE
+        # A workbook from before the log existed is imported once, so the
+        # export rebuilt from the log doesn't lose its violations
+        migrate = not os.path.exists(self.log_file) and os.path.exists(self.filename)
+        self.sink = create_sink(sink_kind or config.VIOLATION_SINK, self.log_file)
+        if migrate:
+            self._import_workbook()
+        self.writer = self._create_writer(self.sink)
+        # One JSONL record per vehicle when its track ends
+        self.summary_file = summary_file or config.VEHICLE_SUMMARY_FILE
+        self.summary_writer = None
+        if self.summary_file:
+            self.summary_writer = self._create_writer(JsonlViolationSink(self.summary_file))
+        # Guarantee queued violations reach disk even if save() is never called
+        atexit.register(self.close)
+
+    def _import_workbook(self):
+        """Copy the violations in the export workbook into the log"""
+        from openpyxl import load_workbook
+
+        def number(value):
+            return float(str(value).split()[0])  # "123.4 km/h"
+
+        try:
+            wb = load_workbook(self.filename, read_only=True)
+            records = [
+                {
+                    'timestamp': row[0],
+                    'vehicle_type': row[1],
+                    'speed': number(row[2]),
+                    'speed_limit': number(row[3]),
+                    'excess': number(row[4]),
+                    'violation_id': (row[5] if len(row) > 5 else None) or ''
+                }
+                for row in wb.active.iter_rows(min_row=2, values_only=True)
+                if row and row[0] is not None
+            ]
+            wb.close()
+            if records:
+                self.sink.write_batch(records)
+            logger.info(f"Imported {len(records)} violations from {self.filename} into {self.log_file}")
+        except Exception as e:
+            logger.error(f"Error importing {self.filename}: {str(e)}")
+
+    @staticmethod
+    def _create_writer(sink) -> BufferedSinkWriter:
+        return BufferedSinkWriter(
+            sink,
+            queue_size=config.VIOLATION_QUEUE_SIZE,
+            flush_count=config.VIOLATION_FLUSH_COUNT,
+            flush_interval=config.VIOLATION_FLUSH_INTERVAL
+        )
+
+    def log_vehicle(self, summary):
+        """Record a finished track; a speeding vehicle is logged as one violation"""
+        if self.summary_writer is not None:
+            self.summary_writer.submit(summary.to_dict())
+        if summary.violation:
+            self.log_violation(summary.vehicle_type, summary.max_speed, summary.violation_id)
+
+    def log_violation(self, vehicle_type: str, speed: float, violation_id: str = ''):
+        """Queue a speed violation for the background writer"""
         vehicle_type = vehicle_type.lower()
-        if vehicle_type not in SPEED_LIMITS:
-            logger.warning(f"Unknown vehicle type: {vehicle_type}, using default limit")
-            speed_limit = 150
-        else:
-            speed_limit = SPEED_LIMITS[vehicle_type]
-        
+        speed_limit = get_speed_limit(vehicle_type)
+
         if speed > speed_limit:
-            try:
-                wb = load_workbook(self.filename)
-                ws = wb.active
-                
-                violation_data = [
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    vehicle_type.capitalize(),
-                    f"{speed:.1f} km/h",
-                    f"{speed_limit} km/h",
-                    f"{speed - speed_limit:.1f} km/h"
-                ]
-                
-                ws.append(violation_data)
-                wb.save(self.filename)
-                
-            except Exception as e:
-                logger.error(f"Error logging violation: {str(e)}")
-    
+            self.writer.submit({
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'vehicle_type': vehicle_type.capitalize(),
+                'speed': round(speed, 1),
+                'speed_limit': speed_limit,
+                'excess': round(speed - speed_limit, 1),
+                'violation_id': violation_id
+            })
+
+    def flush(self):
+        """Wait until all queued violations are written to the log file"""
+        self.writer.flush()
+        if self.summary_writer is not None:
+            self.summary_writer.flush()
+
+    def export_excel(self, filename: str = None):
+        """Write every logged violation to an Excel workbook"""
+        from openpyxl import Workbook
+
+        filename = filename or self.filename
+        self.flush()
+        wb = Workbook()
+        ws = wb.active
+        ws.append(EXCEL_HEADERS)
+        for record in self.sink.read_all():
+            ws.append([
+                record['timestamp'],
+                record['vehicle_type'],
+                f"{float(record['speed']):.1f} km/h",
+                f"{float(record['speed_limit']):.0f} km/h",
+                f"{float(record['excess']):.1f} km/h",
+                record.get('violation_id') or ''
+            ])
+        wb.save(filename)
+        return filename
+
     def save(self):
-        """No need to save at the end as we're saving in real-time"""
-        pass
\ No newline at end of file
+        """Flush pending violations and export them to Excel"""
+        try:
+            self.export_excel()
+        except Exception as e:
+            logger.error(f"Error exporting violations: {str(e)}")
+
+    def close(self):
+        """Flush pending violations and stop the background writer"""
+        # No flush left for exit to do, and the hook would keep this logger alive
+        atexit.unregister(self.close)
+        self.writer.close()
+        if self.summary_writer is not None:
+            self.summary_writer.close()
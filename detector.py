@@ -1,28 +1,266 @@
 """Vehicle detection using YOLOv8"""
-from ultralytics import YOLO
+import logging
+import time
 from dataclasses import dataclass
+from typing import List, Optional
 import numpy as np
 import config
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class Detection:
     track_id: int
     class_name: str
     bbox: tuple
     confidence: float
+    timestamp: Optional[float] = None  # Capture time of the frame, in seconds
+    lane: Optional[str] = None  # Name of the LANE_POLYGONS entry the vehicle is in
+
+class StreamTracker:
+    """ByteTrack instance for one video stream, fed with untracked boxes.
+
+    Lets several streams share one model while each keeps its own
+    track-ID space, which ``model.track(persist=True)`` cannot do.
+    """
+    def __init__(self, frame_rate: float = 30, tracker_cfg: str = 'bytetrack.yaml'):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+        try:
+            from ultralytics.utils import YAML
+            yaml_load = YAML.load
+        except ImportError:  # ultralytics < 8.3.100
+            from ultralytics.utils import yaml_load
+
+        args = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_cfg)))
+        try:
+            self.tracker = BYTETracker(args=args, frame_rate=int(round(frame_rate)))
+        except TypeError:  # Newer releases size the track buffer in frames only
+            self.tracker = BYTETracker(args=args)
+
+    def update(self, boxes, frame=None, timestamp: float = None) -> List[Detection]:
+        """Associate ultralytics ``Boxes`` (on CPU, as numpy) with tracks"""
+        # Called on empty frames too, so lost tracks age out
+        tracks = self.tracker.update(boxes, frame)
+        return tracks_to_detections(tracks, timestamp)
+
+
+def tracks_to_detections(tracks, timestamp: float = None) -> List[Detection]:
+    """Convert tracker output rows (x1, y1, x2, y2, id, conf, cls, idx) to detections"""
+    detections = []
+    for row in tracks:
+        class_id = int(row[6])
+        if class_id not in config.VEHICLE_CLASSES:
+            continue
+        detections.append(Detection(
+            track_id=int(row[4]),
+            class_name=config.VEHICLE_CLASSES[class_id],
+            bbox=tuple(row[:4]),
+            confidence=float(row[5]),
+            timestamp=timestamp
+        ))
+    return detections
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5, metric: str = 'iou') -> np.ndarray:
+    """Indices of the boxes (n, 4 as x1, y1, x2, y2) kept by greedy non-maximum suppression.
+
+    ``metric`` 'ios' divides the overlap by the smaller box instead of the
+    union, so a box cut off at a tile edge is suppressed by the whole one.
+    """
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        if metric == 'ios':
+            iou = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        else:
+            iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def scale_detections(detections: List[Detection], scale: tuple) -> List[Detection]:
+    """Map boxes detected on a frame resized by (sx, sy) back to the source frame, in place"""
+    sx, sy = scale
+    if (sx, sy) != (1.0, 1.0):
+        for det in detections:
+            x1, y1, x2, y2 = det.bbox
+            det.bbox = (x1 / sx, y1 / sy, x2 / sx, y2 / sy)
+    return detections
+
 
 class VehicleDetector:
     def __init__(self):
-        self.model = YOLO(config.YOLO_MODEL)
+        # Load-aware switching between models, input sizes and far-field tiling
+        self.policy = None
+        if config.DETECTOR_LEVELS:
+            from frame_scheduler import DetectorLevelPolicy
+            self.policy = DetectorLevelPolicy(config.DETECTOR_LEVELS, cost=self._input_pixels)
+        self.fixed_level = {'model': config.YOLO_MODEL, 'imgsz': config.DETECTOR_IMGSZ, 'far_field': True}
+        # Every level's model is loaded up front, so a switch never stalls the stream
+        self.models = {}
+        for level in (self.policy.levels if self.policy else [self.fixed_level]):
+            if level['model'] not in self.models:
+                self.models[level['model']] = self._load(level['model'])
+        self.model, self.backend = self.models[self.level['model']]
+        self.roi = None
+        self.roi_key = None
+        self.tracker = None
         
-    def detect(self, frame):
+    @staticmethod
+    def _load(model_path: str) -> tuple:
+        """(ultralytics model, None) or (None, backend) for DETECTOR_BACKEND"""
+        if config.DETECTOR_BACKEND == 'ultralytics':
+            # Imported here so the other backends start without torch
+            from ultralytics import YOLO
+            return YOLO(model_path), None
+        # Our own pre/post-processing; tracking moves to a StreamTracker
+        from detector_backends import create_backend
+        return None, create_backend(config.DETECTOR_BACKEND, model_path=model_path)
+        
+    @property
+    def level(self) -> dict:
+        """Model, input size and whether to tile the far field, as used for the next frame"""
+        return self.policy.level if self.policy is not None else self.fixed_level
+        
+    def _input_pixels(self, level: dict) -> float:
+        """Model input pixels per frame at ``level``, for the current ROI"""
+        if self.roi is None:
+            return float(level['imgsz']) ** 2
+        height = self.roi.bounds[3] - self.roi.bounds[1]
+        # Each crop is resized so its long side is imgsz
+        pixels = sum((level['imgsz'] / float(max(end - start, height))) ** 2 * (end - start) * height
+                     for start, end in self.roi.tiles)
+        if level['far_field']:
+            pixels += sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in self.roi.far_tiles)
+        return pixels
+        
+    def warmup(self, width: int = 640, height: int = 360):
+        """Run one blank frame so the first real frame doesn't pay for predictor setup"""
+        frame = np.full((height, width, 3), 114, dtype=np.uint8)
+        if self.policy is None:
+            self.detect(frame)
+        else:
+            # Every level, without counting towards the policy's latencies
+            for level in self.policy.levels:
+                self._predict([frame], level['imgsz'], level['model'])
+                if level['far_field'] and config.FAR_FIELD_BAND:
+                    self._predict([frame], config.FAR_FIELD_TILE_SIZE, level['model'])
+        self.reset()
+        
+    def reset(self):
+        """Forget all tracks, e.g. before the next clip of a batch job"""
+        self.tracker = None
+        for model, _ in self.models.values():
+            for tracker in getattr(getattr(model, 'predictor', None), 'trackers', None) or []:
+                tracker.reset()
+        
+    def _roi_for(self, frame, scale):
+        from roi import RegionOfInterest
+        height, width = frame.shape[:2]
+        if self.roi is None or self.roi_key != (width, height, scale):
+            self.roi = RegionOfInterest.from_config(width, height, scale)
+            self.roi_key = (width, height, scale)
+            self.tracker = None
+        return self.roi
+        
+    def _predict(self, images, imgsz: int = None, model_path: str = None) -> List[np.ndarray]:
+        """Untracked (n, 6) x1, y1, x2, y2, conf, class rows per image"""
+        classes = list(config.VEHICLE_CLASSES.keys())
+        imgsz = imgsz or self.level['imgsz']
+        model, backend = self.models[model_path] if model_path else (self.model, self.backend)
+        if backend is not None:
+            return backend.predict(images, classes=classes, imgsz=imgsz)
+        results = model.predict(
+            images,
+            classes=classes,
+            conf=config.CONFIDENCE_THRESHOLD,
+            imgsz=imgsz,
+            verbose=False
+        )
+        return [result.boxes.data.cpu().numpy() for result in results]
+        
+    def _predict_crops(self, crops, imgsz: int) -> np.ndarray:
+        """Detect on each (image, offset) crop; all rows in frame coordinates"""
+        rows = [np.zeros((0, 6), dtype=np.float32)]
+        for data, (_, (ox, oy)) in zip(self._predict([crop for crop, _ in crops], imgsz), crops):
+            if len(data) and (ox or oy):
+                data = data.copy()
+                data[:, [0, 2]] += ox
+                data[:, [1, 3]] += oy
+            rows.append(data)
+        return np.concatenate(rows)
+        
+    def _detect_untracked(self, crops, frame_shape, timestamp: float = None, far_tiles=()) -> List[Detection]:
+        """Detect on each crop and far-field tile, merge overlaps in frame coordinates and track the result"""
+        data = self._predict_crops(crops, self.level['imgsz'])
+        if len(crops) > 1 and len(data):
+            data = data[nms(data[:, :4], data[:, 4], config.ROI_TILE_NMS_IOU)]
+        if far_tiles:
+            # Tiles at their own resolution; the whole-frame box wins over one cut at a tile edge
+            size = max(max(tile.shape[:2]) for tile, _ in far_tiles)
+            data = np.concatenate([data, self._predict_crops(far_tiles, int(np.ceil(size / 32.0)) * 32)])
+            if len(data):
+                by_class = data[:, 5:6] * (max(frame_shape[:2]) + 1)
+                data = data[nms(data[:, :4] + by_class, data[:, 4], config.FAR_FIELD_MERGE_IOS, metric='ios')]
+        if self.tracker is None:
+            from tracker import create_tracker
+            self.tracker = create_tracker()
+        boxes = data
+        if isinstance(self.tracker, StreamTracker):
+            from ultralytics.engine.results import Boxes
+            boxes = Boxes(data, frame_shape[:2])
+        return self.tracker.update(boxes, timestamp=timestamp)
+        
+    def detect(self, frame, timestamp: float = None, frame_size: tuple = None):
+        """Detect and track vehicles in ``frame``.
+
+        When ``frame`` is a reduced copy of the source, pass the source
+        (width, height) as ``frame_size``: ROI settings are scaled down to
+        the copy and boxes are returned in source coordinates.
+        """
+        scale = (1.0, 1.0)
+        if frame_size is not None:
+            scale = (frame.shape[1] / float(frame_size[0]), frame.shape[0] / float(frame_size[1]))
+        start = time.perf_counter()
+        detections = scale_detections(self._detect(frame, timestamp, scale), scale)
+        if self.policy is not None and self.policy.record(time.perf_counter() - start, len(detections)):
+            # The tracker is ours and carries on, so track IDs survive the switch
+            self.model, self.backend = self.models[self.level['model']]
+            logger.info(f"Detector level {self.policy.index}: {self.level}")
+        return detections
+        
+    def predict(self, timestamp: float):
+        """Vehicles of the last detection moved to ``timestamp``, or None if the tracker can't predict"""
+        if self.tracker is None or not hasattr(self.tracker, 'predict'):
+            return None
+        scale = self.roi_key[2]
+        return scale_detections(self.roi.filter(self.tracker.predict(timestamp)), scale)
+        
+    def _detect(self, frame, timestamp: float, scale: tuple):
         try:
+            roi = self._roi_for(frame, scale)
+            crops = [(frame, (0, 0))] if roi.is_full_frame else roi.crops(frame)
+            far_tiles = roi.far_field_crops(frame) if self.level['far_field'] else []
+            if (self.backend is not None or len(crops) > 1 or far_tiles or self.policy is not None
+                    or config.DETECTION_TRACKER != 'bytetrack'):
+                return roi.filter(self._detect_untracked(crops, frame.shape, timestamp, far_tiles))
+            frame, offset = crops[0]
+            
             # Run inference with tracking
             results = self.model.track(
                 frame,
                 persist=True,
                 classes=list(config.VEHICLE_CLASSES.keys()),
                 conf=config.CONFIDENCE_THRESHOLD,
+                imgsz=self.level['imgsz'],
                 verbose=False
             )[0]
             
@@ -41,15 +279,17 @@ class VehicleDetector:
                     if class_id not in config.VEHICLE_CLASSES:
                         continue
                     
+                    x1, y1, x2, y2 = box.xyxy[0]
                     detection = Detection(
                         track_id=int(box.id[0]),
                         class_name=config.VEHICLE_CLASSES[class_id],
-                        bbox=tuple(box.xyxy[0]),
-                        confidence=float(box.conf[0])
+                        bbox=(x1 + offset[0], y1 + offset[1], x2 + offset[0], y2 + offset[1]),
+                        confidence=float(box.conf[0]),
+                        timestamp=timestamp
                     )
                     detections.append(detection)
             
-            return detections
+            return roi.filter(detections)
             
         except Exception as e:
             print(f"Error during detection: {str(e)}")
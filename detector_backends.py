@@ -0,0 +1,195 @@
+"""Interchangeable YOLOv8 inference backends with NumPy pre- and post-processing"""
+import logging
+import os
+from typing import List, Sequence, Tuple
+import cv2
+import numpy as np
+import config
+from detector import nms
+
+logger = logging.getLogger(__name__)
+
+STRIDE = 32  # Input sides must be multiples of the model's largest stride
+MAX_NMS = 30000  # Candidates kept (by confidence) before NMS
+MAX_DETECTIONS = 300
+CLASS_OFFSET = 7680  # Shifts boxes per class so one NMS pass never mixes classes
+
+
+def letterbox(frame: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize so the long side is ``imgsz``, pad to a stride multiple; (image, ratio, (left, top))"""
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    out_w = int(np.ceil(new_w / STRIDE) * STRIDE)
+    out_h = int(np.ceil(new_h / STRIDE) * STRIDE)
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    left, top = (out_w - new_w) // 2, (out_h - new_h) // 2
+    image = cv2.copyMakeBorder(frame, top, out_h - new_h - top, left, out_w - new_w - left,
+                               cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image, ratio, (left, top)
+
+
+def preprocess(frames: Sequence[np.ndarray], imgsz: int):
+    """Batch of BGR frames -> (N, 3, H, W) float32 RGB blob and per-frame letterbox metadata"""
+    images, metas = [], []
+    for frame in frames:
+        image, ratio, pad = letterbox(frame, imgsz)
+        images.append(image)
+        metas.append((ratio, pad, frame.shape[:2]))
+    height = max(i.shape[0] for i in images)
+    width = max(i.shape[1] for i in images)
+    blob = np.full((len(images), height, width, 3), 114, dtype=np.uint8)
+    for i, image in enumerate(images):
+        blob[i, :image.shape[0], :image.shape[1]] = image
+    blob = blob[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, metas
+
+
+def postprocess(predictions: np.ndarray, metas, conf: float, iou: float,
+                classes: Sequence[int] = None) -> List[np.ndarray]:
+    """Raw (N, 4 + classes, anchors) output -> per frame (n, 6) x1, y1, x2, y2, conf, class"""
+    results = []
+    for prediction, (ratio, (left, top), (height, width)) in zip(predictions, metas):
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > conf
+        if classes is not None:
+            keep &= np.isin(class_ids, classes)
+        boxes, confidences, class_ids = prediction[keep, :4], confidences[keep], class_ids[keep]
+        if len(confidences) > MAX_NMS:
+            top_k = np.argsort(-confidences)[:MAX_NMS]
+            boxes, confidences, class_ids = boxes[top_k], confidences[top_k], class_ids[top_k]
+
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+        kept = nms(xyxy + class_ids[:, None] * CLASS_OFFSET, confidences, iou)[:MAX_DETECTIONS]
+        xyxy, confidences, class_ids = xyxy[kept], confidences[kept], class_ids[kept]
+
+        # Undo the letterbox
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - left) / ratio).clip(0, width)
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - top) / ratio).clip(0, height)
+        results.append(np.column_stack([xyxy, confidences, class_ids]).astype(np.float32))
+    return results
+
+
+class DetectorBackend:
+    """Runs a YOLOv8 detection model on batches of BGR frames.
+
+    Subclasses only implement ``_forward`` on the preprocessed blob, so
+    every backend shares the same letterbox, class filter and NMS, and
+    their boxes can be compared directly.
+    """
+    name = 'base'
+
+    def __init__(self, imgsz: int = None):
+        self.imgsz = imgsz or config.DETECTOR_IMGSZ
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, frames: Sequence[np.ndarray], conf: float = None, iou: float = None,
+                classes: Sequence[int] = None, imgsz: int = None) -> List[np.ndarray]:
+        blob, metas = preprocess(frames, imgsz or self.imgsz)
+        return postprocess(
+            self._forward(blob), metas,
+            config.CONFIDENCE_THRESHOLD if conf is None else conf,
+            config.NMS_IOU_THRESHOLD if iou is None else iou,
+            classes
+        )
+
+    def warmup(self, runs: int = 2):
+        """Run dummy frames so the first real frame doesn't pay for allocation and planning"""
+        frame = np.full((self.imgsz * 9 // 16, self.imgsz, 3), 114, dtype=np.uint8)
+        for _ in range(runs):
+            self.predict([frame])
+
+
+class TorchBackend(DetectorBackend):
+    """The ultralytics PyTorch model, fused, called directly"""
+    name = 'torch'
+
+    def __init__(self, model_path: str = None, imgsz: int = None):
+        super().__init__(imgsz)
+        import torch
+        from ultralytics import YOLO
+
+        self.torch = torch
+        self.model = YOLO(model_path or config.YOLO_MODEL).model.fuse(verbose=False).eval()
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            output = self.model(self.torch.from_numpy(blob))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.numpy()
+
+
+def _stale(path: str, source: str) -> bool:
+    return not os.path.exists(path) or (
+        os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(path))
+
+
+def cached_onnx_model(model_path: str = None, int8: bool = False, cache_dir: str = None) -> str:
+    """Path of the ONNX export (and INT8 copy) of a model, exporting on first use"""
+    model_path = model_path or config.YOLO_MODEL
+    cache_dir = cache_dir or config.MODEL_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    fp32 = os.path.join(cache_dir, f'{stem}.onnx')
+    if _stale(fp32, model_path):
+        from ultralytics import YOLO
+        logger.info(f"Exporting {model_path} to {fp32}")
+        exported = YOLO(model_path).export(format='onnx', dynamic=True, simplify=False, verbose=False)
+        os.replace(exported, fp32)
+    if not int8:
+        return fp32
+    quantized = os.path.join(cache_dir, f'{stem}_int8.onnx')
+    if _stale(quantized, fp32):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info(f"Quantizing {fp32} to {quantized}")
+        quantize_dynamic(fp32, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
+
+class OnnxBackend(DetectorBackend):
+    """ONNX Runtime on CPU, from an export cached in MODEL_CACHE_DIR"""
+    name = 'onnx'
+
+    def __init__(self, model_path: str = None, imgsz: int = None, int8: bool = None,
+                 intra_op_threads: int = None, inter_op_threads: int = None, cache_dir: str = None):
+        super().__init__(imgsz)
+        import onnxruntime as ort
+
+        int8 = config.ONNX_INT8 if int8 is None else int8
+        self.path = cached_onnx_model(model_path, int8, cache_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = config.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        options.inter_op_num_threads = config.ONNX_INTER_OP_THREADS if inter_op_threads is None else inter_op_threads
+        self.session = ort.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        if int8:
+            self.name = 'onnx-int8'
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+BACKENDS = {
+    'torch': TorchBackend,
+    'onnx': OnnxBackend,
+}
+
+
+def create_backend(name: str = None, **kwargs) -> DetectorBackend:
+    """Backend by name ('torch' or 'onnx'), warmed up and ready"""
+    name = name or config.DETECTOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name} (expected one of {', '.join(BACKENDS)})")
+    backend = BACKENDS[name](**kwargs)
+    backend.warmup()
+    return backend
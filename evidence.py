@@ -0,0 +1,216 @@
+"""Violation evidence: a compressed pre-roll of recent frames and background encoding"""
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+import config
+from detector import Detection
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRing:
+    """Recent frames as JPEG bytes, bounded by duration and by total size"""
+
+    def __init__(self, seconds: float, max_bytes: int):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.frames: deque = deque()  # (timestamp, jpeg bytes), oldest first
+        self.bytes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def append(self, timestamp: float, data: bytes):
+        self.frames.append((timestamp, data))
+        self.bytes += len(data)
+        while self.frames and (self.bytes > self.max_bytes or
+                               timestamp - self.frames[0][0] > self.seconds):
+            _, old = self.frames.popleft()
+            self.bytes -= len(old)
+            self.evicted += 1
+
+    def between(self, start: float, end: float) -> List[Tuple[float, bytes]]:
+        return [(t, data) for t, data in self.frames if start <= t <= end]
+
+
+class _Job:
+    """Evidence for one violation, waiting for its post-roll frames"""
+
+    def __init__(self, violation_id: str, info: dict, snapshot: np.ndarray, start: float, end: float):
+        self.violation_id = violation_id
+        self.info = info
+        self.snapshot = snapshot
+        self.start = start
+        self.end = end
+
+
+class EvidenceRecorder:
+    """Keeps a short compressed pre-roll and writes evidence for each violation.
+
+    ``add_frame`` is the only per-frame call on the processing loop: it
+    samples frames at ``fps``, shrinks them to ``width`` pixels and queues
+    them. A background thread JPEG-encodes them into a FrameRing capped at
+    ``preroll + postroll`` seconds and ``max_memory_mb``. ``trigger`` copies
+    a padded crop of the vehicle and queues a job; once ``postroll`` seconds
+    of frames have arrived, a worker pool writes ``<id>.jpg`` (the crop),
+    ``<id>.mp4`` (the clip around the violation) and ``<id>.json`` (the
+    violation and file names) to ``directory``. Frames and jobs beyond the
+    queue and pending limits are dropped and counted, never waited for.
+    """
+
+    _STOP = object()
+
+    def __init__(self, directory: str = None, preroll: float = None, postroll: float = None,
+                 fps: float = None, width: int = None, quality: int = None,
+                 max_memory_mb: float = None, workers: int = None, max_pending: int = None):
+        self.directory = directory or config.EVIDENCE_DIR
+        self.preroll = config.EVIDENCE_PREROLL if preroll is None else preroll
+        self.postroll = config.EVIDENCE_POSTROLL if postroll is None else postroll
+        self.fps = fps or config.EVIDENCE_FPS
+        self.width = width or config.EVIDENCE_WIDTH
+        self.quality = quality or config.EVIDENCE_JPEG_QUALITY
+        self.max_pending = max_pending or config.EVIDENCE_MAX_PENDING
+        max_bytes = int((max_memory_mb or config.EVIDENCE_MAX_MEMORY_MB) * 1024 * 1024)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.ring = FrameRing(self.preroll + self.postroll, max_bytes)
+        self.queue = queue.Queue(maxsize=max(2, int(self.fps)))
+        self.pool = ThreadPoolExecutor(max_workers=workers or config.EVIDENCE_WORKERS,
+                                       thread_name_prefix='evidence')
+        self.pending: List[_Job] = []
+        self.last_sample = None
+        self.sampled = 0
+        self.dropped_frames = 0
+        self.dropped_jobs = 0
+        self.triggered = 0
+        self.written = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add_frame(self, frame: np.ndarray, timestamp: float):
+        """Offer a raw frame for the pre-roll; cheap, and skips frames between samples"""
+        if self.last_sample is not None and timestamp - self.last_sample < 0.999 / self.fps:
+            return
+        self.last_sample = timestamp
+        height, width = frame.shape[:2]
+        if width > self.width:
+            small = cv2.resize(frame, (self.width, int(round(height * self.width / width))),
+                               interpolation=cv2.INTER_LINEAR)
+        else:
+            small = frame.copy()  # Capture buffers are reused
+        try:
+            self.queue.put_nowait(('frame', timestamp, small))
+            self.sampled += 1
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def trigger(self, violation_id: str, detection: Detection, speed: float, speed_limit: float,
+                frame: np.ndarray, timestamp: float):
+        """Start evidence for a violation seen on ``frame`` at ``timestamp``"""
+        padding = config.EVIDENCE_SNAPSHOT_PADDING
+        x1, y1, x2, y2 = detection.bbox
+        pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+        height, width = frame.shape[:2]
+        left, top = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        right, bottom = min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y))
+        snapshot = frame[top:bottom, left:right].copy()
+        info = {
+            'violation_id': violation_id,
+            'track_id': detection.track_id,
+            'vehicle_type': detection.class_name,
+            'speed': round(float(speed), 1),
+            'speed_limit': speed_limit,
+            'time': round(float(timestamp), 3),
+            'bbox': [round(float(c), 1) for c in detection.bbox],
+            'lane': detection.lane,
+        }
+        job = _Job(violation_id, info, snapshot, timestamp - self.preroll, timestamp + self.postroll)
+        try:
+            self.queue.put_nowait(('job', timestamp, job))
+            self.triggered += 1
+        except queue.Full:
+            self.dropped_jobs += 1
+            logger.warning(f"Evidence queue full, no evidence for violation {violation_id}")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            kind, timestamp, payload = item
+            try:
+                if kind == 'frame':
+                    ok, data = cv2.imencode('.jpg', payload, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                    if ok:
+                        self.ring.append(timestamp, data.tobytes())
+                    self._submit_ready(timestamp)
+                elif len(self.pending) >= self.max_pending:
+                    self.dropped_jobs += 1
+                    logger.warning(f"Too many pending evidence jobs, dropped {payload.violation_id}")
+                else:
+                    self.pending.append(payload)
+            except Exception as e:
+                logger.error(f"Error buffering evidence: {str(e)}")
+        # Finish what can be finished with the frames already buffered
+        self._submit_ready(float('inf'))
+
+    def _submit_ready(self, now: float):
+        ready = [job for job in self.pending if job.end <= now]
+        if not ready:
+            return
+        self.pending = [job for job in self.pending if job.end > now]
+        for job in ready:
+            frames = self.ring.between(job.start, job.end)
+            self.pool.submit(self._write, job, frames)
+
+    def _write(self, job: _Job, frames: List[Tuple[float, bytes]]):
+        base = os.path.join(self.directory, job.violation_id)
+        try:
+            info = dict(job.info)
+            if job.snapshot.size:
+                cv2.imwrite(base + '.jpg', job.snapshot, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                info['snapshot'] = os.path.basename(base + '.jpg')
+            if frames:
+                first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+                size = (first.shape[1], first.shape[0])
+                writer = cv2.VideoWriter(base + '.mp4', cv2.VideoWriter_fourcc(*'mp4v'), self.fps, size)
+                writer.write(first)
+                for _, data in frames[1:]:
+                    writer.write(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+                writer.release()
+                info['clip'] = os.path.basename(base + '.mp4')
+                info['clip_start'] = round(frames[0][0], 3)
+                info['clip_end'] = round(frames[-1][0], 3)
+            with open(base + '.json', 'w') as f:
+                json.dump(info, f)
+            self.written += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error writing evidence for {job.violation_id}: {str(e)}")
+
+    def close(self, timeout: float = None):
+        """Write evidence for every triggered violation with the frames so far, then stop"""
+        self.queue.put(self._STOP)
+        self.thread.join(timeout)
+        self.pool.shutdown(wait=True)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'evidence_frames_sampled': self.sampled,
+            'evidence_frames_dropped': self.dropped_frames,
+            'evidence_ring_frames': len(self.ring),
+            'evidence_ring_mb': self.ring.bytes / (1024 * 1024),
+            'evidence_triggered': self.triggered,
+            'evidence_written': self.written,
+            'evidence_dropped': self.dropped_jobs,
+            'evidence_failed': self.failed,
+        }
@@ -0,0 +1,195 @@
+"""Adaptive scheduling of detection frames"""
+import math
+from dataclasses import replace
+from typing import Callable, Dict, List, Sequence
+import config
+from detector import Detection
+
+
+class AdaptiveFrameScheduler:
+    """Chooses how many frames to wait between detector calls.
+
+    The interval is the smallest one that lets the detector's measured
+    latency, spread over the frames in between, fit the per-frame budget
+    (1 / target FPS, or the latency budget if tighter). It grows by one
+    step whenever the capture queue is full, i.e. we are falling behind
+    the source, and shrinks by at most one step at a time while the queue
+    is empty, so it doesn't oscillate.
+    """
+
+    def __init__(self, source_fps: float = 30.0, target_fps: float = None,
+                 latency_budget_ms: float = None, min_interval: int = None,
+                 max_interval: int = None, initial_interval: int = None,
+                 adaptive: bool = None, smoothing: float = 0.2):
+        target_fps = target_fps or config.TARGET_OUTPUT_FPS or source_fps
+        self.frame_budget = 1.0 / target_fps
+        latency_budget_ms = latency_budget_ms or config.FRAME_LATENCY_BUDGET_MS
+        if latency_budget_ms:
+            self.frame_budget = min(self.frame_budget, latency_budget_ms / 1000.0)
+        self.min_interval = min_interval or config.MIN_DETECTION_INTERVAL
+        self.max_interval = max_interval or config.MAX_DETECTION_INTERVAL
+        self.interval = initial_interval or config.DETECTION_INTERVAL
+        self.adaptive = config.ADAPTIVE_DETECTION if adaptive is None else adaptive
+        self.smoothing = smoothing
+
+        self.detect_latency = None  # EMA of detector call time, seconds
+        self.frame_cost = 0.0  # EMA of time spent on a skipped frame, seconds
+        self.frames_since_detection = None
+        self.processed = 0
+        self.skipped = 0
+
+    def should_detect(self) -> bool:
+        """Call once per frame; True if this frame should go to the detector"""
+        if self.frames_since_detection is None or self.frames_since_detection + 1 >= self.interval:
+            self.frames_since_detection = 0
+            self.processed += 1
+            return True
+        self.frames_since_detection += 1
+        self.skipped += 1
+        return False
+
+    def _ema(self, current, sample):
+        if current is None:
+            return sample
+        return current * (1 - self.smoothing) + sample * self.smoothing
+
+    def record_skipped_frame(self, elapsed: float):
+        """Time spent on a frame that skipped detection (propagate, draw, display)"""
+        self.frame_cost = self._ema(self.frame_cost, elapsed)
+
+    def record_detection(self, latency: float, queue_depth: int = 0, queue_capacity: int = 0):
+        """Report a detector call and the capture backlog, then re-plan the interval"""
+        self.detect_latency = self._ema(self.detect_latency, latency)
+        if not self.adaptive:
+            return
+
+        spare = max(self.frame_budget - self.frame_cost, 1e-3)
+        # Average frame time is detect_latency / interval + frame_cost
+        needed = math.ceil(self.detect_latency / spare)
+        if queue_capacity and queue_depth >= queue_capacity:
+            needed = max(needed, self.interval + 1)
+        elif needed < self.interval:
+            if queue_depth > 0:
+                needed = self.interval  # Don't speed up while a backlog remains
+            else:
+                needed = self.interval - 1
+        self.interval = max(self.min_interval, min(self.max_interval, needed))
+
+    def metrics(self) -> dict:
+        total = self.processed + self.skipped
+        return {
+            'detection_interval': self.interval,
+            'processed_frames': self.processed,
+            'skipped_frames': self.skipped,
+            'skip_ratio': self.skipped / total if total else 0.0,
+            'detect_latency_ms': (self.detect_latency or 0.0) * 1000,
+        }
+
+
+class DetectorLevelPolicy:
+    """Picks the detector level (model, input size, far-field tiling) for the scene load.
+
+    Levels are ordered cheapest first. After each detector call the policy
+    steps down a level when calls take longer than the budget or the scene
+    is quiet. It steps up when the next level is expected to fit the
+    budget with some headroom and either the scene is busy or, below the
+    default level, no longer quiet: cheap levels miss small vehicles, so
+    they can't be trusted to see a scene fill up. The next level's latency
+    is its own measurement or, if it has not run recently, the current
+    latency scaled by ``cost`` (model input pixels per frame; imgsz squared
+    by default). Latency and vehicle count are moving averages, and the
+    level changes at most once every ``switch_calls`` calls.
+    """
+
+    def __init__(self, levels: Sequence[Dict], latency_budget_ms: float = None, quiet_count: float = None,
+                 busy_count: float = None, switch_calls: int = None, default: int = None,
+                 cost: Callable[[Dict], float] = None, smoothing: float = 0.2, headroom: float = 0.8):
+        self.levels = [dict(level) for level in levels]
+        for level in self.levels:
+            level.setdefault('model', config.YOLO_MODEL)
+            level.setdefault('imgsz', config.DETECTOR_IMGSZ)
+            level.setdefault('far_field', False)
+        self.budget = (latency_budget_ms or config.DETECTOR_LATENCY_BUDGET_MS) / 1000.0
+        self.quiet_count = config.DETECTOR_QUIET_COUNT if quiet_count is None else quiet_count
+        self.busy_count = config.DETECTOR_BUSY_COUNT if busy_count is None else busy_count
+        self.switch_calls = config.DETECTOR_SWITCH_CALLS if switch_calls is None else switch_calls
+        default = config.DETECTOR_DEFAULT_LEVEL if default is None else default
+        self.default = max(0, min(len(self.levels) - 1, default))
+        self.index = self.default
+        self.cost = cost or (lambda level: float(level['imgsz']) ** 2)
+        self.smoothing = smoothing
+        self.headroom = headroom
+
+        self.latency = [None] * len(self.levels)  # EMA per level, seconds
+        self.measured_at = [0] * len(self.levels)  # Call count of each level's last sample
+        self.count = None  # EMA of vehicles per call
+        self.calls = 0
+        self.last_switch = 0
+        self.switches = 0
+
+    @property
+    def level(self) -> Dict:
+        return self.levels[self.index]
+
+    def _ema(self, current, sample):
+        if current is None:
+            return sample
+        return current * (1 - self.smoothing) + sample * self.smoothing
+
+    def _expected_latency(self, index: int) -> float:
+        # Measurements older than a few switch periods may predate a change in load
+        if self.latency[index] is not None and self.calls - self.measured_at[index] < 10 * self.switch_calls:
+            return self.latency[index]
+        level, current = self.levels[index], self.level
+        ratio = self.cost(level) / max(self.cost(current), 1.0)
+        if level['model'] != current['model']:
+            ratio *= 2  # Unknown cost per pixel; only try it with plenty of room
+        return self.latency[self.index] * ratio
+
+    def record(self, latency: float, vehicles: int) -> bool:
+        """Report a detector call at the current level; True if the level changed"""
+        self.calls += 1
+        self.latency[self.index] = self._ema(self.latency[self.index], latency)
+        self.measured_at[self.index] = self.calls
+        self.count = self._ema(self.count, float(vehicles))
+        if self.calls - self.last_switch < self.switch_calls:
+            return False
+
+        target = self.index
+        busy = self.count >= (self.quiet_count if self.index < self.default else self.busy_count)
+        if self.latency[self.index] > self.budget or self.count < self.quiet_count:
+            target = self.index - 1
+        elif (busy and self.index + 1 < len(self.levels)
+              and self._expected_latency(self.index + 1) <= self.budget * self.headroom):
+            target = self.index + 1
+        if target == self.index or not 0 <= target < len(self.levels):
+            return False
+        self.index = target
+        self.last_switch = self.calls
+        self.switches += 1
+        return True
+
+    def metrics(self) -> dict:
+        return {
+            'detector_level': self.index,
+            'detector_imgsz': self.level['imgsz'],
+            'detector_level_switches': self.switches,
+            'detector_vehicles': self.count or 0.0,
+        }
+
+
+def propagate_detections(detections: List[Detection], tracker, timestamp: float) -> List[Detection]:
+    """Move last known boxes along each track's velocity to ``timestamp``"""
+    if timestamp is None:
+        return detections
+    propagated = []
+    for det in detections:
+        vx, vy = tracker.get_velocity(det.track_id)
+        dt = timestamp - det.timestamp if det.timestamp is not None else 0.0
+        if dt <= 0 or (vx == 0.0 and vy == 0.0):
+            propagated.append(det)
+            continue
+        dx, dy = vx * dt, vy * dt
+        x1, y1, x2, y2 = det.bbox
+        propagated.append(replace(det, bbox=(x1 + dx, y1 + dy, x2 + dx, y2 + dy), timestamp=timestamp))
+    return propagated
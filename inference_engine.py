@@ -0,0 +1,241 @@
+"""Shared batched inference for multiple video streams"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Union
+import numpy as np
+import config
+from detector import Detection, StreamTracker, scale_detections
+from tracker import IoUTracker, create_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class StreamStats:
+    """Throughput and latency counters for one stream (or all of them)"""
+
+    def __init__(self, window: int = 1000):
+        self.frames = 0
+        self.started = None
+        self.latencies = deque(maxlen=window)
+
+    def record(self, latency: float):
+        if self.started is None:
+            self.started = time.perf_counter() - latency
+        self.frames += 1
+        self.latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        latencies = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'frames': self.frames,
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'latency_ms_p50': float(np.percentile(latencies, 50)),
+            'latency_ms_p95': float(np.percentile(latencies, 95)),
+        }
+
+
+class _Request:
+    __slots__ = ('stream_id', 'frame', 'timestamp', 'submitted', 'future')
+
+    def __init__(self, stream_id, frame, timestamp):
+        self.stream_id = stream_id
+        self.frame = frame
+        self.timestamp = timestamp
+        self.submitted = time.perf_counter()
+        self.future = Future()
+
+
+class BatchInferenceEngine:
+    """Loads the model once and serves detections for many streams.
+
+    Frames submitted from any thread are grouped into micro-batches of at
+    most ``max_batch_size`` frames, waiting no longer than ``max_wait_ms``
+    after the first frame of a batch arrives. Each batch runs through a
+    single forward pass and the boxes are handed to that stream's own
+    tracker, so track IDs never collide between streams.
+    """
+
+    def __init__(self, max_batch_size: int = None, max_wait_ms: float = None, model=None):
+        from ultralytics import YOLO
+
+        self.model = model or YOLO(config.YOLO_MODEL)
+        self.max_batch_size = max_batch_size or config.BATCH_MAX_SIZE
+        self.max_wait = (config.BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.requests = queue.Queue()
+        self.trackers: Dict[str, Union[StreamTracker, IoUTracker]] = {}
+        self.lock = threading.Lock()  # Guards trackers and stream_stats
+        self.stream_stats: Dict[str, StreamStats] = {}
+        self.aggregate = StreamStats()
+        self.batches = 0
+        self.batched_frames = 0
+        self.inference_time = 0.0
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def register_stream(self, stream_id, frame_rate: float = 30.0):
+        """Create the tracker for a stream ahead of its first frame"""
+        with self.lock:
+            if stream_id not in self.trackers:
+                self.trackers[stream_id] = create_tracker(frame_rate=frame_rate)
+                self.stream_stats[stream_id] = StreamStats()
+
+    def reset_stream(self, stream_id):
+        """Replace a stream's tracker; the engine thread never sees the stream without one"""
+        with self.lock:
+            frame_rate = getattr(self.trackers.get(stream_id), 'frame_rate', 30.0)
+            self.trackers[stream_id] = create_tracker(frame_rate=frame_rate)
+            self.stream_stats.setdefault(stream_id, StreamStats())
+
+    def submit(self, stream_id, frame, timestamp: float = None) -> Future:
+        """Queue a frame; the future resolves to that frame's detections"""
+        self.register_stream(stream_id)
+        request = _Request(stream_id, frame, timestamp)
+        self.requests.put(request)
+        return request.future
+
+    def detect(self, stream_id, frame, timestamp: float = None) -> List[Detection]:
+        """Blocking drop-in for ``VehicleDetector.detect`` on a given stream"""
+        return self.submit(stream_id, frame, timestamp).result()
+
+    def stream_detector(self, stream_id, frame_rate: float = 30.0) -> 'StreamDetector':
+        """A ``VehicleDetector`` stand-in that sends one stream's frames through this engine"""
+        self.register_stream(stream_id, frame_rate)
+        return StreamDetector(self, stream_id)
+
+    def _collect_batch(self) -> List[_Request]:
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self.stopped:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                start = time.perf_counter()
+                results = self.model.predict(
+                    [r.frame for r in batch],
+                    classes=list(config.VEHICLE_CLASSES.keys()),
+                    conf=config.CONFIDENCE_THRESHOLD,
+                    imgsz=config.DETECTOR_IMGSZ,
+                    verbose=False
+                )
+                self.inference_time += time.perf_counter() - start
+                self.batches += 1
+                self.batched_frames += len(batch)
+            except Exception as e:
+                logger.error(f"Error during batched detection: {str(e)}")
+                for request in batch:
+                    request.future.set_result([])
+                continue
+
+            for request, result in zip(batch, results):
+                try:
+                    with self.lock:
+                        tracker = self.trackers[request.stream_id]
+                    detections = tracker.update(
+                        result.boxes.cpu().numpy(), request.frame, request.timestamp
+                    )
+                except Exception as e:
+                    logger.error(f"Error tracking stream {request.stream_id}: {str(e)}")
+                    detections = []
+                latency = time.perf_counter() - request.submitted
+                self.stream_stats[request.stream_id].record(latency)
+                self.aggregate.record(latency)
+                request.future.set_result(detections)
+
+    def run_streams(self, captures: Dict, on_result: Callable = None) -> List[threading.Thread]:
+        """Feed every ``ThreadedVideoCapture`` in ``captures`` through the engine.
+
+        One reader thread per stream submits frames and waits for its own
+        result, so each stream has at most one frame in flight and frames
+        from different streams fill the batches. ``on_result`` is called as
+        ``on_result(stream_id, frame, detections)`` on the reader thread.
+        """
+        threads = []
+        for stream_id, capture in captures.items():
+            self.register_stream(stream_id, capture.fps)
+            thread = threading.Thread(
+                target=self._read_stream, args=(stream_id, capture, on_result), daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _read_stream(self, stream_id, capture, on_result):
+        while not self.stopped:
+            ret, frame, timestamp = capture.read_timestamped()
+            if not ret or frame is None:
+                break
+            detections = self.detect(stream_id, frame, timestamp)
+            if on_result is not None:
+                on_result(stream_id, frame, detections)
+
+    def stats(self) -> dict:
+        """Per-stream and aggregate throughput/latency counters"""
+        return {
+            'streams': {sid: s.snapshot() for sid, s in self.stream_stats.items()},
+            'aggregate': {
+                **self.aggregate.snapshot(),
+                'batches': self.batches,
+                'mean_batch_size': self.batched_frames / self.batches if self.batches else 0.0,
+                'inference_ms_per_frame': (
+                    self.inference_time / self.batched_frames * 1000 if self.batched_frames else 0.0
+                ),
+            },
+        }
+
+    def close(self):
+        self.stopped = True
+        if self.thread.is_alive():
+            self.thread.join()
+        # Release anyone still waiting on a frame that never reached a batch
+        while not self.requests.empty():
+            self.requests.get_nowait().future.set_result([])
+
+
+class StreamDetector:
+    """One stream's view of a BatchInferenceEngine, with VehicleDetector's interface"""
+
+    def __init__(self, engine: BatchInferenceEngine, stream_id):
+        self.engine = engine
+        self.stream_id = stream_id
+        self.scale = (1.0, 1.0)
+
+    def detect(self, frame, timestamp: float = None, frame_size: tuple = None) -> List[Detection]:
+        scale = (1.0, 1.0)
+        if frame_size is not None:
+            scale = (frame.shape[1] / float(frame_size[0]), frame.shape[0] / float(frame_size[1]))
+        self.scale = scale
+        return scale_detections(self.engine.detect(self.stream_id, frame, timestamp), scale)
+
+    def predict(self, timestamp: float):
+        tracker = self.engine.trackers.get(self.stream_id)
+        if not hasattr(tracker, 'predict'):
+            return None
+        return scale_detections(tracker.predict(timestamp), self.scale)
+
+    def warmup(self, width: int = 640, height: int = 360):
+        pass  # The engine's model is shared and stays loaded
+
+    def reset(self):
+        """Start the stream over with a new tracker"""
+        self.engine.reset_stream(self.stream_id)
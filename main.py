@@ -2,17 +2,21 @@
 import sys
 import os
 import logging
-from video_processor import VideoProcessor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def main():
     try:
+        # No window with --headless; see RESTREAM in config.py to watch the output
+        args = [arg for arg in sys.argv[1:] if arg != '--headless']
+        headless = len(args) < len(sys.argv) - 1
+        
         # Get video source
-        if len(sys.argv) > 1:
-            video_source = sys.argv[1]
-            if not os.path.exists(video_source):
+        if args:
+            video_source = args[0]
+            # Network streams (rtsp://, http://, ...) are opened with reconnects
+            if '://' not in video_source and not os.path.exists(video_source):
                 logger.error(f"Video file not found: {video_source}")
                 return
         else:
@@ -21,9 +25,12 @@ def main():
         print("Vehicle Speed Detection System")
         print("------------------------------")
         print(f"Source: {'Webcam' if video_source == 0 else video_source}")
-        print("Press 'q' to quit")
+        if not headless:
+            print("Press 'q' to quit")
         
-        processor = VideoProcessor(video_source)
+        # Imported after the argument checks, so a bad path fails at once
+        from video_processor import VideoProcessor
+        processor = VideoProcessor(video_source, display=not headless)
         processor.process_video()
         
     except Exception as e:
@@ -0,0 +1,307 @@
+"""Per-stage timers, gauges and exporters for the processing loop"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import signal
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'speed_detection'
+QUANTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Recent samples of one measurement, plus lifetime count and sum"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentiles(self) -> Dict[int, float]:
+        samples = list(self.samples)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return dict(zip(QUANTILES, np.percentile(samples, QUANTILES).tolist()))
+
+
+class _NullTimer:
+    """Stand-in for a stage timer while metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Stage latency histograms, per-frame value histograms, gauges and counters.
+
+    When disabled every call returns immediately (``stage`` hands out a
+    shared no-op context manager), so instrumented code pays one attribute
+    check per call.
+    """
+
+    def __init__(self, enabled: bool = None, window: int = None):
+        self.enabled = config.METRICS_ENABLED if enabled is None else enabled
+        self.window = window or config.METRICS_WINDOW
+        self.stages: Dict[str, Histogram] = {}
+        self.values: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.started = time.time()
+
+    def _histogram(self, table: Dict[str, Histogram], name: str) -> Histogram:
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = Histogram(self.window)
+        return histogram
+
+    def stage(self, name: str):
+        """Context manager timing one run of a stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(self.stages, name))
+
+    def observe_stage(self, name: str, seconds: float):
+        if self.enabled:
+            self._histogram(self.stages, name).observe(seconds)
+
+    def record(self, name: str, value: float):
+        """Add a per-frame sample, e.g. detections in the frame"""
+        if self.enabled:
+            self._histogram(self.values, name).observe(value)
+
+    def set_gauge(self, name: str, value: float):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def inc(self, name: str, amount: float = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self) -> dict:
+        """Everything as plain numbers; stage latencies in milliseconds"""
+        stages = {}
+        for name, histogram in list(self.stages.items()):
+            entry = {f'p{q}_ms': v * 1000 for q, v in histogram.percentiles().items()}
+            entry['count'] = histogram.count
+            entry['mean_ms'] = histogram.total / histogram.count * 1000 if histogram.count else 0.0
+            stages[name] = entry
+        values = {}
+        for name, histogram in list(self.values.items()):
+            entry = {f'p{q}': v for q, v in histogram.percentiles().items()}
+            entry['count'] = histogram.count
+            entry['mean'] = histogram.total / histogram.count if histogram.count else 0.0
+            values[name] = entry
+        return {
+            'time': time.time(),
+            'uptime_s': time.time() - self.started,
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'stages': stages,
+            'values': values,
+        }
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (summaries, gauges, counters)"""
+        lines = []
+
+        def summary(metric, label, table, scale):
+            if not table:
+                return
+            lines.append(f"# TYPE {metric} summary")
+            for name, histogram in list(table.items()):
+                for q, v in histogram.percentiles().items():
+                    lines.append(f'{metric}{{{label}="{name}",quantile="{q / 100}"}} {v * scale:.6g}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.total * scale:.6g}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+        summary(f'{PREFIX}_stage_seconds', 'stage', self.stages, 1.0)
+        summary(f'{PREFIX}_frame_value', 'name', self.values, 1.0)
+        for name, value in list(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value:.6g}")
+        for name, value in list(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def overlay_lines(self) -> List[str]:
+        """Short per-stage summary for drawing on the frame"""
+        lines = []
+        for name, histogram in list(self.stages.items()):
+            p = histogram.percentiles()
+            lines.append(f"{name:<8} p50 {p[50] * 1000:5.1f}  p95 {p[95] * 1000:5.1f} ms")
+        for name, value in list(self.gauges.items()):
+            lines.append(f"{name} {value:g}")
+        return lines
+
+
+class MetricsServer:
+    """Serves Metrics.prometheus_text() on http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the log
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Serving metrics on http://{host}:{self.port}/metrics")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JsonlExporter:
+    """Appends a Metrics snapshot to a JSONL file every interval seconds"""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = None):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval or config.METRICS_JSONL_INTERVAL
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(self.metrics.snapshot()) + "\n")
+        except Exception as e:
+            logger.error(f"Error writing metrics: {str(e)}")
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()  # Final snapshot covers the end of the run
+
+
+def start_exporters(metrics: Metrics) -> list:
+    """Exporters enabled in config; each has a close() method"""
+    exporters = []
+    if not metrics.enabled:
+        return exporters
+    if config.METRICS_HTTP_PORT:
+        exporters.append(MetricsServer(metrics, config.METRICS_HTTP_PORT))
+    if config.METRICS_JSONL_FILE:
+        exporters.append(JsonlExporter(metrics, config.METRICS_JSONL_FILE))
+    return exporters
+
+
+class FrameProfiler:
+    """cProfile over the next N frames, started on demand.
+
+    Call ``request()`` (from a key handler, a signal handler or another
+    thread) and ``frame_done()`` at the end of every frame; profiling
+    starts at the next frame boundary and the stats are dumped after N
+    frames, ready for ``python -m pstats`` or snakeviz. Sampling profilers
+    such as py-spy can attach to the process at any time instead.
+    """
+
+    def __init__(self, frames: int = None, output: str = None):
+        self.frames = frames or config.PROFILE_FRAMES
+        self.output = output or config.PROFILE_OUTPUT
+        self.pending = None
+        self.profile = None
+        self.remaining = 0
+        self.last_output = None
+
+    def request(self, frames: int = None):
+        if self.profile is None:
+            self.pending = frames or self.frames
+
+    def install_signal_handler(self, signum=None):
+        """Profile on SIGUSR1 (``kill -USR1 <pid>``) where the platform has it"""
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.request())
+        return True
+
+    @property
+    def active(self) -> bool:
+        return self.profile is not None
+
+    def frame_done(self):
+        if self.profile is not None:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self._finish()
+        elif self.pending:
+            self.remaining = self.pending
+            self.pending = None
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            logger.info(f"Profiling the next {self.remaining} frames")
+
+    def _finish(self):
+        self.profile.disable()
+        path = self.output.format(time=time.strftime('%Y%m%d_%H%M%S'))
+        try:
+            self.profile.dump_stats(path)
+            self.last_output = path
+            summary = io.StringIO()
+            pstats.Stats(self.profile, stream=summary).sort_stats('cumulative').print_stats(15)
+            logger.info(f"Saved profile to {path}\n{summary.getvalue()}")
+        except Exception as e:
+            logger.error(f"Error saving profile: {str(e)}")
+        self.profile = None
+
+    def close(self):
+        if self.profile is not None:
+            self._finish()
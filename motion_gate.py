@@ -0,0 +1,87 @@
+"""Cheap scene-change check that lets detection skip static frames"""
+import cv2
+import numpy as np
+import config
+from roi import RegionOfInterest
+
+
+class MotionGate:
+    """Decides whether a frame has changed enough to be worth detecting.
+
+    The ROI of each frame is shrunk to about ``width`` pixels across,
+    blurred and compared with a running-average background. A frame
+    passes when more than ``min_area`` of the ROI differs from the
+    background by more than ``threshold`` levels in any colour channel
+    (a grey comparison misses vehicles as bright as the road), or when
+    ``keyframe_interval`` seconds of stream time have passed since the last
+    frame that passed, so tracks of stopped vehicles stay alive.
+    """
+    def __init__(self, frame_width: int, frame_height: int, width: int = None,
+                 threshold: float = None, min_area: float = None,
+                 keyframe_interval: float = None, learning_rate: float = None,
+                 roi: RegionOfInterest = None):
+        self.threshold = threshold or config.MOTION_PIXEL_THRESHOLD
+        self.min_area = min_area if min_area is not None else config.MOTION_MIN_AREA
+        self.keyframe_interval = keyframe_interval or config.MOTION_KEYFRAME_INTERVAL
+        self.learning_rate = learning_rate or config.MOTION_BACKGROUND_RATE
+
+        roi = roi or RegionOfInterest.from_config(frame_width, frame_height)
+        x0, y0, x1, y1 = roi.bounds
+        self.bounds = roi.bounds
+        scale = min(1.0, (width or config.MOTION_GATE_WIDTH) / float(x1 - x0))
+        self.size = (max(1, int(round((x1 - x0) * scale))), max(1, int(round((y1 - y0) * scale))))
+        self.mask = None
+        if roi.polygon is not None:
+            mask = np.zeros(self.size[::-1], dtype=np.uint8)
+            shifted = np.round((roi.polygon - (x0, y0)) * scale).astype(np.int32)
+            cv2.fillPoly(mask, [shifted], 255)
+            self.mask = mask > 0
+        self.area = int(np.count_nonzero(self.mask)) if self.mask is not None else self.size[0] * self.size[1]
+
+        self.background = None
+        self.last_pass = None
+        self.changed = 0.0  # Changed share of the ROI in the last checked frame
+        self.checked = 0
+        self.skipped = 0
+        self.keyframes = 0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        x0, y0, x1, y1 = self.bounds
+        small = cv2.resize(frame[y0:y1, x0:x1], self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0).astype(np.float32)
+
+    def should_detect(self, frame: np.ndarray, timestamp: float) -> bool:
+        """Call for each frame that would go to the detector; False to skip it"""
+        image = self._prepare(frame)
+        self.checked += 1
+        if self.background is None:
+            self.background = image
+            self.last_pass = timestamp
+            return True
+
+        difference = cv2.absdiff(image, self.background)
+        if difference.ndim == 3:
+            difference = difference.max(axis=2)
+        changed = difference > self.threshold
+        if self.mask is not None:
+            changed &= self.mask
+        self.changed = np.count_nonzero(changed) / float(max(self.area, 1))
+        cv2.accumulateWeighted(image, self.background, self.learning_rate)
+
+        if self.changed > self.min_area:
+            self.last_pass = timestamp
+            return True
+        if timestamp - self.last_pass >= self.keyframe_interval:
+            self.last_pass = timestamp
+            self.keyframes += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def metrics(self) -> dict:
+        return {
+            'motion_checked': self.checked,
+            'motion_skipped': self.skipped,
+            'motion_keyframes': self.keyframes,
+            'motion_skip_ratio': self.skipped / self.checked if self.checked else 0.0,
+        }
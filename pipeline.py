@@ -0,0 +1,368 @@
+"""Multi-process staged pipeline with shared-memory frames.
+
+Capture, detection, tracking and rendering/logging each run in their own
+process, so they overlap instead of serializing on one GIL. Frames live
+in a pool of shared-memory slots; only slot numbers and detections go
+through the bounded stage queues, which also provide backpressure: the
+capture stage can't run further ahead than the number of slots.
+"""
+import importlib
+import logging
+import queue
+import time
+from multiprocessing import get_context, shared_memory
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('capture', 'detect', 'track', 'render')
+
+
+class SharedFramePool:
+    """Fixed number of frame-sized slots in one shared-memory block"""
+
+    def __init__(self, slots: int, shape: tuple, name: str = None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.slot_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+            self.owner = True
+        else:
+            self.shm = _attach_shared_memory(name)
+            self.owner = False
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def frame(self, slot: int) -> np.ndarray:
+        return self.frames[slot]
+
+    def close(self):
+        del self.frames
+        try:
+            self.shm.close()
+        except BufferError:
+            # A stage (e.g. the model's predictor) still holds a view; the
+            # mapping goes away when the process exits
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach_shared_memory(name: str):
+    try:
+        # Only the creating process should unlink the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13; the shared resource tracker dedupes names
+        return shared_memory.SharedMemory(name=name)
+
+
+def load_factory(path: str):
+    """Resolve 'module:attribute' so factories can be passed to spawned processes"""
+    module, attr = path.split(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+class _StageTimer:
+    """Busy time vs wall time for one stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+        self.first_done = None
+        self.last_done = None
+
+    def done(self, start: float):
+        """Count one frame whose work began at ``start``"""
+        now = time.perf_counter()
+        self.busy += now - start
+        self.frames += 1
+        if self.first_done is None:
+            self.first_done = now
+        self.last_done = now
+
+    def report(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            'stage': self.name,
+            'frames': self.frames,
+            'busy_s': self.busy,
+            'wall_s': wall,
+            'utilization': self.busy / wall if wall > 0 else 0.0,
+            # Time between the first and last frame, excluding start-up
+            'active_s': (self.last_done - self.first_done) if self.frames > 1 else 0.0,
+        }
+
+
+def _capture_stage(source, pool_args, free_slots, out_q, stop, stats_q):
+    import cv2
+    from clock import clock_for_source
+
+    timer = _StageTimer('capture')
+    pool = cap = None
+    try:
+        # Set up inside the try so a failure still ends the stream downstream
+        pool = SharedFramePool(*pool_args)
+        cap = cv2.VideoCapture(source)
+        clock = clock_for_source(source, cap.get(cv2.CAP_PROP_FPS))
+        seq = 0
+        while not stop.is_set():
+            try:
+                slot = free_slots.get(timeout=0.5)
+            except queue.Empty:
+                continue  # Every slot is still downstream; re-check stop
+            start = time.perf_counter()
+            # Decode straight into shared memory
+            view = pool.frame(slot)
+            ret, frame = cap.read(image=view)
+            if not ret:
+                free_slots.put(slot)
+                break
+            if frame is not view:
+                if frame.shape != pool.shape:
+                    logger.error(f"Frame size changed to {frame.shape}, stopping")
+                    free_slots.put(slot)
+                    break
+                view[:] = frame
+            timestamp = clock.stamp(cap, seq)
+            timer.done(start)
+            out_q.put((seq, slot, timestamp))
+            seq += 1
+    finally:
+        out_q.put(None)
+        if cap is not None:
+            cap.release()
+        stats_q.put(timer.report())
+        if pool is not None:
+            pool.close()
+
+
+def _detect_stage(detector_path, pool_args, in_q, out_q, stats_q):
+    timer = _StageTimer('detect')
+    pool = None
+    try:
+        pool = SharedFramePool(*pool_args)
+        detector = load_factory(detector_path)()
+        while True:
+            item = in_q.get()
+            if item is None:
+                break
+            seq, slot, timestamp = item
+            start = time.perf_counter()
+            detections = detector.detect(pool.frame(slot), timestamp)
+            timer.done(start)
+            out_q.put((seq, slot, timestamp, detections))
+    finally:
+        out_q.put(None)
+        stats_q.put(timer.report())
+        if pool is not None:
+            pool.close()
+
+
+def _track_stage(frame_size, in_q, out_q, stats_q):
+    timer = _StageTimer('track')
+    try:
+        from calibration import get_calibration
+        from speed_tracker import BatchSpeedTracker
+
+        frame_height, frame_width = frame_size
+        tracker = BatchSpeedTracker(calibration=get_calibration(frame_height, config.__dict__, frame_width))
+        while True:
+            item = in_q.get()
+            if item is None:
+                break
+            seq, slot, timestamp, detections = item
+            start = time.perf_counter()
+            speeds = tracker.update_frame(detections, frame_height)
+            if timestamp is not None:
+                # Free tracks the render stage's TrackStore has ended by now
+                tracker.cleanup(timestamp, max_age=config.TRACK_MAX_AGE)
+            timer.done(start)
+            out_q.put((seq, slot, timestamp, detections, speeds))
+    finally:
+        out_q.put(None)
+        stats_q.put(timer.report())
+
+
+def _render_stage(pool_args, in_q, free_slots, stop, stats_q, display, output, fps, log_files):
+    import cv2
+
+    timer = _StageTimer('render')
+    pool = speed_logger = track_store = writer = None
+    try:
+        from data_logger import SpeedLogger
+        from track_store import TrackStore
+        from visualizer import Visualizer
+
+        pool = SharedFramePool(*pool_args)
+        visualizer = Visualizer()
+        speed_logger = SpeedLogger(*log_files)
+        # Vehicles are logged once, when their track ends
+        track_store = TrackStore(on_evict=[speed_logger.log_vehicle])
+        if output:
+            height, width = pool.shape[:2]
+            writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        expected = 0
+        while True:
+            item = in_q.get()
+            if item is None:
+                break
+            seq, slot, timestamp, detections, speeds = item
+            start = time.perf_counter()
+            if seq != expected:
+                logger.warning(f"Frame {seq} arrived out of order (expected {expected})")
+            expected = seq + 1
+
+            frame = pool.frame(slot)
+            if timestamp is not None:
+                track_store.observe(detections, speeds, timestamp)
+                track_store.expire(timestamp)
+            if writer is not None:
+                visualizer.draw_all(frame, detections, speeds)
+                writer.write(frame)
+            if display:
+                # The written frame is already annotated; otherwise draw on the preview
+                shown, scale = visualizer.preview(frame)
+                if writer is None:
+                    visualizer.draw_all(shown, detections, speeds, scale)
+                cv2.imshow('Vehicle Speed Detection', shown)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    stop.set()
+            timer.done(start)
+            free_slots.put(slot)
+    finally:
+        if track_store is not None:
+            track_store.flush()
+        if speed_logger is not None:
+            speed_logger.save()
+            speed_logger.close()
+        if writer is not None:
+            writer.release()
+        if display:
+            cv2.destroyAllWindows()
+        stats_q.put(timer.report())
+        if pool is not None:
+            pool.close()
+
+
+class StagedPipeline:
+    """Runs capture -> detect -> track -> render/log in four processes"""
+
+    def __init__(self, source, detector: str = 'detector:VehicleDetector', slots: int = None,
+                 queue_size: int = None, display: bool = False, output: str = None,
+                 violation_log: str = None, violation_export: str = None,
+                 vehicle_summaries: str = None):
+        import cv2
+
+        self.source = source
+        self.detector = detector
+        self.slots = slots or config.PIPELINE_SLOTS
+        self.queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self.display = display
+        self.output = output
+        self.log_files = (violation_log, violation_export, None, vehicle_summaries)
+
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video source: {source}")
+        self.frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+    def run(self) -> dict:
+        """Process the whole source and return throughput and per-stage utilization"""
+        ctx = get_context('spawn')
+        pool = SharedFramePool(self.slots, (self.frame_height, self.frame_width, 3))
+        pool_args = (pool.slots, pool.shape, pool.name)
+
+        free_slots = ctx.Queue()
+        for slot in range(self.slots):
+            free_slots.put(slot)
+        detect_q = ctx.Queue(self.queue_size)
+        track_q = ctx.Queue(self.queue_size)
+        render_q = ctx.Queue(self.queue_size)
+        stats_q = ctx.Queue()
+        stop = ctx.Event()
+
+        processes = [
+            ctx.Process(target=_capture_stage, name='capture',
+                        args=(self.source, pool_args, free_slots, detect_q, stop, stats_q)),
+            ctx.Process(target=_detect_stage, name='detect',
+                        args=(self.detector, pool_args, detect_q, track_q, stats_q)),
+            ctx.Process(target=_track_stage, name='track',
+                        args=((self.frame_height, self.frame_width), track_q, render_q, stats_q)),
+            ctx.Process(target=_render_stage, name='render',
+                        args=(pool_args, render_q, free_slots, stop, stats_q,
+                              self.display, self.output, self.fps, self.log_files)),
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        failed = []
+        try:
+            stages = {}
+            while len(stages) < len(processes):
+                failed = [p.name for p in processes if p.exitcode not in (None, 0)]
+                if failed:
+                    # Stages upstream of a dead one would block on its queue
+                    logger.error(f"Pipeline stage failed: {', '.join(failed)}; stopping")
+                    stop.set()
+                    break
+                try:
+                    report = stats_q.get(timeout=1.0)
+                    stages[report['stage']] = report
+                except queue.Empty:
+                    if not any(p.is_alive() for p in processes):
+                        break
+        except KeyboardInterrupt:
+            # Let the capture stage stop and the sentinel drain through
+            stop.set()
+            raise
+        finally:
+            for process in processes:
+                process.join(timeout=config.PIPELINE_STOP_TIMEOUT if stop.is_set() else None)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            pool.close()
+        if failed:
+            raise RuntimeError(f"Pipeline stage failed: {', '.join(failed)}")
+
+        elapsed = time.perf_counter() - start
+        render = stages.get('render', {})
+        frames = render.get('frames', 0)
+        active = render.get('active_s', 0.0)
+        return {
+            'frames': frames,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed > 0 else 0.0,
+            'steady_fps': (frames - 1) / active if active > 0 else 0.0,
+            'stages': [stages[name] for name in STAGES if name in stages],
+        }
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run the staged multi-process pipeline")
+    parser.add_argument('source', help='video file to process')
+    parser.add_argument('--display', action='store_true', help='show annotated frames')
+    parser.add_argument('--output', help='write annotated video to this file')
+    args = parser.parse_args()
+
+    summary = StagedPipeline(args.source, display=args.display, output=args.output).run()
+    logger.info(f"Processed {summary['frames']} frames at {summary['fps']:.1f} fps")
+    for stage in summary['stages']:
+        logger.info(f"  {stage['stage']:<8} utilization {stage['utilization']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Restream of annotated frames for headless servers: MJPEG over HTTP or HLS segments"""
+import logging
+import math
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Full
+import cv2
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = 'frame'
+
+
+class MjpegServer:
+    """Serves the latest published frame as MJPEG on http://host:port/stream.mjpg.
+
+    publish() copies the frame and returns at once; a background thread
+    encodes the newest frame to JPEG, skipping any published while it was
+    busy, and each client is sent every encoded frame at most once, so a
+    slow client misses frames instead of falling behind or holding up the
+    others. /snapshot.jpg returns the latest encoded frame.
+    """
+
+    def __init__(self, port: int = None, host: str = None, quality: int = None, max_fps: float = None):
+        self.quality = quality or config.RESTREAM_JPEG_QUALITY
+        max_fps = max_fps or config.RESTREAM_MAX_FPS
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.cond = threading.Condition()
+        self.pending = None  # Copy of the newest frame, waiting for the encoder
+        self.spare = None  # Buffer the next publish() copies into
+        self.jpeg = None
+        self.sequence = 0
+        self.closed = False
+        self.published = 0
+        self.encoded = 0
+        self.skipped = 0
+        self.clients = 0
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path in ('/', '/stream.mjpg'):
+                    owner._stream(self)
+                elif path == '/snapshot.jpg':
+                    owner._snapshot(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        host = host or config.RESTREAM_HOST
+        self.server = ThreadingHTTPServer((host, config.RESTREAM_PORT if port is None else port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.url = f"http://{host}:{self.port}/stream.mjpg"
+        self.encoder = threading.Thread(target=self._encode, daemon=True)
+        self.encoder.start()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Serving annotated video on {self.url}")
+
+    def publish(self, frame, timestamp: float = None):
+        with self.cond:
+            if self.pending is not None:
+                self.skipped += 1
+            buffer = self.pending if self.pending is not None else self.spare
+            if buffer is None or buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+            np.copyto(buffer, frame)
+            self.pending, self.spare = buffer, None
+            self.published += 1
+            self.cond.notify_all()
+
+    def _encode(self):
+        while True:
+            with self.cond:
+                while self.pending is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                frame, self.pending = self.pending, None
+            started = time.perf_counter()
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            with self.cond:
+                if self.spare is None:
+                    self.spare = frame
+                if ok:
+                    self.jpeg = jpeg.tobytes()
+                    self.sequence += 1
+                    self.encoded += 1
+                    self.cond.notify_all()
+            if self.interval:
+                time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def _next_jpeg(self, after: int):
+        """(jpeg, sequence) newer than ``after``; (None, after) once closed"""
+        with self.cond:
+            while self.sequence == after and not self.closed:
+                self.cond.wait(1.0)
+            if self.closed:
+                return None, after
+            return self.jpeg, self.sequence
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        handler.send_header('Cache-Control', 'no-cache, private')
+        handler.end_headers()
+        with self.cond:
+            self.clients += 1
+        try:
+            sequence = 0
+            while True:
+                jpeg, sequence = self._next_jpeg(sequence)
+                if jpeg is None:
+                    break
+                handler.wfile.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                    + jpeg + b"\r\n"
+                )
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+        finally:
+            with self.cond:
+                self.clients -= 1
+
+    def _snapshot(self, handler):
+        jpeg = self.jpeg
+        if jpeg is None:
+            handler.send_error(503, 'No frame yet')
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'image/jpeg')
+        handler.send_header('Content-Length', str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+    def metrics(self) -> dict:
+        return {
+            'restream_frames': self.encoded,
+            'restream_dropped': self.skipped,
+            'restream_clients': self.clients,
+        }
+
+    def close(self):
+        """Stop encoding and disconnect every client"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+        self.encoder.join()
+
+
+class HlsWriter:
+    """Writes published frames as HLS: MPEG-TS segments and a rolling index.m3u8.
+
+    Frames are queued for a background encoder and dropped when the queue
+    is full, so publish() never waits. Output runs at a constant ``fps``:
+    frames are repeated or skipped by their timestamps, so segments play
+    back in real time even when the processing loop doesn't keep up with
+    the source. The 'opencv' encoder starts a VideoWriter per segment,
+    each beginning with a keyframe; 'ffmpeg' pipes raw frames to
+    FFMPEG_BINARY for H.264 and lets it write segments and playlist.
+    """
+
+    def __init__(self, directory: str = None, fps: float = 30.0, segment_seconds: float = None,
+                 playlist_size: int = None, encoder: str = None, fourcc: str = None, queue_size: int = None):
+        self.directory = directory or config.HLS_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.playlist = os.path.join(self.directory, 'index.m3u8')
+        self.fps = fps or 30.0
+        self.segment_seconds = segment_seconds or config.HLS_SEGMENT_SECONDS
+        self.segment_frames = max(1, int(round(self.segment_seconds * self.fps)))
+        self.playlist_size = playlist_size or config.HLS_PLAYLIST_SIZE
+        self.encoder = encoder or config.HLS_ENCODER
+        if self.encoder not in ('opencv', 'ffmpeg'):
+            raise ValueError(f"Unknown HLS encoder: {self.encoder}")
+        self.fourcc = cv2.VideoWriter_fourcc(*(fourcc or config.HLS_FOURCC))
+        self.queue = Queue(maxsize=queue_size or config.HLS_QUEUE_SIZE)
+        self.size = None
+        self.origin = None  # Timestamp of output frame 0
+        self.frames = 0  # Output frames written
+        self.dropped = 0
+        self.writer = None  # Current segment (opencv) or ffmpeg process
+        self.segment = 0  # Number of the current segment
+        self.in_segment = 0  # Frames in the current segment
+        self.listed = deque()  # (file name, seconds) in the playlist
+        self.expired = deque()  # Dropped from the playlist, deleted a playlist later
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"Writing HLS to {self.playlist}")
+
+    def publish(self, frame, timestamp: float):
+        try:
+            self.queue.put_nowait((frame.copy(), timestamp))
+        except Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Error writing HLS: {str(e)}")
+        try:
+            self._finish()
+        except Exception as e:
+            logger.error(f"Error finishing HLS: {str(e)}")
+
+    def _write(self, frame, timestamp: float):
+        height, width = frame.shape[:2]
+        if self.size is None:
+            self.size = (width, height)
+            self.origin = timestamp
+        elif (width, height) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        # Output frames due up to this timestamp; a gap of over a second
+        # (e.g. a reconnect) is cut short instead of filled
+        repeats = int(round((timestamp - self.origin) * self.fps)) + 1 - self.frames
+        if repeats > self.fps:
+            self.origin = timestamp - self.frames / self.fps
+            repeats = 1
+        for _ in range(repeats):
+            self._encode(frame)
+
+    def _encode(self, frame):
+        if self.encoder == 'ffmpeg':
+            if self.writer is None:
+                self.writer = self._start_ffmpeg()
+            self.writer.stdin.write(frame.tobytes())
+            self.frames += 1
+            return
+        if self.writer is None:
+            path = os.path.join(self.directory, f'segment_{self.segment:06d}.ts')
+            self.writer = cv2.VideoWriter(path, self.fourcc, self.fps, self.size)
+            if not self.writer.isOpened():
+                self.writer = None
+                raise RuntimeError(f"Cannot write {path} with fourcc {config.HLS_FOURCC}")
+        self.writer.write(frame)
+        self.frames += 1
+        self.in_segment += 1
+        if self.in_segment >= self.segment_frames:
+            self._end_segment()
+
+    def _start_ffmpeg(self):
+        width, height = self.size
+        command = [
+            config.FFMPEG_BINARY, '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{self.fps:g}',
+            '-i', 'pipe:0',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'zerolatency', '-pix_fmt', 'yuv420p',
+            # A keyframe at the start of every segment
+            '-g', str(self.segment_frames), '-sc_threshold', '0',
+            '-f', 'hls', '-hls_time', f'{self.segment_seconds:g}', '-hls_list_size', str(self.playlist_size),
+            '-hls_flags', 'delete_segments',
+            '-hls_segment_filename', os.path.join(self.directory, 'segment_%06d.ts'), self.playlist,
+        ]
+        return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _end_segment(self):
+        self.writer.release()
+        self.writer = None
+        self.listed.append((f'segment_{self.segment:06d}.ts', self.in_segment / self.fps))
+        self.segment += 1
+        self.in_segment = 0
+        while len(self.listed) > self.playlist_size:
+            self.expired.append(self.listed.popleft()[0])
+        # Players may still fetch a segment that just left the playlist
+        while len(self.expired) > self.playlist_size:
+            try:
+                os.remove(os.path.join(self.directory, self.expired.popleft()))
+            except OSError:
+                pass
+        self._write_playlist()
+
+    def _write_playlist(self, ended: bool = False):
+        first = self.segment - len(self.listed)
+        target = max(math.ceil(seconds) for _, seconds in self.listed)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{target}',
+                 f'#EXT-X-MEDIA-SEQUENCE:{first}']
+        for name, seconds in self.listed:
+            lines += [f'#EXTINF:{seconds:.3f},', name]
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        # Replaced in one step so a player never reads half a playlist
+        temp = self.playlist + '.tmp'
+        with open(temp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp, self.playlist)
+
+    def _finish(self):
+        if self.encoder == 'ffmpeg':
+            if self.writer is not None:
+                self.writer.stdin.close()
+                self.writer.wait()
+            return
+        if self.writer is not None:
+            self._end_segment()
+        if self.listed:
+            self._write_playlist(ended=True)
+
+    def metrics(self) -> dict:
+        return {
+            'restream_frames': self.frames,
+            'restream_dropped': self.dropped,
+            'hls_segments': self.segment,
+        }
+
+    def close(self):
+        """Encode what is queued, then end the playlist"""
+        self.queue.put(None)
+        self.thread.join()
+
+
+def start_restream(fps: float = 30.0, directory: str = None):
+    """The sink RESTREAM selects, or None; each has publish(frame, timestamp), metrics() and close().
+
+    ``directory`` overrides HLS_DIR.
+    """
+    if not config.RESTREAM:
+        return None
+    if config.RESTREAM == 'mjpeg':
+        return MjpegServer()
+    if config.RESTREAM == 'hls':
+        return HlsWriter(directory, fps=fps)
+    raise ValueError(f"Unknown restream: {config.RESTREAM}")
@@ -0,0 +1,187 @@
+"""Road region of interest, measurement zone and lane masks"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+import config
+from detector import Detection
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Vectorized even-odd test for an (n, 2) array of points against one polygon"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (x < x_cross), axis=1) % 2 == 1
+
+
+def tile_spans(length: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+    """(start, end) of the fewest ``size`` tiles covering ``length`` that overlap by at least ``overlap``"""
+    if not size or length <= size:
+        return [(0, length)]
+    # Spread evenly
+    count = int(np.ceil((length - overlap) / float(size - overlap)))
+    starts = np.round(np.linspace(0, length - size, count)).astype(int).tolist()
+    return [(s, s + size) for s in starts]
+
+
+def _columns_in_rows(polygon: np.ndarray, top: float, bottom: float) -> Tuple[float, float]:
+    """(left, right) extent of the polygon between rows ``top`` and ``bottom``"""
+    xs = polygon[(polygon[:, 1] >= top) & (polygon[:, 1] <= bottom), 0].tolist()
+    for (x1, y1), (x2, y2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        for y in (top, bottom):
+            if min(y1, y2) <= y <= max(y1, y2) and y1 != y2:
+                xs.append(x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+    return (min(xs), max(xs)) if xs else (0.0, 0.0)
+
+
+def _as_polygon(points) -> Optional[np.ndarray]:
+    if not points:
+        return None
+    polygon = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(polygon) < 3:
+        raise ValueError("A polygon needs at least 3 points")
+    return polygon
+
+
+class RegionOfInterest:
+    """Where to look and where to measure, for one camera and frame size.
+
+    Inference runs on the bounding box of the road polygon, split into
+    overlapping tiles when that box is wider than ``tile_width``. Pixels
+    outside the polygon can be blanked (``mask_outside``). Detections are
+    kept only for measured classes whose ground point (bottom centre of
+    the box) falls inside the measurement zone and, when lanes are given,
+    inside one of the lanes.
+
+    ``far_field`` (top, bottom) marks the rows where vehicles are small;
+    the road within that band is also cut into ``far_field_tile`` squares
+    for detection at their own resolution.
+    """
+    def __init__(self, frame_width: int, frame_height: int, polygon: Sequence = None,
+                 zone: Sequence = None, lanes: Dict[str, Sequence] = None,
+                 tile_width: int = None, tile_overlap: int = 64, mask_outside: bool = False,
+                 classes: Sequence[str] = None, far_field: Tuple[float, float] = None,
+                 far_field_tile: int = 640, far_field_overlap: int = 128):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.polygon = _as_polygon(polygon)
+        self.zone = _as_polygon(zone) if zone else self.polygon
+        self.lanes = {name: _as_polygon(points) for name, points in (lanes or {}).items()}
+        self.classes = set(classes) if classes is not None else None
+
+        if self.polygon is None:
+            self.bounds = (0, 0, frame_width, frame_height)
+        else:
+            x0, y0 = np.floor(self.polygon.min(axis=0)).astype(int)
+            x1, y1 = np.ceil(self.polygon.max(axis=0)).astype(int)
+            self.bounds = (max(0, x0), max(0, y0), min(frame_width, x1), min(frame_height, y1))
+        x0, y0, x1, y1 = self.bounds
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"ROI polygon lies outside the {frame_width}x{frame_height} frame")
+
+        self.mask = None
+        if mask_outside and self.polygon is not None:
+            self.mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            shifted = np.round(self.polygon - (x0, y0)).astype(np.int32)
+            cv2.fillPoly(self.mask, [shifted], 255)
+
+        # Column ranges of the tiles, relative to the crop
+        self.tiles = tile_spans(x1 - x0, tile_width, tile_overlap)
+
+        # (x0, y0, x1, y1) of the far-field tiles, relative to the crop
+        self.far_tiles = []
+        if far_field:
+            top = max(y0, int(np.floor(far_field[0])))
+            bottom = min(y1, int(np.ceil(far_field[1])))
+            left, right = x0, x1
+            if self.polygon is not None:
+                # The road narrows towards the horizon
+                left, right = _columns_in_rows(self.polygon, top, bottom)
+                left, right = max(x0, int(np.floor(left))), min(x1, int(np.ceil(right)))
+            if bottom > top and right > left:
+                columns = tile_spans(right - left, far_field_tile, far_field_overlap)
+                rows = tile_spans(bottom - top, far_field_tile, far_field_overlap)
+                self.far_tiles = [(left - x0 + cx0, top - y0 + ry0, left - x0 + cx1, top - y0 + ry1)
+                                  for ry0, ry1 in rows for cx0, cx1 in columns]
+
+    @classmethod
+    def from_config(cls, frame_width: int, frame_height: int,
+                    scale: Tuple[float, float] = (1.0, 1.0)) -> 'RegionOfInterest':
+        """ROI for a frame that is the source resized by ``scale`` (sx, sy)"""
+        def scaled(points):
+            return [(x * scale[0], y * scale[1]) for x, y in points] if points else points
+
+        lanes = config.LANE_POLYGONS
+        band = config.FAR_FIELD_BAND
+        return cls(
+            frame_width, frame_height,
+            polygon=scaled(config.ROI_POLYGON),
+            zone=scaled(config.MEASUREMENT_ZONE),
+            lanes={name: scaled(points) for name, points in lanes.items()} if lanes else lanes,
+            tile_width=int(config.ROI_TILE_WIDTH * scale[0]) if config.ROI_TILE_WIDTH else None,
+            tile_overlap=int(config.ROI_TILE_OVERLAP * scale[0]),
+            mask_outside=config.ROI_MASK_OUTSIDE,
+            classes=config.MEASURED_CLASSES,
+            far_field=(band[0] * scale[1], band[1] * scale[1]) if band else None,
+            far_field_tile=config.FAR_FIELD_TILE_SIZE,
+            far_field_overlap=config.FAR_FIELD_TILE_OVERLAP
+        )
+
+    @property
+    def is_full_frame(self) -> bool:
+        """True when inference sees the whole, untiled, unmasked frame"""
+        return (self.bounds == (0, 0, self.frame_width, self.frame_height)
+                and len(self.tiles) == 1 and self.mask is None)
+
+    def pixel_fraction(self) -> float:
+        """Share of the frame's pixels that go to the detector"""
+        height = self.bounds[3] - self.bounds[1]
+        pixels = sum((end - start) * height for start, end in self.tiles)
+        return pixels / float(self.frame_width * self.frame_height)
+
+    def crops(self, frame: np.ndarray) -> List[Tuple[np.ndarray, Tuple[int, int]]]:
+        """(image, (x offset, y offset)) per tile; views of ``frame`` unless masked"""
+        x0, y0, x1, y1 = self.bounds
+        crop = frame[y0:y1, x0:x1]
+        if self.mask is not None:
+            crop = cv2.bitwise_and(crop, crop, mask=self.mask)
+        return [(crop[:, start:end], (x0 + start, y0)) for start, end in self.tiles]
+
+    def far_field_crops(self, frame: np.ndarray) -> List[Tuple[np.ndarray, Tuple[int, int]]]:
+        """(image, (x offset, y offset)) per far-field tile, like ``crops``"""
+        if not self.far_tiles:
+            return []
+        x0, y0, x1, y1 = self.bounds
+        crop = frame[y0:y1, x0:x1]
+        tiles = []
+        for tx0, ty0, tx1, ty1 in self.far_tiles:
+            tile = crop[ty0:ty1, tx0:tx1]
+            if self.mask is not None:
+                tile = cv2.bitwise_and(tile, tile, mask=self.mask[ty0:ty1, tx0:tx1])
+            tiles.append((tile, (x0 + tx0, y0 + ty0)))
+        return tiles
+
+    def filter(self, detections: List[Detection]) -> List[Detection]:
+        """Drop unmeasured classes and boxes whose ground point is outside the zone"""
+        if self.classes is not None:
+            detections = [d for d in detections if d.class_name in self.classes]
+        if not detections or (self.zone is None and not self.lanes):
+            return detections
+        boxes = np.array([d.bbox for d in detections], dtype=float)
+        ground = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]])
+        keep = np.ones(len(detections), dtype=bool)
+        if self.zone is not None:
+            keep &= points_in_polygon(ground, self.zone)
+        if self.lanes:
+            in_lane = np.zeros(len(detections), dtype=bool)
+            for name, polygon in self.lanes.items():
+                inside = points_in_polygon(ground, polygon) & ~in_lane
+                for i in np.flatnonzero(inside).tolist():
+                    detections[i].lane = name
+                in_lane |= inside
+            keep &= in_lane
+        return [d for d, k in zip(detections, keep) if k]
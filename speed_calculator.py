@@ -1,7 +1,6 @@
 import numpy as np
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import logging
-from scipy import stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,6 +9,12 @@ def validate_positions(positions: List[Tuple[float, float, float]]) -> bool:
     """Validates position data for speed calculation"""
     return bool(positions and len(positions) >= 2 and all(len(p) == 3 for p in positions))
 
+def zscore(values: np.ndarray) -> np.ndarray:
+    """Standard scores with the population standard deviation (NaN when all values are equal)"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (values - values.mean()) / values.std()
+
 def detect_motion(positions: List[Tuple[float, float, float]], min_displacement: float = 1.0) -> bool:
     """Detects if significant motion occurred"""
     if not positions:
@@ -18,12 +23,16 @@ def detect_motion(positions: List[Tuple[float, float, float]], min_displacement:
     end = np.array(positions[-1][:2])
     return np.linalg.norm(end - start) >= min_displacement
 
-def calculate_speed(positions: List[Tuple[float, float, float]], scale: float = 1.0) -> float:
+def calculate_speed(positions: List[Tuple[float, float, float]], scale: float = 1.0,
+                    to_world: Callable[[np.ndarray], np.ndarray] = None) -> float:
     """
     Calculate vehicle speed from position history
     Args:
         positions: List of (x, y, timestamp) tuples
         scale: Pixels to meters conversion factor
+        to_world: Optional image-to-road mapping (e.g.
+            GroundPlaneCalibration.pixels_to_world); distances are then
+            measured in road metres and scale should be 1
     Returns:
         Speed in km/h
     """
@@ -45,6 +54,9 @@ def calculate_speed(positions: List[Tuple[float, float, float]], scale: float =
             logger.debug("No significant motion detected")
             return 0.0
 
+        if to_world is not None:
+            pos_array[:, :2] = to_world(pos_array[:, :2])
+
         # Calculate distances between consecutive points
         distances = np.sqrt(
             np.sum(
@@ -69,7 +81,7 @@ def calculate_speed(positions: List[Tuple[float, float, float]], scale: float =
         speeds = (distances[valid_mask] / time_diffs[valid_mask]) * 3.6
 
         # Remove outliers using Z-score
-        z_scores = np.abs(stats.zscore(speeds))
+        z_scores = np.abs(zscore(speeds))
         speeds = speeds[z_scores < 2.0]
         
         # Apply physical limits
@@ -87,4 +99,63 @@ def calculate_speed(positions: List[Tuple[float, float, float]], scale: float =
 
     except Exception as e:
         logger.error(f"Speed calculation error: {str(e)}")
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+
+def calculate_speeds_batch(history: np.ndarray, counts: np.ndarray, scales: np.ndarray,
+                           to_world: Callable[[np.ndarray], np.ndarray] = None) -> np.ndarray:
+    """
+    Vectorized calculate_speed for many tracks at once
+    Args:
+        history: (n_tracks, n_samples, 3) array of (x, y, timestamp) in
+            chronological order; samples past each track's count are ignored
+        counts: Number of valid samples per track
+        scales: Pixels to meters conversion factor per track
+        to_world: Optional image-to-road mapping, as in calculate_speed
+    Returns:
+        Speed in km/h per track, matching calculate_speed row by row
+    """
+    # Constants (as in calculate_speed)
+    MIN_SPEED = 1.0  # km/h
+    MAX_SPEED = 150.0  # km/h
+    MIN_TIME_DELTA = 0.01  # seconds
+    MIN_DISPLACEMENT = 1.0  # pixels, as in detect_motion
+
+    n_tracks, n_samples, _ = history.shape
+    if n_tracks == 0 or n_samples < 2:
+        return np.zeros(n_tracks)
+    counts = np.asarray(counts)
+    rows = np.arange(n_tracks)
+
+    # Motion check between first and last valid sample
+    last = history[rows, np.maximum(counts - 1, 0), :2]
+    moving = (counts >= 2) & (np.linalg.norm(last - history[:, 0, :2], axis=1) >= MIN_DISPLACEMENT)
+
+    if to_world is not None:
+        history = history.copy()
+        with np.errstate(divide='ignore', invalid='ignore'):  # Unused padding samples
+            history[:, :, :2] = to_world(history[:, :, :2])
+
+    deltas = np.diff(history, axis=1)
+    distances = np.sqrt(np.sum(np.square(deltas[:, :, :2]), axis=2)) * scales[:, None]
+    time_diffs = deltas[:, :, 2]
+    pair_valid = np.arange(n_samples - 1)[None, :] < (counts - 1)[:, None]
+    valid = pair_valid & (time_diffs >= MIN_TIME_DELTA) & moving[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speeds = np.where(valid, distances / np.where(valid, time_diffs, 1.0) * 3.6, np.nan)
+
+        # Masked z-score; a zero spread gives NaN and drops every sample, as
+        # zscore does
+        n_valid = valid.sum(axis=1)
+        mean = np.nansum(speeds, axis=1) / np.maximum(n_valid, 1)
+        std = np.sqrt(np.nansum(np.square(speeds - mean[:, None]), axis=1) / np.maximum(n_valid, 1))
+        z_scores = np.abs((speeds - mean[:, None]) / std[:, None])
+
+    keep = valid & (z_scores < 2.0) & (speeds >= MIN_SPEED) & (speeds <= MAX_SPEED)
+    has_speed = keep.any(axis=1)
+    result = np.zeros(n_tracks)
+    if np.any(has_speed):
+        kept = np.where(keep[has_speed], speeds[has_speed], np.nan)
+        result[has_speed] = np.nanmedian(kept, axis=1)
+    return result
@@ -0,0 +1,220 @@
+"""Streaming constant-velocity Kalman speed estimation"""
+import math
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+import config
+
+MIN_SPEED = 1.0  # km/h, as in calculate_speed
+
+
+@dataclass
+class SpeedEstimate:
+    speed: float  # km/h
+    heading: float  # degrees on the road plane, 0 = +x, counter-clockwise
+    uncertainty: float  # 1-sigma speed error, km/h
+    updates: int  # Accepted observations since the track (re)started
+
+
+def _speed_stats(vx, vy, pvx, pvy):
+    """Speed (m/s) and its standard deviation from velocity and its variances"""
+    speed = math.hypot(vx, vy)
+    if speed < 1e-9:
+        return speed, math.sqrt((pvx + pvy) / 2)
+    return speed, math.sqrt((vx * vx * pvx + vy * vy * pvy) / (speed * speed))
+
+
+class KalmanSpeedEstimator:
+    """Constant-velocity Kalman filter for one track, O(1) per observation.
+
+    Positions are road-plane metres. The x and y axes are filtered
+    independently (state: position, velocity) with white-acceleration
+    process noise, so memory length is set by ``accel_noise`` rather than
+    by a history window. An observation whose innovation is further than
+    ``gate`` (squared Mahalanobis distance) from the prediction is rejected;
+    after ``max_rejects`` rejections in a row the filter restarts at the
+    new position.
+    """
+    def __init__(self, accel_noise: float = None, gate: float = None, max_rejects: int = None):
+        self.q = (accel_noise or config.KALMAN_ACCEL_NOISE) ** 2
+        self.gate = gate or config.KALMAN_GATE
+        self.max_rejects = max_rejects or config.KALMAN_MAX_REJECTS
+        self.updates = 0
+        self.rejects = 0
+        self.rejected_total = 0
+        self.t = None
+        # Per axis: position, velocity, covariance P00, P01, P11
+        self.x = [0.0, 0.0, 0.0, 0.0, 0.0]
+        self.y = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+    def _start(self, px: float, py: float, t: float, r: float):
+        v0 = config.KALMAN_INITIAL_SPEED_STD ** 2
+        self.x = [px, 0.0, r, 0.0, v0]
+        self.y = [py, 0.0, r, 0.0, v0]
+        self.t = t
+        self.updates = 1
+        self.rejects = 0
+
+    def _predict(self, axis, dt):
+        p, v, p00, p01, p11 = axis
+        q = self.q
+        dt2 = dt * dt
+        return [
+            p + v * dt,
+            v,
+            p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4,
+            p01 + dt * p11 + q * dt2 * dt / 2,
+            p11 + q * dt2,
+        ]
+
+    @staticmethod
+    def _correct(axis, z, r):
+        p, v, p00, p01, p11 = axis
+        s = p00 + r
+        k0, k1 = p00 / s, p01 / s
+        innovation = z - p
+        return [p + k0 * innovation, v + k1 * innovation,
+                (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01]
+
+    def update(self, px: float, py: float, t: float, noise: float) -> float:
+        """Add a road-plane observation (metres, seconds, 1-sigma metres); return km/h"""
+        r = noise * noise
+        if self.t is None:
+            self._start(px, py, t, r)
+            return 0.0
+        dt = max(t - self.t, 0.0)
+        x = self._predict(self.x, dt)
+        y = self._predict(self.y, dt)
+        ix, iy = px - x[0], py - y[0]
+        distance = ix * ix / (x[2] + r) + iy * iy / (y[2] + r)
+        if self.updates >= 2 and distance > self.gate:
+            self.rejected_total += 1
+            self.rejects += 1
+            if self.rejects >= self.max_rejects:
+                self._start(px, py, t, r)
+            return self.speed()
+        self.x = self._correct(x, px, r)
+        self.y = self._correct(y, py, r)
+        self.t = t
+        self.updates += 1
+        self.rejects = 0
+        return self.speed()
+
+    def speed(self) -> float:
+        """Current speed in km/h (0 below the minimum speed)"""
+        speed = math.hypot(self.x[1], self.y[1]) * 3.6
+        return speed if speed >= MIN_SPEED else 0.0
+
+    def estimate(self) -> SpeedEstimate:
+        speed, std = _speed_stats(self.x[1], self.y[1], self.x[4], self.y[4])
+        return SpeedEstimate(
+            speed=speed * 3.6 if speed * 3.6 >= MIN_SPEED else 0.0,
+            heading=math.degrees(math.atan2(self.y[1], self.x[1])),
+            uncertainty=std * 3.6,
+            updates=self.updates
+        )
+
+
+class KalmanSpeedBank:
+    """KalmanSpeedEstimator for many tracks in preallocated arrays.
+
+    ``update`` advances every given slot in one vectorized step and
+    matches KalmanSpeedEstimator fed the same observations.
+    """
+    def __init__(self, capacity: int, accel_noise: float = None, gate: float = None,
+                 max_rejects: int = None):
+        self.q = (accel_noise or config.KALMAN_ACCEL_NOISE) ** 2
+        self.gate = gate or config.KALMAN_GATE
+        self.max_rejects = max_rejects or config.KALMAN_MAX_REJECTS
+        # (capacity, axis, [position, velocity, P00, P01, P11])
+        self.state = np.zeros((capacity, 2, 5))
+        self.t = np.zeros(capacity)
+        self.updates = np.zeros(capacity, dtype=np.int64)
+        self.rejects = np.zeros(capacity, dtype=np.int64)
+        self.rejected_total = 0
+
+    def reset(self, slots):
+        self.updates[slots] = 0
+        self.rejects[slots] = 0
+
+    def _start(self, slots, points, t, r):
+        self.state[slots, :, 0] = points
+        self.state[slots, :, 1] = 0.0
+        self.state[slots, :, 2] = r[:, None]
+        self.state[slots, :, 3] = 0.0
+        self.state[slots, :, 4] = config.KALMAN_INITIAL_SPEED_STD ** 2
+        self.t[slots] = t
+        self.updates[slots] = 1
+        self.rejects[slots] = 0
+
+    def update(self, slots: np.ndarray, points: np.ndarray, t: np.ndarray,
+               noise: np.ndarray) -> np.ndarray:
+        """Add one observation per slot (slots must be unique); return km/h per slot"""
+        slots = np.asarray(slots)
+        t = np.broadcast_to(np.asarray(t, dtype=float), slots.shape)
+        r = np.square(noise)
+        new = self.updates[slots] == 0
+        if np.any(new):
+            self._start(slots[new], points[new], t[new], r[new])
+
+        old = ~new
+        if np.any(old):
+            s_old = slots[old]
+            r_old = r[old][:, None]
+            dt = np.maximum(t[old] - self.t[s_old], 0.0)[:, None]
+            p, v, p00, p01, p11 = np.moveaxis(self.state[s_old], 2, 0)
+            q = self.q
+            dt2 = dt * dt
+            p = p + v * dt
+            p00 = p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4
+            p01 = p01 + dt * p11 + q * dt2 * dt / 2
+            p11 = p11 + q * dt2
+
+            innovation = points[old] - p
+            s = p00 + r_old
+            distance = np.sum(innovation * innovation / s, axis=1)
+            rejected = (self.updates[s_old] >= 2) & (distance > self.gate)
+            k0, k1 = p00 / s, p01 / s
+            corrected = np.stack([p + k0 * innovation, v + k1 * innovation,
+                                  (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01], axis=2)
+
+            accept = ~rejected
+            self.state[s_old[accept]] = corrected[accept]
+            self.t[s_old[accept]] = t[old][accept]
+            self.updates[s_old[accept]] += 1
+            self.rejects[s_old[accept]] = 0
+
+            if np.any(rejected):
+                s_rej = s_old[rejected]
+                self.rejected_total += len(s_rej)
+                self.rejects[s_rej] += 1
+                restart = self.rejects[s_rej] >= self.max_rejects
+                if np.any(restart):
+                    self._start(s_rej[restart], points[old][rejected][restart],
+                                t[old][rejected][restart], r[old][rejected][restart])
+
+        speeds = np.hypot(self.state[slots, 0, 1], self.state[slots, 1, 1]) * 3.6
+        speeds[(speeds < MIN_SPEED) | (self.updates[slots] < 2)] = 0.0
+        return speeds
+
+    def estimate(self, slot: int) -> SpeedEstimate:
+        (_, vx, _, _, pvx), (_, vy, _, _, pvy) = self.state[slot].tolist()
+        speed, std = _speed_stats(vx, vy, pvx, pvy)
+        return SpeedEstimate(
+            speed=speed * 3.6 if speed * 3.6 >= MIN_SPEED else 0.0,
+            heading=math.degrees(math.atan2(vy, vx)),
+            uncertainty=std * 3.6,
+            updates=int(self.updates[slot])
+        )
+
+
+def observation_noise(calibration, points: np.ndarray) -> np.ndarray:
+    """1-sigma road-plane error (metres) of image points detected to KALMAN_PIXEL_NOISE"""
+    return config.KALMAN_PIXEL_NOISE * calibration.metres_per_pixel(points)
+
+
+def to_road(calibration, x: float, y: float) -> Tuple[float, float, float]:
+    """Road-plane position and observation noise of one image point"""
+    point = np.array([[x, y]])
+    (wx, wy), = calibration.pixels_to_world(point).tolist()
+    return wx, wy, float(observation_noise(calibration, point)[0])
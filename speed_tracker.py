@@ -1,26 +1,87 @@
 """Track vehicle positions and calculate speeds"""
-import cv2
+import logging
 import numpy as np
 from collections import deque
-from typing import Dict, Tuple, Deque
+from typing import Dict, List, Optional, Tuple, Deque
 import config
 from detector import Detection
-from calibration import get_scaling_factor
-from speed_calculator import calculate_speed
+from clock import Clock, WallClock
+from calibration import GroundPlaneCalibration, get_calibration
+from speed_calculator import calculate_speed, calculate_speeds_batch
+from speed_estimator import (KalmanSpeedBank, KalmanSpeedEstimator, SpeedEstimate,
+                             observation_noise, to_road)
+
+logger = logging.getLogger(__name__)
+
+def resolve_timestamp(detection: Detection, timestamp: float, clock: Clock) -> float:
+    """Explicit timestamp, else the detection's capture time, else the clock"""
+    if timestamp is not None:
+        return timestamp
+    if detection is not None and detection.timestamp is not None:
+        return detection.timestamp
+    return clock.now()
+
+def fallback_calibration(frame_height: float, frame_width: float = None) -> GroundPlaneCalibration:
+    """Calibration from config for a tracker built without one.
+
+    Road positions (SPEED_FROM_WORLD or the Kalman estimator) are measured
+    across from the centre column, so they need the frame width unless a
+    homography is configured; the per-row scale alone does not.
+    """
+    if not frame_width:
+        homography = config.HOMOGRAPHY_IMAGE_POINTS and config.HOMOGRAPHY_WORLD_POINTS
+        if not homography and (config.SPEED_FROM_WORLD or config.SPEED_ESTIMATOR == 'kalman'):
+            # Column 0 as the origin would add x * (change in scale) to every
+            # move toward or away from the camera
+            raise ValueError("frame_width is required for road positions when the tracker has no calibration")
+        if not homography:
+            logger.warning("No frame width given; assuming a 16:9 frame for lateral road positions")
+            frame_width = frame_height * 16 / 9
+    return get_calibration(frame_height, config.__dict__, frame_width)
 
 class SpeedTracker:
-    def __init__(self):
+    def __init__(self, clock: Clock = None, calibration: GroundPlaneCalibration = None):
+        self.clock = clock or WallClock()
+        self.calibration = calibration
         self.positions: Dict[int, Deque[Tuple[float, float, float]]] = {}
         self.speeds: Dict[int, Deque[float]] = {}
         self.frame_height: float = None
         self.last_speeds: Dict[int, float] = {}  # Cache for last calculated speeds
+        self.estimators: Dict[int, KalmanSpeedEstimator] = {}
         
     def get_last_speed(self, track_id: int) -> float:
         """Get the last calculated speed for a track"""
         return self.last_speeds.get(track_id, 0.0)
         
-    def update(self, detection: Detection, frame_height: float) -> float:
-        """Update tracker with new detection and return speed"""
+    def track_count(self) -> int:
+        """Number of tracks currently held"""
+        return len(self.positions)
+        
+    def get_estimate(self, track_id: int) -> Optional[SpeedEstimate]:
+        """Speed, heading and uncertainty of a track (Kalman estimator only)"""
+        estimator = self.estimators.get(track_id)
+        return estimator.estimate() if estimator is not None else None
+        
+    def get_velocity(self, track_id: int) -> Tuple[float, float]:
+        """Average image-space velocity (pixels/s) over the track's history"""
+        positions = self.positions.get(track_id)
+        if not positions or len(positions) < 2:
+            return 0.0, 0.0
+        x0, y0, t0 = positions[0]
+        x1, y1, t1 = positions[-1]
+        if t1 - t0 <= 0:
+            return 0.0, 0.0
+        return (x1 - x0) / (t1 - t0), (y1 - y0) / (t1 - t0)
+        
+    def update(self, detection: Detection, frame_height: float, timestamp: float = None,
+               frame_width: float = None) -> float:
+        """Update tracker with new detection and return speed.
+
+        ``frame_width`` is used only when the tracker was built without a
+        calibration; see fallback_calibration.
+        """
+        if self.calibration is None:
+            self.calibration = fallback_calibration(frame_height, frame_width)
         try:
             if self.frame_height is None:
                 self.frame_height = frame_height
@@ -28,7 +89,7 @@ class SpeedTracker:
             track_id = detection.track_id
             center_x = (detection.bbox[0] + detection.bbox[2]) / 2
             center_y = (detection.bbox[1] + detection.bbox[3]) / 2
-            current_time = cv2.getTickCount() / cv2.getTickFrequency()
+            current_time = resolve_timestamp(detection, timestamp, self.clock)
             
             # Initialize tracking for new vehicle
             if track_id not in self.positions:
@@ -38,13 +99,18 @@ class SpeedTracker:
             # Add current position
             self.positions[track_id].append((center_x, center_y, current_time))
             
+            if config.SPEED_ESTIMATOR == 'kalman':
+                return self._update_kalman(track_id, center_x, center_y, current_time)
+                
             # Calculate speed if we have enough frames
             if len(self.positions[track_id]) >= config.MIN_DETECTION_FRAMES:
-                # Get scaling factor
-                scale = get_scaling_factor(detection.bbox, frame_height, config.__dict__)
-                
                 # Calculate speed
-                speed = calculate_speed(list(self.positions[track_id]), scale)
+                if config.SPEED_FROM_WORLD:
+                    speed = calculate_speed(list(self.positions[track_id]),
+                                            to_world=self.calibration.pixels_to_world)
+                else:
+                    scale = self.calibration.scale_at(center_y)
+                    speed = calculate_speed(list(self.positions[track_id]), scale)
                 
                 # Apply smoothing
                 if self.speeds[track_id]:
@@ -62,13 +128,208 @@ class SpeedTracker:
             print(f"Error calculating speed: {e}")
             return 0.0
             
-    def cleanup(self):
+    def _update_kalman(self, track_id: int, x: float, y: float, timestamp: float) -> float:
+        """O(1) streaming update; replaces history recompute and smoothing"""
+        estimator = self.estimators.get(track_id)
+        if estimator is None:
+            estimator = self.estimators[track_id] = KalmanSpeedEstimator()
+        road_x, road_y, noise = to_road(self.calibration, x, y)
+        speed = estimator.update(road_x, road_y, timestamp, noise)
+        if estimator.updates < config.MIN_DETECTION_FRAMES:
+            return 0.0
+        self.last_speeds[track_id] = speed
+        return speed
+            
+    def cleanup(self, current_time: float = None):
         """Remove old tracks"""
-        current_time = cv2.getTickCount() / cv2.getTickFrequency()
+        if current_time is None:
+            current_time = self.clock.now()
         for track_id in list(self.positions.keys()):
             if self.positions[track_id]:
                 last_update = self.positions[track_id][-1][2]
                 if current_time - last_update > 1.0:  # Remove after 1 second of no updates
-                    del self.positions[track_id]
-                    del self.speeds[track_id]
-                    del self.last_speeds[track_id]
\ No newline at end of file
+                    self.remove(track_id)
+                    
+    def remove(self, track_id: int):
+        """Forget a track (tracks that never got a speed have no last_speeds entry)"""
+        self.positions.pop(track_id, None)
+        self.speeds.pop(track_id, None)
+        self.estimators.pop(track_id, None)
+        self.last_speeds.pop(track_id, None)
+
+
+class BatchSpeedTracker:
+    """Frame-at-a-time SpeedTracker backed by preallocated arrays.
+
+    Track histories live in a ring buffer of shape
+    (max_tracks, FRAME_BUFFER, 3) and speeds for every track seen in a frame
+    are computed in one vectorized pass. Results match SpeedTracker.update
+    called once per detection with the same timestamps.
+    """
+    def __init__(self, max_tracks: int = None, clock: Clock = None,
+                 calibration: GroundPlaneCalibration = None):
+        self.clock = clock or WallClock()
+        self.calibration = calibration
+        self.max_tracks = max_tracks or config.MAX_TRACKS
+        self.buffer = config.FRAME_BUFFER
+        self.history = np.zeros((self.max_tracks, self.buffer, 3))
+        self.totals = np.zeros(self.max_tracks, dtype=np.int64)  # Samples ever written
+        self.smoothed = np.zeros(self.max_tracks)
+        self.has_speed = np.zeros(self.max_tracks, dtype=bool)
+        self.last_seen = np.full(self.max_tracks, -np.inf)
+        self.slots: Dict[int, int] = {}
+        self.slot_tracks = np.full(self.max_tracks, -1, dtype=np.int64)
+        self.free_slots: List[int] = list(range(self.max_tracks - 1, -1, -1))
+        self.frame_height: float = None
+        self.last_speeds: Dict[int, float] = {}
+        self._offsets = np.arange(self.buffer)
+        self.kalman = KalmanSpeedBank(self.max_tracks) if config.SPEED_ESTIMATOR == 'kalman' else None
+
+    def get_last_speed(self, track_id: int) -> float:
+        """Get the last calculated speed for a track"""
+        return self.last_speeds.get(track_id, 0.0)
+
+    def track_count(self) -> int:
+        """Number of tracks currently held"""
+        return len(self.slots)
+
+    def get_estimate(self, track_id: int) -> Optional[SpeedEstimate]:
+        """Speed, heading and uncertainty of a track (Kalman estimator only)"""
+        slot = self.slots.get(track_id)
+        if self.kalman is None or slot is None:
+            return None
+        return self.kalman.estimate(slot)
+
+    def get_velocity(self, track_id: int) -> Tuple[float, float]:
+        """Average image-space velocity (pixels/s) over the track's history"""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            return 0.0, 0.0
+        total = int(self.totals[slot])
+        count = min(total, self.buffer)
+        if count < 2:
+            return 0.0, 0.0
+        x0, y0, t0 = self.history[slot, (total - count) % self.buffer]
+        x1, y1, t1 = self.history[slot, (total - 1) % self.buffer]
+        if t1 - t0 <= 0:
+            return 0.0, 0.0
+        return float((x1 - x0) / (t1 - t0)), float((y1 - y0) / (t1 - t0))
+
+    def _slot_for(self, track_id: int) -> int:
+        """The track's slot, claimed for the current frame; -1 if the frame has claimed every slot"""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            if not self.free_slots:
+                # Full: reuse the slot of the track seen longest ago,
+                # never one an earlier detection of this frame claimed
+                oldest = int(np.argmin(self.last_seen))
+                if self.last_seen[oldest] == np.inf:
+                    return -1
+                self._release(oldest)
+            slot = self.free_slots.pop()
+            self.slots[track_id] = slot
+            self.slot_tracks[slot] = track_id
+        self.last_seen[slot] = np.inf  # Set to the frame time once every detection has a slot
+        return slot
+
+    def _release(self, slot: int):
+        track_id = int(self.slot_tracks[slot])
+        self.slots.pop(track_id, None)
+        self.last_speeds.pop(track_id, None)
+        self.slot_tracks[slot] = -1
+        self.totals[slot] = 0
+        self.has_speed[slot] = False
+        self.last_seen[slot] = -np.inf
+        if self.kalman is not None:
+            self.kalman.reset(slot)
+        self.free_slots.append(slot)
+
+    def update_frame(self, detections: List[Detection], frame_height: float,
+                     timestamp: float = None, frame_width: float = None) -> Dict[int, float]:
+        """Add one frame of detections and return a track_id -> speed mapping.
+
+        ``frame_width`` is used only when the tracker was built without a
+        calibration; see fallback_calibration.
+        """
+        if not detections:
+            return {}
+        if self.frame_height is None:
+            self.frame_height = frame_height
+        if self.calibration is None:
+            self.calibration = fallback_calibration(frame_height, frame_width)
+        current_time = resolve_timestamp(detections[0], timestamp, self.clock)
+
+        track_ids = [d.track_id for d in detections]
+        slots = np.fromiter((self._slot_for(t) for t in track_ids), dtype=np.int64, count=len(track_ids))
+        if np.any(slots < 0):
+            # More tracks in this frame than max_tracks: the rest get no speed
+            overflow = {t: 0.0 for t, s in zip(track_ids, slots.tolist()) if s < 0}
+            kept = [d for d, s in zip(detections, slots.tolist()) if s >= 0]
+            self.last_seen[slots[slots >= 0]] = current_time
+            return {**overflow, **self.update_frame(kept, frame_height, current_time)}
+        bboxes = np.array([d.bbox for d in detections], dtype=float)
+
+        # Write the new centres into each track's ring
+        centres = np.column_stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, (bboxes[:, 1] + bboxes[:, 3]) / 2])
+        write_idx = self.totals[slots] % self.buffer
+        self.history[slots, write_idx, :2] = centres
+        self.history[slots, write_idx, 2] = current_time
+        self.totals[slots] += 1
+        self.last_seen[slots] = current_time
+
+        if self.kalman is not None:
+            # O(1) streaming update; replaces history recompute and smoothing
+            raw = self.kalman.update(slots, self.calibration.pixels_to_world(centres), current_time,
+                                     observation_noise(self.calibration, centres))
+            ready = self.kalman.updates[slots] >= config.MIN_DETECTION_FRAMES
+            speeds = np.where(ready, raw, 0.0)
+            return self._collect(track_ids, ready, speeds)
+
+        counts = np.minimum(self.totals[slots], self.buffer)
+        ready = counts >= config.MIN_DETECTION_FRAMES
+        speeds = np.zeros(len(slots))
+        if np.any(ready):
+            ready_slots = slots[ready]
+            # Unroll each ring into chronological order
+            start = (self.totals[ready_slots] - counts[ready]) % self.buffer
+            order = (start[:, None] + self._offsets[None, :]) % self.buffer
+            ordered = self.history[ready_slots[:, None], order]
+
+            if config.SPEED_FROM_WORLD:
+                raw = calculate_speeds_batch(ordered, counts[ready], np.ones(len(ready_slots)),
+                                             to_world=self.calibration.pixels_to_world)
+            else:
+                scales = self.calibration.scale_for_boxes(bboxes[ready])
+                raw = calculate_speeds_batch(ordered, counts[ready], scales)
+
+            # Apply smoothing
+            alpha = config.SPEED_SMOOTHING_FACTOR
+            prev = self.smoothed[ready_slots]
+            smoothed = np.where(self.has_speed[ready_slots], prev * (1 - alpha) + raw * alpha, raw)
+            self.smoothed[ready_slots] = smoothed
+            self.has_speed[ready_slots] = True
+            speeds[ready] = smoothed
+
+        return self._collect(track_ids, ready, speeds)
+
+    def _collect(self, track_ids: List[int], ready: np.ndarray, speeds: np.ndarray) -> Dict[int, float]:
+        result = {}
+        for track_id, is_ready, speed in zip(track_ids, ready, speeds.tolist()):
+            result[track_id] = speed
+            if is_ready:
+                self.last_speeds[track_id] = speed  # Cache the speed
+        return result
+
+    def cleanup(self, current_time: float = None, max_age: float = 1.0):
+        """Free slots of tracks not updated for max_age seconds"""
+        if current_time is None:
+            current_time = self.clock.now()
+        stale = [s for s in self.slots.values() if current_time - self.last_seen[s] > max_age]
+        for slot in stale:
+            self._release(slot)
+
+    def remove(self, track_id: int):
+        """Forget a track and free its slot"""
+        slot = self.slots.get(track_id)
+        if slot is not None:
+            self._release(slot)
@@ -0,0 +1,556 @@
+"""Multi-camera supervisor: a headless worker per camera, restarted when it fails or stalls.
+
+The camera file (JSON, or YAML when PyYAML is installed) lists the cameras
+and, optionally, config.py settings shared by all of them:
+
+    {
+      "defaults": {"DETECTOR_BACKEND": "onnx", "INFERENCE_WIDTH": 640},
+      "cameras": [
+        {"name": "north", "source": "rtsp://10.0.0.5/stream", "model": "yolov8s.pt",
+         "speed_limits": {"car": 100, "truck": 80}, "cpus": [0, 1],
+         "config": {"ROI_POLYGON": [[0, 400], [1280, 400], [1280, 720], [0, 720]],
+                    "CAMERA_HEIGHT": 7.5}},
+        {"name": "south", "source": "clips/south.mp4", "loop": true}
+      ]
+    }
+
+Camera keys: ``source`` (required), ``name`` (directory under the output
+directory), ``config`` (any config.py setting), ``model`` (YOLO_MODEL),
+``speed_limits`` (per vehicle type), ``cpus`` and ``threads`` (pinning and
+thread caps, by default an even share of the cores), ``loop`` (reopen a
+file when it ends, so files can stand in for cameras) and ``detector``
+('module:Class' factory instead of VehicleDetector).
+
+    python supervisor.py cameras.json --metrics-port 9108
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from multiprocessing import get_context
+from typing import List, Optional
+import config
+from clock import is_live_source
+from metrics import Metrics, MetricsServer
+
+logger = logging.getLogger(__name__)
+
+CAMERA_KEYS = {'name', 'source', 'config', 'model', 'speed_limits', 'cpus', 'threads', 'loop', 'detector'}
+
+
+def load_cameras(path: str) -> dict:
+    """Read and check a camera file; returns {'defaults': {...}, 'cameras': [...]}"""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    defaults = data.get('defaults') or {}
+    cameras = data.get('cameras') or []
+    if not cameras:
+        raise ValueError(f"No cameras in {path}")
+    names = set()
+    for i, camera in enumerate(cameras):
+        if 'source' not in camera:
+            raise ValueError(f"Camera {i} in {path} has no source")
+        name = camera.setdefault('name', f'camera{i}')
+        if not re.fullmatch(r'[A-Za-z0-9_.-]+', str(name)):
+            raise ValueError(f"Camera name {name!r} must be usable as a directory name")
+        if name in names:
+            raise ValueError(f"Camera name {name!r} is used twice in {path}")
+        names.add(name)
+        unknown = set(camera) - CAMERA_KEYS
+        if unknown:
+            logger.warning(f"Camera {name}: ignoring unknown keys {sorted(unknown)}")
+        for key in list(defaults) + list(camera.get('config') or {}):
+            if not hasattr(config, key):
+                logger.warning(f"Camera {name}: {key} is not a config.py setting")
+    return {'defaults': defaults, 'cameras': cameras}
+
+
+def camera_settings(camera: dict, defaults: dict) -> dict:
+    """config.py overrides for one camera: shared defaults, then its own"""
+    settings = dict(defaults)
+    # One port can't be served by every worker; a camera may still set its own
+    settings.pop('METRICS_HTTP_PORT', None)
+    settings.update(camera.get('config') or {})
+    if camera.get('model'):
+        settings['YOLO_MODEL'] = camera['model']
+    settings.setdefault('TELEMETRY_CAMERA', camera['name'])
+    return settings
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(cameras: List[dict], cores: List[int]) -> List[List[int]]:
+    """Explicit ``cpus`` are kept; other cameras share the remaining cores evenly"""
+    taken = {cpu for camera in cameras for cpu in (camera.get('cpus') or [])}
+    free = [cpu for cpu in cores if cpu not in taken] or list(cores)
+    automatic = sum(1 for camera in cameras if not camera.get('cpus'))
+    share = max(1, len(free) // max(1, automatic))
+    assigned = []
+    k = 0
+    for camera in cameras:
+        if camera.get('cpus'):
+            assigned.append([int(cpu) for cpu in camera['cpus']])
+            continue
+        # More cameras than cores: they wrap around and share
+        assigned.append(sorted({free[(k * share + j) % len(free)] for j in range(share)}))
+        k += 1
+    return assigned
+
+
+def limit_threads(threads: int):
+    """Cap the BLAS/OpenMP, torch, ONNX Runtime and OpenCV thread pools of this process.
+
+    torch reads OMP_NUM_THREADS when it is imported, so call this first.
+    """
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    if not config.ONNX_INTRA_OP_THREADS:
+        config.ONNX_INTRA_OP_THREADS = threads
+    import cv2
+    cv2.setNumThreads(threads)
+
+
+def run_camera(camera: dict, settings: dict, output_dir: str, cpus: Optional[List[int]],
+               threads: int, frames, heartbeat):
+    """Worker process for one camera: pin, cap threads, apply its settings, process headless"""
+    logging.basicConfig(level=logging.INFO,
+                        format=f"%(asctime)s [{camera['name']}] %(levelname)s %(name)s: %(message)s")
+    # The supervisor stops workers with SIGTERM; Ctrl-C goes to it alone
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    config.__dict__.update(settings)
+    limit_threads(threads)
+
+    import data_logger
+    from detector import VehicleDetector
+    from pipeline import load_factory
+    from video_processor import VideoProcessor
+    for vehicle_type, limit in (camera.get('speed_limits') or {}).items():
+        data_logger.SPEED_LIMITS[vehicle_type.lower()] = limit
+
+    def beat(frame_number, timestamp):
+        frames.value += 1
+        heartbeat.value = time.time()
+
+    stopping = threading.Event()
+    current = []
+
+    def terminate(*_):
+        stopping.set()
+        for processor in current:
+            processor.stop()
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        detector = load_factory(camera['detector'])() if camera.get('detector') else VehicleDetector()
+        # A looped file is reopened here, keeping the loaded model
+        while not stopping.is_set():
+            processor = VideoProcessor(camera['source'], display=False, detector=detector,
+                                       output_dir=output_dir, on_frame=beat)
+            current[:] = [processor]
+            if stopping.is_set():
+                processor.stop()
+            processor.process_video()
+            if not camera.get('loop'):
+                break
+            if hasattr(detector, 'reset'):
+                detector.reset()
+    except Exception as e:
+        logger.error(f"Camera {camera['name']} failed: {str(e)}")
+        sys.exit(1)
+
+
+class CameraWorker:
+    """Supervisor-side state of one camera: its current run, restarts and throughput"""
+
+    def __init__(self, camera: dict, output_dir: str, cpus: Optional[List[int]] = None):
+        self.camera = camera
+        self.name = camera['name']
+        self.output_dir = output_dir
+        self.cpus = cpus
+        self.live = is_live_source(camera['source'])
+        self.loop = bool(camera.get('loop'))
+        context = get_context('spawn')
+        # Written by the worker after every frame, read here
+        self.frames = context.Value('q', 0, lock=False)
+        self.heartbeat = context.Value('d', 0.0, lock=False)
+
+        self.state = 'waiting'  # 'waiting' to (re)start, 'running', 'done' or 'stopped'
+        self.next_start = 0.0
+        self.started = 0.0
+        self.started_frames = 0
+        self.backoff = config.SUPERVISOR_BACKOFF_INITIAL
+        self.restarts = 0
+        self.stalls = 0
+        self.last_error = None
+        self.reported_frames = 0
+        self.fps = 0.0
+
+    def poll(self, now: float):
+        """Start, restart or retire the worker as needed; one supervision step"""
+        if self.state == 'waiting':
+            if now >= self.next_start:
+                self.started = now
+                self.started_frames = self.frames.value
+                self.state = 'running'
+                logger.info(f"Starting camera {self.name} ({self.camera['source']})")
+                self.launch()
+            return
+        if self.state != 'running':
+            return
+
+        if self.alive():
+            if self.frames.value > self.started_frames:
+                timeout, since = config.SUPERVISOR_STALL_TIMEOUT, self.heartbeat.value
+            else:
+                timeout, since = config.SUPERVISOR_STARTUP_TIMEOUT, self.started
+            if now - since > timeout:
+                self.stalls += 1
+                self.kill()
+                self._failed(now, f"stalled ({now - since:.0f}s without a frame)")
+            return
+
+        code = self.exitcode()
+        if code == 0 and not self.live and not self.loop:
+            self.state = 'done'
+            logger.info(f"Camera {self.name} finished its file")
+            return
+        self._failed(now, f"exited with code {code}" if code else "stream ended")
+
+    def _failed(self, now: float, reason: str):
+        if now - self.started >= config.SUPERVISOR_HEALTHY_TIME:
+            self.backoff = config.SUPERVISOR_BACKOFF_INITIAL
+        delay = self.backoff
+        self.backoff = min(self.backoff * 2, config.SUPERVISOR_BACKOFF_MAX)
+        self.restarts += 1
+        self.last_error = reason
+        self.state = 'waiting'
+        self.next_start = now + delay
+        logger.warning(f"Camera {self.name} {reason}; restart {self.restarts} in {delay:.1f}s")
+
+    def status(self, now: float) -> dict:
+        return {
+            'source': str(self.camera['source']),
+            'state': self.state,
+            'frames': self.frames.value,
+            'fps': round(self.fps, 2),
+            'restarts': self.restarts,
+            'stalls': self.stalls,
+            'last_error': self.last_error,
+            'uptime_s': round(now - self.started, 1) if self.state == 'running' else 0.0,
+            'cpus': self.cpus,
+        }
+
+    def launch(self):
+        raise NotImplementedError
+
+    def alive(self) -> bool:
+        raise NotImplementedError
+
+    def exitcode(self) -> int:
+        raise NotImplementedError
+
+    def kill(self):
+        raise NotImplementedError
+
+    def stop(self, timeout: float):
+        """Ask the worker to finish its current frame and flush its logs"""
+        raise NotImplementedError
+
+
+class ProcessCameraWorker(CameraWorker):
+    """Runs the camera in its own spawned process, pinned to its cores"""
+
+    def __init__(self, camera: dict, output_dir: str, cpus: Optional[List[int]],
+                 threads: int, settings: dict):
+        super().__init__(camera, output_dir, cpus)
+        self.threads = threads
+        self.settings = settings
+        self.process = None
+
+    def launch(self):
+        self.process = get_context('spawn').Process(
+            target=run_camera, name=f'camera-{self.name}',
+            args=(self.camera, self.settings, self.output_dir, self.cpus, self.threads,
+                  self.frames, self.heartbeat),
+            daemon=True
+        )
+        self.process.start()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def exitcode(self) -> int:
+        return self.process.exitcode
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(5)
+
+    def stop(self, timeout: float):
+        if not self.alive():
+            return
+        self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"Camera {self.name} did not stop in {timeout:.0f}s, killing it")
+            self.kill()
+
+    def status(self, now: float) -> dict:
+        status = super().status(now)
+        status['pid'] = self.process.pid if self.alive() else None
+        return status
+
+
+class ThreadCameraWorker(CameraWorker):
+    """Runs the camera on a thread of this process, detecting through a shared engine.
+
+    A thread can't be killed: a stalled one is asked to stop and left
+    behind if it is stuck, and its replacement starts regardless.
+    """
+
+    def __init__(self, camera: dict, output_dir: str, engine):
+        super().__init__(camera, output_dir)
+        self.engine = engine
+        self.thread = None
+        self.stopping = threading.Event()
+        self.current = {'processor': None, 'code': None}
+
+    def launch(self):
+        # Each run gets its own stop flag and result: a stuck thread left
+        # behind by kill() must neither carry on looping nor report as this run
+        self.stopping = threading.Event()
+        self.current = {'processor': None, 'code': None}
+        self.thread = threading.Thread(target=self._run, args=(self.stopping, self.current),
+                                       name=f'camera-{self.name}', daemon=True)
+        self.thread.start()
+
+    def _run(self, stopping: threading.Event, current: dict):
+        from video_processor import VideoProcessor
+
+        def beat(frame_number, timestamp):
+            if not stopping.is_set():
+                self.frames.value += 1
+                self.heartbeat.value = time.time()
+
+        try:
+            detector = self.engine.stream_detector(self.name)
+            while not stopping.is_set():
+                detector.reset()  # No tracks left over from an earlier run or loop
+                processor = VideoProcessor(self.camera['source'], display=False, detector=detector,
+                                           output_dir=self.output_dir, on_frame=beat)
+                current['processor'] = processor
+                if stopping.is_set():
+                    processor.stop()
+                processor.process_video()
+                if not self.loop:
+                    break
+            current['code'] = 0
+        except Exception as e:
+            logger.error(f"Camera {self.name} failed: {str(e)}")
+            current['code'] = 1
+
+    def alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def exitcode(self) -> int:
+        return self.current['code']
+
+    def _request_stop(self):
+        self.stopping.set()
+        processor = self.current['processor']
+        if processor is not None:
+            processor.stop()
+
+    def kill(self):
+        self._request_stop()
+        self.thread.join(5)
+        if self.thread.is_alive():
+            logger.warning(f"Camera {self.name} thread is stuck; starting a new one beside it")
+
+    def stop(self, timeout: float):
+        if not self.alive():
+            return
+        self._request_stop()
+        self.thread.join(timeout)
+
+
+class Supervisor:
+    """Starts every camera and keeps it running until stopped.
+
+    In 'process' mode each camera gets a spawned process pinned to its own
+    cores, with torch/ONNX Runtime/OpenCV threads capped to match, and its
+    own settings, speed limits and model. In 'shared' mode the cameras run
+    on threads of this process and one BatchInferenceEngine batches their
+    frames through a single model, so only ``defaults`` apply. Either way a
+    worker that exits, or stops producing frames for
+    SUPERVISOR_STALL_TIMEOUT seconds, is restarted after an exponential
+    backoff, and per-camera and aggregate throughput is logged, written to
+    ``<output_dir>/status.json`` and exposed as metrics gauges.
+    """
+
+    def __init__(self, cameras: List[dict], defaults: dict = None, output_dir: str = None,
+                 mode: str = None, pin_cpus: bool = None, metrics_port: int = None):
+        self.mode = mode or config.SUPERVISOR_MODE
+        self.output_dir = output_dir or config.SUPERVISOR_OUTPUT_DIR
+        defaults = defaults or {}
+        pin_cpus = config.SUPERVISOR_PIN_CPUS if pin_cpus is None else pin_cpus
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.engine = None
+        self.workers: List[CameraWorker] = []
+        if self.mode == 'shared':
+            from inference_engine import BatchInferenceEngine
+
+            config.__dict__.update(defaults)
+            config.METRICS_HTTP_PORT = None  # Every camera's VideoProcessor shares this process
+            for camera in cameras:
+                ignored = set(camera) & {'config', 'model', 'speed_limits', 'cpus', 'threads', 'detector'}
+                if ignored:
+                    logger.warning(f"Camera {camera['name']}: {sorted(ignored)} ignored in shared mode")
+            self.engine = BatchInferenceEngine()
+            for camera in cameras:
+                directory = os.path.join(self.output_dir, camera['name'])
+                self.workers.append(ThreadCameraWorker(camera, directory, self.engine))
+        elif self.mode == 'process':
+            cores = available_cpus()
+            cpus = assign_cpus(cameras, cores) if pin_cpus else [None] * len(cameras)
+            for camera, camera_cpus in zip(cameras, cpus):
+                threads = camera.get('threads') or (
+                    len(camera_cpus) if camera_cpus else max(1, len(cores) // len(cameras)))
+                directory = os.path.join(self.output_dir, camera['name'])
+                self.workers.append(ProcessCameraWorker(camera, directory, camera_cpus, threads,
+                                                        camera_settings(camera, defaults)))
+        else:
+            raise ValueError(f"Unknown supervisor mode: {self.mode}")
+
+        self.metrics = Metrics(enabled=True)
+        self.server = MetricsServer(self.metrics, metrics_port) if metrics_port else None
+        self.status_file = os.path.join(self.output_dir, 'status.json')
+        self.stopped = threading.Event()
+        self.last_report = None
+
+    def stop(self):
+        """End run(); safe from signal handlers and other threads"""
+        self.stopped.set()
+
+    def run(self, duration: float = None) -> dict:
+        """Supervise until every camera is done, ``duration`` seconds pass or stop() is called"""
+        start = self.last_report = time.time()
+        next_report = start + config.SUPERVISOR_REPORT_INTERVAL
+        try:
+            while True:
+                now = time.time()
+                for worker in self.workers:
+                    worker.poll(now)
+                if now >= next_report:
+                    self.report(now)
+                    next_report = now + config.SUPERVISOR_REPORT_INTERVAL
+                if all(worker.state == 'done' for worker in self.workers):
+                    break
+                if duration is not None and now - start >= duration:
+                    break
+                if self.stopped.wait(0.2):
+                    break
+        finally:
+            end = time.time()
+            self.report(end)  # Throughput up to here, not while the workers shut down
+            self.close()
+        status = self.report(time.time(), measure=False)
+        status['mean_fps'] = round(status['frames'] / max(end - start, 1e-6), 2)
+        return status
+
+    def report(self, now: float, measure: bool = True) -> dict:
+        """Update throughput, gauges and the status file; returns the status"""
+        elapsed = now - self.last_report
+        if measure and elapsed >= 1.0:  # The final report may follow the last one closely
+            self.last_report = now
+            for worker in self.workers:
+                frames = worker.frames.value
+                worker.fps = (frames - worker.reported_frames) / elapsed
+                worker.reported_frames = frames
+
+        status = {
+            'time': now,
+            'mode': self.mode,
+            'cameras': {worker.name: worker.status(now) for worker in self.workers},
+            'running': sum(1 for worker in self.workers if worker.state == 'running'),
+            'frames': sum(worker.frames.value for worker in self.workers),
+            'fps': round(sum(worker.fps for worker in self.workers), 2),
+            'restarts': sum(worker.restarts for worker in self.workers),
+        }
+        if self.engine is not None:
+            engine = self.engine.stats()['aggregate']
+            status['mean_batch_size'] = round(engine['mean_batch_size'], 2)
+
+        self.metrics.set_gauge('cameras_running', status['running'])
+        self.metrics.set_gauge('aggregate_fps', status['fps'])
+        self.metrics.set_gauge('frames', status['frames'])
+        for worker in self.workers:
+            key = re.sub(r'\W', '_', worker.name)
+            self.metrics.set_gauge(f'camera_{key}_fps', worker.fps)
+            self.metrics.set_gauge(f'camera_{key}_restarts', worker.restarts)
+            self.metrics.set_gauge(f'camera_{key}_running', float(worker.state == 'running'))
+        try:
+            temporary = self.status_file + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(status, f, indent=2)
+            os.replace(temporary, self.status_file)
+        except Exception as e:
+            logger.error(f"Error writing supervisor status: {str(e)}")
+
+        cameras = ', '.join(f"{w.name} {w.fps:.1f}" for w in self.workers)
+        logger.info(f"{status['running']}/{len(self.workers)} cameras running, "
+                    f"{status['fps']:.1f} fps total ({cameras}), {status['restarts']} restarts")
+        return status
+
+    def close(self, timeout: float = 10.0):
+        for worker in self.workers:
+            worker.stop(timeout)
+            if worker.state != 'done':
+                worker.state = 'stopped'
+        if self.engine is not None:
+            self.engine.close()
+        if self.server is not None:
+            self.server.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run and supervise one headless worker per camera")
+    parser.add_argument('cameras', help='camera file (JSON, or YAML with PyYAML installed)')
+    parser.add_argument('--mode', choices=('process', 'shared'), default=None,
+                        help='a process per camera, or one batched model shared by camera threads')
+    parser.add_argument('--output-dir', default=None, help='per-camera logs and status.json')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve throughput gauges as Prometheus text on this port')
+    parser.add_argument('--no-pin', action='store_true', help="don't pin workers to cores")
+    parser.add_argument('--duration', type=float, default=None, help='stop after this many seconds')
+    args = parser.parse_args()
+
+    cameras = load_cameras(args.cameras)
+    supervisor = Supervisor(cameras['cameras'], cameras['defaults'], args.output_dir, args.mode,
+                            pin_cpus=False if args.no_pin else None, metrics_port=args.metrics_port)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: supervisor.stop())
+    status = supervisor.run(args.duration)
+    logger.info(f"Processed {status['frames']} frames ({status['mean_fps']:.1f} fps) "
+                f"with {status['restarts']} restarts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""Columnar telemetry: per-track summaries and sampled speed points in hourly Parquet files.
+
+Two tables live under TELEMETRY_DIR, partitioned by UTC date:
+
+    telemetry/tracks/date=2026-10-18/<camera>-<run>-14.parquet
+    telemetry/points/date=2026-10-18/<camera>-<run>-14.parquet
+
+``tracks`` holds one row per vehicle when its track ends; ``points`` one
+speed sample per track every TELEMETRY_SAMPLE_INTERVAL seconds. Rows are
+batched into row groups by a background writer and each writer process
+rolls over to a new file every hour, so many cameras can write into one
+dataset. Files being written are hidden (dot-prefixed) until the hour
+closes. ``compact`` merges each finished day into one file sorted by
+camera and time, so long-range queries open a file per day rather than
+one per camera-hour. Queries prune partitions by date, skip row groups
+by their statistics and memory-map what they read:
+
+    python telemetry.py volume --from 2026-10-01 --to 2026-10-08 --by vehicle_type
+    python telemetry.py speeds --from 2026-10-01 --by lane --camera north
+    python telemetry.py classes --from 2026-10-01 --to 2026-11-01
+    python telemetry.py compact  # e.g. daily from cron
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+import config
+from violation_sink import BufferedSinkWriter, ViolationSink
+
+logger = logging.getLogger(__name__)
+
+TIME = pa.timestamp('ms', tz='UTC')
+SCHEMAS = {
+    'tracks': pa.schema([
+        ('time', TIME),  # When the track ended
+        ('entry_time', TIME),
+        ('camera', pa.string()),
+        ('track_id', pa.int64()),
+        ('vehicle_type', pa.string()),
+        ('lane', pa.string()),
+        ('detections', pa.int32()),
+        ('duration_s', pa.float32()),
+        ('max_speed', pa.float32()),
+        ('median_speed', pa.float32()),
+        ('speed_limit', pa.float32()),
+        ('violation', pa.bool_()),
+        ('violation_id', pa.string()),
+    ]),
+    'points': pa.schema([
+        ('time', TIME),
+        ('camera', pa.string()),
+        ('track_id', pa.int64()),
+        ('vehicle_type', pa.string()),
+        ('lane', pa.string()),
+        ('speed', pa.float32()),
+        ('x', pa.float32()),  # Box bottom centre, pixels
+        ('y', pa.float32()),
+    ]),
+}
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+
+def source_name(source) -> str:
+    """Default camera name: the file name without extension, or the source as given"""
+    name = os.path.splitext(os.path.basename(str(source).rstrip('/')))[0]
+    return name or str(source)
+
+
+def _hour_start(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch // 3600 * 3600, timezone.utc)
+
+
+class HourlyParquetSink(ViolationSink):
+    """Appends batches of records to one Parquet file per hour, in date partitions.
+
+    Record times are epoch seconds. Each batch becomes a row group of the
+    file for its hour; a file is closed (and renamed into view) once rows
+    from a later hour arrive, or on close(). Rows that arrive for an hour
+    already closed go to a new file in that partition.
+    """
+
+    def __init__(self, directory: str, schema: pa.Schema, name: str):
+        self.directory = directory
+        self.schema = schema
+        self.name = name
+        self.writers: Dict[int, tuple] = {}  # hour -> (writer, hidden path, final path)
+        self.files = 0
+
+    def write_batch(self, records: List[Dict]):
+        times = np.array([r['time'] for r in records], dtype=np.float64)
+        columns = {}
+        for field in self.schema:
+            values = [r.get(field.name) for r in records]
+            if field.type == TIME:
+                values = pa.array((np.array(values, dtype=np.float64) * 1000).astype(np.int64)).cast(TIME)
+            columns[field.name] = values
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+
+        hours = (times // 3600).astype(np.int64)
+        batch_hours = np.unique(hours)
+        for hour in batch_hours:
+            rows = table if len(batch_hours) == 1 else table.filter(pa.array(hours == hour))
+            self._writer(int(hour))[0].write_table(rows)
+        # Hours before the newest are complete (one hour of lateness allowed)
+        for hour in [h for h in self.writers if h < batch_hours[-1] - 1]:
+            self._close(hour)
+
+    def _writer(self, hour: int) -> tuple:
+        if hour not in self.writers:
+            start = _hour_start(hour * 3600)
+            directory = os.path.join(self.directory, f"date={start:%Y-%m-%d}")
+            os.makedirs(directory, exist_ok=True)
+            final = os.path.join(directory, f"{self.name}-{start.hour:02d}.parquet")
+            if os.path.exists(final):
+                final = os.path.join(directory, f"{self.name}-{start.hour:02d}-{self.files}.parquet")
+            hidden = os.path.join(directory, '.' + os.path.basename(final))
+            writer = pq.ParquetWriter(hidden, self.schema, compression='zstd')
+            self.writers[hour] = (writer, hidden, final)
+            self.files += 1
+        return self.writers[hour]
+
+    def _close(self, hour: int):
+        writer, hidden, final = self.writers.pop(hour)
+        writer.close()
+        os.replace(hidden, final)
+
+    def close(self):
+        for hour in list(self.writers):
+            self._close(hour)
+
+
+class TelemetryWriter:
+    """Streams per-track summaries and sampled speed points to the telemetry dataset.
+
+    ``observe`` is called with each frame's detections and speeds and keeps
+    one point per track every ``sample_interval`` seconds; ``log_vehicle``
+    is a TrackStore ``on_evict`` callback. Stream timestamps become wall
+    time through ``origin`` (by default, now minus the first timestamp seen).
+    """
+
+    def __init__(self, directory: str = None, camera: str = None, sample_interval: float = None,
+                 origin: float = None):
+        self.directory = directory or config.TELEMETRY_DIR
+        self.camera = camera or config.TELEMETRY_CAMERA or 'camera'
+        self.sample_interval = (config.TELEMETRY_SAMPLE_INTERVAL if sample_interval is None
+                                else sample_interval)
+        self.origin = origin
+        name = f"{self.camera}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.writers = {
+            table: BufferedSinkWriter(
+                HourlyParquetSink(os.path.join(self.directory, table), schema, name),
+                queue_size=config.TELEMETRY_QUEUE_SIZE,
+                flush_count=config.TELEMETRY_BATCH_ROWS,
+                flush_interval=config.TELEMETRY_FLUSH_INTERVAL
+            )
+            for table, schema in SCHEMAS.items()
+        }
+        self.next_sample: Dict[int, float] = {}
+        self.lanes: Dict[int, Optional[str]] = {}
+
+    def _wall(self, timestamp: float) -> float:
+        if self.origin is None:
+            self.origin = time.time() - timestamp
+        return self.origin + timestamp
+
+    def observe(self, detections, speeds: Dict[int, float], timestamp: float):
+        """Sample speed points from one frame's detections"""
+        now = self._wall(timestamp)
+        points = self.writers['points']
+        for det in detections:
+            if det.lane is not None:
+                self.lanes[det.track_id] = det.lane
+            speed = speeds.get(det.track_id, 0.0)
+            if not self.sample_interval or speed <= 0:
+                continue
+            if timestamp < self.next_sample.get(det.track_id, -np.inf):
+                continue
+            self.next_sample[det.track_id] = timestamp + self.sample_interval
+            x1, y1, x2, y2 = det.bbox
+            points.submit({
+                'time': now,
+                'camera': self.camera,
+                'track_id': det.track_id,
+                'vehicle_type': det.class_name,
+                'lane': det.lane,
+                'speed': speed,
+                'x': (x1 + x2) / 2,
+                'y': y2,
+            })
+
+    def log_vehicle(self, summary):
+        """Record a finished track"""
+        self.next_sample.pop(summary.track_id, None)
+        self.writers['tracks'].submit({
+            'time': self._wall(summary.exit_time),
+            'entry_time': self._wall(summary.entry_time),
+            'camera': self.camera,
+            'track_id': summary.track_id,
+            'vehicle_type': summary.vehicle_type,
+            'lane': self.lanes.pop(summary.track_id, None),
+            'detections': summary.detections,
+            'duration_s': summary.exit_time - summary.entry_time,
+            'max_speed': summary.max_speed,
+            'median_speed': summary.median_speed,
+            'speed_limit': summary.speed_limit,
+            'violation': summary.violation,
+            'violation_id': summary.violation_id,
+        })
+
+    def metrics(self) -> Dict[str, float]:
+        values = {}
+        for table, writer in self.writers.items():
+            values[f'telemetry_{table}_written'] = writer.written
+            values[f'telemetry_{table}_dropped'] = writer.dropped
+        return values
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        """Write everything queued and close the current hour's files"""
+        for writer in self.writers.values():
+            writer.close()
+
+
+def parse_time(value) -> Optional[datetime]:
+    """datetime, epoch seconds or an ISO date/time string (UTC unless it says otherwise)"""
+    if value is None or isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, (int, float)):
+        moment = datetime.fromtimestamp(value, timezone.utc)
+    else:
+        moment = datetime.fromisoformat(value)
+    if moment is not None and moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class TelemetryStore:
+    """Read-side of the telemetry dataset: filtered scans and a few standard aggregates"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or config.TELEMETRY_DIR
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    def dataset(self, table: str) -> ds.Dataset:
+        schema = pa.unify_schemas([SCHEMAS[table], PARTITIONING.schema])
+        return ds.dataset(os.path.join(self.directory, table), schema=schema,
+                          format='parquet', partitioning=PARTITIONING, filesystem=self.filesystem)
+
+    def _filter(self, start, end, **equals):
+        """Partition bounds plus row predicates, pushed down to the scan"""
+        expression = None
+        start, end = parse_time(start), parse_time(end)
+        terms = []
+        if start is not None:
+            terms += [ds.field('date') >= f"{start:%Y-%m-%d}", ds.field('time') >= pa.scalar(start, TIME)]
+        if end is not None:
+            last_day = end - timedelta(microseconds=1)
+            terms += [ds.field('date') <= f"{last_day:%Y-%m-%d}", ds.field('time') < pa.scalar(end, TIME)]
+        for column, value in equals.items():
+            if value is not None:
+                terms.append(ds.field(column) == value)
+        for term in terms:
+            expression = term if expression is None else expression & term
+        return expression
+
+    def read(self, table: str, start=None, end=None, columns: List[str] = None,
+             camera: str = None, lane: str = None, vehicle_type: str = None) -> pa.Table:
+        """Rows of ``table`` with ``start <= time < end`` matching the given columns"""
+        if not os.path.isdir(os.path.join(self.directory, table)):
+            return SCHEMAS[table].empty_table().select(columns or SCHEMAS[table].names)
+        return self.dataset(table).to_table(
+            columns=columns,
+            filter=self._filter(start, end, camera=camera, lane=lane, vehicle_type=vehicle_type)
+        )
+
+    def hourly_volume(self, start=None, end=None, by: str = 'vehicle_type', **filters):
+        """Vehicles per hour (from ended tracks), one column per value of ``by``"""
+        data = self.read('tracks', start, end, columns=['time', by], **filters)
+        hours = pc.floor_temporal(data['time'], unit='hour')
+        counts = pa.table({'hour': hours, by: data[by]}).group_by(['hour', by]).aggregate([([], 'count_all')])
+        frame = counts.to_pandas()
+        if frame.empty:
+            return frame
+        return frame.pivot(index='hour', columns=by, values='count_all').fillna(0).astype(int)
+
+    def speed_distribution(self, start=None, end=None, by: str = 'lane', table: str = 'tracks',
+                           **filters):
+        """Count, mean and percentiles of speed per ``by`` group (tracks: median speed per vehicle)"""
+        speed = 'median_speed' if table == 'tracks' else 'speed'
+        frame = self.read(table, start, end, columns=[by, speed], **filters).to_pandas()
+        grouped = frame.groupby(by, dropna=False)[speed]
+        result = grouped.describe(percentiles=[0.5, 0.85, 0.95])
+        return result[['count', 'mean', '50%', '85%', '95%', 'max']].round(1)
+
+    def class_mix(self, start=None, end=None, **filters):
+        """Vehicles and share per vehicle type"""
+        counts = self.read('tracks', start, end, columns=['vehicle_type'], **filters).group_by(
+            'vehicle_type').aggregate([([], 'count_all')]).to_pandas()
+        counts = counts.rename(columns={'count_all': 'vehicles'}).set_index('vehicle_type')
+        counts['share'] = (counts['vehicles'] / max(1, counts['vehicles'].sum())).round(3)
+        return counts.sort_values('vehicles', ascending=False)
+
+    def compact(self, before=None) -> int:
+        """Merge each day before ``before`` into one file per table; returns days compacted.
+
+        ``before`` defaults to two hours ago, so writers have closed the day
+        (they allow an hour of lateness). Rows are sorted by camera and time
+        so row-group statistics prune camera and time filters well.
+        """
+        before = parse_time(before) or datetime.now(timezone.utc) - timedelta(hours=2)
+        cutoff = f"date={before:%Y-%m-%d}"
+        compacted = 0
+        for table, schema in SCHEMAS.items():
+            root = os.path.join(self.directory, table)
+            if not os.path.isdir(root):
+                continue
+            for partition in sorted(os.listdir(root)):
+                if not partition.startswith('date=') or partition >= cutoff:
+                    continue
+                directory = os.path.join(root, partition)
+                files = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                               if f.endswith('.parquet') and not f.startswith('.'))
+                final = os.path.join(directory, f"day-{partition[5:]}.parquet")
+                if not files or files == [final]:
+                    continue
+                try:
+                    data = ds.dataset(files, schema=schema, format='parquet').to_table()
+                    data = data.sort_by([('camera', 'ascending'), ('time', 'ascending')])
+                    hidden = os.path.join(directory, '.day.parquet')
+                    pq.write_table(data, hidden, compression='zstd',
+                                   row_group_size=config.TELEMETRY_COMPACT_ROWS)
+                    # Replaces an earlier day file too, as it is one of the inputs
+                    os.replace(hidden, final)
+                    for path in files:
+                        if path != final:
+                            os.remove(path)
+                    compacted += 1
+                    logger.info(f"Compacted {table}/{partition}: {len(files)} files, {data.num_rows} rows")
+                except Exception as e:
+                    logger.error(f"Error compacting {directory}: {e}")
+        return compacted
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Query the telemetry dataset")
+    parser.add_argument('query', choices=('volume', 'speeds', 'classes', 'compact'),
+                        help='hourly volume, speed distribution, vehicle class mix, '
+                             'or merge finished days (those before --to) into one file each')
+    parser.add_argument('--dir', default=None, help='telemetry directory (default: TELEMETRY_DIR)')
+    parser.add_argument('--from', dest='start', default=None, help='UTC date or time, inclusive')
+    parser.add_argument('--to', dest='end', default=None, help='UTC date or time, exclusive')
+    parser.add_argument('--by', default=None, help='group column (volume: vehicle_type, speeds: lane)')
+    parser.add_argument('--points', action='store_true', help='speeds from sampled points, not tracks')
+    parser.add_argument('--camera', default=None)
+    parser.add_argument('--lane', default=None)
+    parser.add_argument('--type', dest='vehicle_type', default=None, help='vehicle type, e.g. Car')
+    args = parser.parse_args()
+
+    store = TelemetryStore(args.dir)
+    filters = dict(camera=args.camera, lane=args.lane, vehicle_type=args.vehicle_type)
+    start = time.perf_counter()
+    if args.query == 'compact':
+        logger.info(f"Compacted {store.compact(args.end)} day partitions "
+                    f"in {time.perf_counter() - start:.1f}s")
+        return
+    if args.query == 'volume':
+        result = store.hourly_volume(args.start, args.end, by=args.by or 'vehicle_type', **filters)
+    elif args.query == 'speeds':
+        result = store.speed_distribution(args.start, args.end, by=args.by or 'lane',
+                                          table='points' if args.points else 'tracks', **filters)
+    else:
+        result = store.class_mix(args.start, args.end, **filters)
+    print(result.to_string())
+    logger.info(f"Query took {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
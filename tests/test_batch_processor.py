@@ -0,0 +1,25 @@
+import batch_processor
+from batch_processor import BatchProcessor, match_tracks, process_segment
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.synthetic import write_clip
+
+
+class StubDetector(ColorBlobDetector):
+    def reset(self):
+        self.ids = {}
+
+
+def test_tracks_are_stitched_when_detecting_every_other_frame(tmp_path, monkeypatch):
+    # 201 frames in two segments: the second starts at 101 and warms up from 71
+    clip = write_clip(str(tmp_path / 'clip.mp4'), width=640, height=360, frames=201, vehicles=3, seed=1)
+    monkeypatch.setattr(batch_processor, '_detector', StubDetector())
+    processor = BatchProcessor(clip, segments=2, overlap=30, detect_every=2, motion_gate=False)
+    tasks = processor._tasks(str(tmp_path), threads=1)
+    assert [task['start'] - task['warmup'] for task in tasks] == [0, 71]
+
+    previous, current = (process_segment(task) for task in tasks)
+    assert set(current['head_boxes']) <= set(previous['tail_boxes'])
+
+    head_tracks = {track_id for boxes in current['head_boxes'].values() for track_id, _ in boxes}
+    assert len(head_tracks) == 3
+    assert set(match_tracks(previous['tail_boxes'], current['head_boxes'])) == head_tracks
@@ -0,0 +1,17 @@
+import pytest
+from benchmarks.check_clock_replay import replay
+from benchmarks.synthetic import write_clip
+from speed_tracker import BatchSpeedTracker, SpeedTracker
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory):
+    return write_clip(str(tmp_path_factory.mktemp('clip') / 'clip.mp4'), width=320, height=180, frames=15)
+
+
+@pytest.mark.parametrize('tracker_cls', [SpeedTracker, BatchSpeedTracker])
+def test_speeds_do_not_depend_on_processing_speed(clip, tracker_cls):
+    slow = replay(clip, 0.25, tracker_cls)
+    assert any(speed > 0 for frame in slow for _, speed in frame)
+    for factor in (1, 8):
+        assert replay(clip, factor, tracker_cls) == slow
@@ -0,0 +1,16 @@
+import gc
+import weakref
+from data_logger import SpeedLogger
+
+
+def test_closed_logger_is_not_kept_alive_by_its_exit_hook(tmp_path):
+    logger = SpeedLogger(log_file=str(tmp_path / 'violations.csv'),
+                         export_file=str(tmp_path / 'violations.xlsx'),
+                         summary_file=str(tmp_path / 'vehicles.jsonl'))
+    logger.close()
+    ref = weakref.ref(logger)
+
+    del logger
+    gc.collect()
+
+    assert ref() is None
@@ -0,0 +1,54 @@
+import time
+from benchmarks.synthetic import write_clip
+from frame_scheduler import AdaptiveFrameScheduler
+from video_capture import ThreadedVideoCapture
+
+
+def wait_for_backlog(capture, frames, timeout=5.0):
+    deadline = time.time() + timeout
+    while capture.backlog() < frames and time.time() < deadline:
+        time.sleep(0.01)
+    return capture.backlog()
+
+
+def test_blocking_ring_fills_to_its_capacity(tmp_path):
+    clip = write_clip(str(tmp_path / 'clip.mp4'), width=320, height=180, frames=30)
+    capture = ThreadedVideoCapture(clip, queue_size=3, buffer_mode='ring', drop_policy='block')
+    try:
+        assert capture.read()[0]
+        # The consumer holds one of the three slots, so two frames can wait
+        assert capture.capacity == 2
+        assert wait_for_backlog(capture, capture.capacity) == capture.capacity
+    finally:
+        capture.release()
+
+
+def test_full_ring_widens_the_detection_interval(tmp_path):
+    clip = write_clip(str(tmp_path / 'clip.mp4'), width=320, height=180, frames=60)
+    capture = ThreadedVideoCapture(clip, queue_size=3, buffer_mode='ring', drop_policy='drop_oldest')
+    try:
+        assert capture.read()[0]
+        # ...and a dropping producer keeps another one to refill
+        assert capture.capacity == 1
+        assert wait_for_backlog(capture, capture.capacity) == capture.capacity
+
+        scheduler = AdaptiveFrameScheduler(source_fps=30.0, adaptive=True, initial_interval=1)
+        scheduler.record_detection(0.001, capture.backlog(), capture.capacity)
+        assert scheduler.interval == 2
+    finally:
+        capture.release()
+
+
+def test_drained_ring_narrows_the_detection_interval(tmp_path):
+    clip = write_clip(str(tmp_path / 'clip.mp4'), width=320, height=180, frames=3)
+    capture = ThreadedVideoCapture(clip, queue_size=3, buffer_mode='ring', drop_policy='block')
+    try:
+        for _ in range(3):
+            assert capture.read()[0]
+        assert capture.backlog() == 0
+
+        scheduler = AdaptiveFrameScheduler(source_fps=30.0, adaptive=True, initial_interval=3)
+        scheduler.record_detection(0.001, capture.backlog(), capture.capacity)
+        assert scheduler.interval == 2
+    finally:
+        capture.release()
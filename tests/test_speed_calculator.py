@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import config
+from calibration import get_calibration
+from speed_calculator import calculate_speed, calculate_speeds_batch
+
+
+def histories(n_tracks=200, n_samples=30, seed=0):
+    """Noisy tracks of varying length and speed, some parked, some with outliers"""
+    rng = np.random.default_rng(seed)
+    times = np.arange(n_samples) / 30.0 + rng.normal(0, 0.002, (n_tracks, n_samples))
+    velocity = rng.uniform(-12, 12, (n_tracks, 1, 2)) * rng.choice([0.0, 0.02, 1.0], (n_tracks, 1, 1))
+    start = np.column_stack([rng.uniform(0, 1800, n_tracks), rng.uniform(200, 1000, n_tracks)])
+    xy = start[:, None, :] + velocity * np.arange(n_samples)[None, :, None]
+    xy += rng.normal(0, 1.5, xy.shape)
+    jumps = rng.random((n_tracks, n_samples)) < 0.05
+    xy[jumps] += rng.uniform(-60, 60, (int(jumps.sum()), 2))
+    history = np.concatenate([xy, times[..., None]], axis=2)
+    counts = rng.integers(1, n_samples + 1, n_tracks)
+    return history, counts
+
+
+@pytest.mark.parametrize('world', [False, True])
+def test_batch_speeds_match_calculate_speed_row_by_row(world):
+    calibration = get_calibration(1080, config.__dict__, 1920)
+    history, counts = histories()
+    scales = np.ones(len(history)) if world else calibration.scale_at(history[:, 0, 1])
+    to_world = calibration.pixels_to_world if world else None
+
+    batch = calculate_speeds_batch(history, counts, scales, to_world=to_world)
+
+    expected = [calculate_speed([tuple(p) for p in history[i, :counts[i]]], scales[i], to_world=to_world)
+                for i in range(len(history))]
+    assert np.any(batch > 0)
+    np.testing.assert_allclose(batch, expected, rtol=1e-9, atol=1e-9)
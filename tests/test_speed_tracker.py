@@ -0,0 +1,107 @@
+import pytest
+import config
+from calibration import get_calibration
+from detector import Detection
+from speed_tracker import BatchSpeedTracker, SpeedTracker
+
+CALIBRATION = get_calibration(1080, config.__dict__, 1920)
+
+
+def detection(track_id, x=100.0, y=500.0):
+    return Detection(track_id, 'Car', (x, y, x + 40.0, y + 20.0), 0.9)
+
+
+def test_new_tracks_in_one_frame_do_not_evict_each_other():
+    tracker = BatchSpeedTracker(max_tracks=3, calibration=CALIBRATION)
+    tracker.update_frame([detection(1), detection(2), detection(3)], 1080, timestamp=0.0)
+
+    tracker.update_frame([detection(4), detection(5)], 1080, timestamp=0.1)
+
+    assert set(tracker.slots) == {3, 4, 5}
+    assert len(set(tracker.slots.values())) == 3
+
+
+def test_eviction_skips_a_track_updated_in_the_same_frame():
+    tracker = BatchSpeedTracker(max_tracks=3, calibration=CALIBRATION)
+    tracker.update_frame([detection(1), detection(2), detection(3)], 1080, timestamp=0.0)
+    tracker.update_frame([detection(2), detection(3)], 1080, timestamp=0.1)
+
+    tracker.update_frame([detection(1), detection(4)], 1080, timestamp=0.2)
+
+    assert set(tracker.slots) == {1, 3, 4}
+    assert tracker.slots[1] != tracker.slots[4]
+    assert int(tracker.totals[tracker.slots[1]]) == 2  # Its history wasn't reset or shared
+    assert int(tracker.totals[tracker.slots[4]]) == 1
+
+
+def test_tracks_beyond_capacity_in_one_frame_get_no_speed():
+    tracker = BatchSpeedTracker(max_tracks=2, calibration=CALIBRATION)
+    speeds = tracker.update_frame([detection(1), detection(2), detection(3)], 1080, timestamp=0.0)
+
+    assert speeds == {1: 0.0, 2: 0.0, 3: 0.0}
+    assert set(tracker.slots) == {1, 2}
+
+
+@pytest.mark.parametrize('tracker_cls', [SpeedTracker, BatchSpeedTracker])
+def test_fallback_calibration_matches_the_one_video_processor_builds(tracker_cls):
+    # Straight down the centre column: with the lateral origin at column 0
+    # this picked up 960 px x the change in scale as sideways motion
+    def run(tracker, **kwargs):
+        for i in range(10):
+            det = detection(1, 940.0, 500.0 + 2.0 * i)
+            if tracker_cls is SpeedTracker:
+                speed = tracker.update(det, 1080, i / 30.0, **kwargs)
+            else:
+                speed = tracker.update_frame([det], 1080, i / 30.0, **kwargs)[1]
+        return speed
+
+    expected = run(tracker_cls(calibration=CALIBRATION))
+    assert expected > 0
+    assert run(tracker_cls(), frame_width=1920) == pytest.approx(expected)
+
+
+def test_road_positions_need_the_frame_width(monkeypatch):
+    monkeypatch.setattr(config, 'SPEED_FROM_WORLD', True)
+    with pytest.raises(ValueError):
+        BatchSpeedTracker().update_frame([detection(1)], 1080, timestamp=0.0)
+    with pytest.raises(ValueError):
+        SpeedTracker().update(detection(1), 1080, timestamp=0.0)
+
+
+@pytest.mark.parametrize('tracker_cls', [SpeedTracker, BatchSpeedTracker])
+def test_per_row_scale_keeps_the_old_call_signature(tracker_cls, monkeypatch, caplog):
+    # Without road positions the width isn't needed: warn, don't raise
+    monkeypatch.setattr(config, 'SPEED_FROM_WORLD', False)
+    monkeypatch.setattr(config, 'SPEED_ESTIMATOR', 'median')
+
+    def run(tracker):
+        for i in range(10):
+            det = detection(1, 940.0, 500.0 + 2.0 * i)
+            if tracker_cls is SpeedTracker:
+                speed = tracker.update(det, 1080, i / 30.0)
+            else:
+                speed = tracker.update_frame([det], 1080, i / 30.0)[1]
+        return speed
+
+    with caplog.at_level('WARNING', logger='speed_tracker'):
+        speed = run(tracker_cls())
+    assert 'No frame width' in caplog.text
+    assert speed > 0
+    assert speed == pytest.approx(run(tracker_cls(calibration=CALIBRATION)))
+
+
+@pytest.mark.parametrize('estimator', ['median', 'kalman'])
+def test_batch_tracker_matches_the_per_detection_tracker(estimator, monkeypatch):
+    from benchmarks.bench_speed_tracker import FRAME_HEIGHT, FRAME_WIDTH, synthetic_frames
+
+    monkeypatch.setattr(config, 'SPEED_ESTIMATOR', estimator)
+    calibration = get_calibration(FRAME_HEIGHT, config.__dict__, FRAME_WIDTH)
+    per_detection = SpeedTracker(calibration=calibration)
+    batch = BatchSpeedTracker(max_tracks=20, calibration=calibration)
+    moving = 0
+    for timestamp, detections in synthetic_frames(n_tracks=20, n_frames=90):
+        expected = [per_detection.update(d, FRAME_HEIGHT, timestamp) for d in detections]
+        speeds = batch.update_frame(detections, FRAME_HEIGHT, timestamp)
+        assert [speeds[d.track_id] for d in detections] == pytest.approx(expected, rel=1e-9, abs=1e-9)
+        moving += sum(speed > 0 for speed in expected)
+    assert moving
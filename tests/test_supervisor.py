@@ -0,0 +1,57 @@
+import threading
+import time
+from benchmarks.stub_detector import ColorBlobDetector
+from benchmarks.synthetic import write_clip
+from supervisor import ThreadCameraWorker
+
+
+class StubDetector(ColorBlobDetector):
+    """Blocks in detect() while ``held`` is set, like a stuck model call"""
+
+    def __init__(self, held=None):
+        super().__init__()
+        self.held = held
+        self.entered = threading.Event()
+
+    def detect(self, frame, timestamp=None, frame_size=None):
+        self.entered.set()
+        if self.held is not None:
+            self.held.wait()
+        return super().detect(frame, timestamp, frame_size)
+
+    def reset(self):
+        self.ids = {}
+
+
+class StubEngine:
+    def __init__(self, detectors):
+        self.detectors = list(detectors)
+
+    def stream_detector(self, stream_id):
+        return self.detectors.pop(0)
+
+
+def test_thread_left_behind_by_kill_does_not_keep_running(tmp_path):
+    clip = write_clip(str(tmp_path / 'clip.mp4'), width=320, height=180, frames=30)
+    held = threading.Event()
+    stuck, replacement = StubDetector(held), StubDetector()
+    camera = {'name': 'cam', 'source': clip, 'loop': True}
+    worker = ThreadCameraWorker(camera, str(tmp_path / 'cam'), StubEngine([stuck, replacement]))
+
+    worker.launch()
+    assert stuck.entered.wait(10)
+    old = worker.thread
+    worker.kill()
+    assert old.is_alive()
+
+    worker.launch()
+    assert replacement.entered.wait(10)
+    held.set()  # The old thread comes unstuck
+    old.join(10)
+    try:
+        assert not old.is_alive()
+        assert worker.alive()
+        assert worker.exitcode() is None  # The old run's exit isn't this one's
+    finally:
+        worker.stop(10)
+    assert worker.exitcode() == 0
@@ -0,0 +1,36 @@
+from detector import Detection
+from track_store import TrackStore
+
+
+def detection(track_id):
+    return Detection(track_id, 'Car', (100.0, 500.0, 140.0, 520.0), 0.9)
+
+
+def full_store(ended):
+    store = TrackStore(capacity=3, on_evict=[ended.append], id_prefix='test')
+    store.observe([detection(1), detection(2), detection(3)], {}, 0.0)
+    return store
+
+
+def test_full_store_keeps_a_track_updated_in_the_same_frame():
+    ended = []
+    store = full_store(ended)
+
+    # Same timestamp as the last frame: track 1 must not lose its slot to track 4
+    store.observe([detection(1), detection(4)], {}, 0.0)
+
+    assert [s.track_id for s in ended] == [2]
+    assert set(store.slots) == {1, 3, 4}
+    assert int(store.detections[store.slots[1]]) == 2
+
+
+def test_new_tracks_beyond_capacity_in_one_frame_are_not_recorded():
+    ended = []
+    store = full_store(ended)
+
+    store.observe([detection(4), detection(5), detection(6), detection(7)], {}, 0.1)
+
+    assert [s.track_id for s in ended] == [1, 2, 3]
+    assert all(s.reason == 'evicted' for s in ended)
+    assert set(store.slots) == {4, 5, 6}
+    assert store.last_seen.tolist() == [0.1, 0.1, 0.1]
@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+import pytest
+from video_capture import FFmpegReader
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='stand-in ffmpeg is a shell script')
+
+
+def stand_in_ffmpeg(tmp_path, script):
+    """An executable that ignores ffmpeg's arguments and runs ``script``"""
+    path = tmp_path / 'ffmpeg'
+    path.write_text('#!/bin/sh\n' + script + '\n')
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+def test_stalled_stream_read_times_out(tmp_path):
+    # One whole 4x2 frame, then part of the next and silence
+    binary = stand_in_ffmpeg(tmp_path, "head -c 24 /dev/zero; head -c 5 /dev/zero; exec sleep 30")
+    reader = FFmpegReader('http://camera/stream', (4, 2), binary=binary, read_timeout=0.3)
+    try:
+        ret, frame = reader.read()
+        assert ret and frame.shape == (2, 4, 3)
+
+        started = time.monotonic()
+        ret, frame = reader.read()
+        assert not ret
+        assert reader.timed_out
+        assert time.monotonic() - started < 2.0
+    finally:
+        reader.release()
+
+
+def test_slow_stream_within_the_timeout_is_not_stopped(tmp_path):
+    binary = stand_in_ffmpeg(tmp_path, "for i in 1 2 3; do head -c 24 /dev/zero; sleep 0.2; done")
+    reader = FFmpegReader('http://camera/stream', (4, 2), binary=binary, read_timeout=1.0)
+    try:
+        assert [reader.read()[0] for _ in range(4)] == [True, True, True, False]
+        assert not reader.timed_out
+    finally:
+        reader.release()
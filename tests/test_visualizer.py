@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import config
+from detector import Detection
+from visualizer import Visualizer
+
+DEFAULT_LIMITS = {'car': 120, 'motorcycle': 120, 'bus': 80, 'truck': 100}
+
+
+def draw_before_sprites(frame, detection, speed):
+    """Visualizer.draw as it was before labels were cached as sprites"""
+    x1, y1, x2, y2 = [int(c) for c in detection.bbox]
+    vehicle_type = detection.class_name.lower()
+    speed_limit = config.VEHICLE_SPEED_LIMITS.get(vehicle_type, DEFAULT_LIMITS.get(vehicle_type, 100))
+    if speed < speed_limit * 0.8:
+        speed_color = (0, 255, 0)
+    elif speed < speed_limit:
+        speed_color = (0, 255, 255)
+    else:
+        speed_color = (0, 0, 255)
+    vehicle_color = Visualizer().colors.get(vehicle_type, (0, 255, 0))
+    cv2.rectangle(frame, (x1, y1), (x2, y2), vehicle_color, 2)
+    for i, text in enumerate([detection.class_name, f"{speed:.1f} km/h"]):
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        text_y = y1 - 10 - (i * (text_h + 5))
+        cv2.rectangle(frame, (x1, text_y - text_h - 5), (x1 + text_w + 10, text_y + 5),
+                      vehicle_color if i == 0 else speed_color, -1)
+        cv2.putText(frame, text, (x1 + 5, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+
+def test_sprites_draw_the_same_pixels_as_before():
+    rng = np.random.default_rng(0)
+    classes = ['Car', 'Bus', 'Truck', 'Motorcycle', 'Van', 'Tractor']
+    detections, speeds = [], {}
+    for i in range(60):
+        x, y = rng.uniform(-20, 1200), rng.uniform(-10, 650)
+        w, h = rng.uniform(30, 200, 2)
+        detections.append(Detection(i, classes[i % len(classes)], (x, y, x + w, y + h), 0.9))
+        speeds[i] = float(rng.uniform(0, 180))
+    background = rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+    expected = background.copy()
+    for det in detections:
+        draw_before_sprites(expected, det, speeds[det.track_id])
+    visualizer = Visualizer()
+    actual = background.copy()
+    for _ in range(2):  # Second pass draws from cached sprites
+        actual[:] = background
+        visualizer.draw_all(actual, detections, speeds)
+        assert np.array_equal(actual, expected)
@@ -0,0 +1,165 @@
+"""Bounded store of live tracks with per-vehicle summaries on exit"""
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import config
+from data_logger import get_speed_limit
+from detector import Detection
+
+
+@dataclass
+class TrackSummary:
+    track_id: int
+    vehicle_type: str
+    entry_time: float  # Stream time (seconds) of the first detection
+    exit_time: float  # Stream time of the last detection
+    detections: int
+    max_speed: float  # km/h
+    median_speed: float  # km/h, over the track's most recent speed readings
+    speed_limit: float
+    violation: bool
+    reason: str  # 'expired', 'evicted' (capacity) or 'flushed' (end of stream)
+    violation_id: str = ''  # Links the violation record to its evidence files
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TrackStore:
+    """Live tracks in fixed slots, ended by idle time or least-recent use.
+
+    Times are the stream timestamps passed to ``observe``, so expiry
+    follows video time rather than how fast frames are processed. Each
+    slot keeps the track's entry/last-seen times, detection count, class
+    votes, maximum speed and a small ring of recent speeds for the median.
+    When a track ends, one TrackSummary goes to every ``on_evict`` callback.
+    A track's violation ID is ``<id_prefix>-<track_id>``, fixed the first
+    time it goes over its limit (the prefix defaults to the start time, so
+    IDs stay unique across runs).
+    """
+    def __init__(self, capacity: int = None, max_age: float = None, speed_samples: int = None,
+                 on_evict: List[Callable[[TrackSummary], None]] = None, id_prefix: str = None):
+        self.capacity = capacity or config.MAX_TRACKS
+        self.id_prefix = id_prefix or datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.max_age = max_age or config.TRACK_MAX_AGE
+        self.samples = speed_samples or config.TRACK_SPEED_SAMPLES
+        self.on_evict = list(on_evict or [])
+
+        self.first_seen = np.zeros(self.capacity)
+        self.last_seen = np.full(self.capacity, np.inf)  # inf marks a free slot for expiry
+        self.detections = np.zeros(self.capacity, dtype=np.int64)
+        self.max_speed = np.zeros(self.capacity)
+        self.speed_ring = np.zeros((self.capacity, self.samples))
+        self.speed_count = np.zeros(self.capacity, dtype=np.int64)
+        self.class_votes: List[Dict[str, int]] = [{} for _ in range(self.capacity)]
+        self.violation_ids: List[Optional[str]] = [None] * self.capacity
+        self.slots: Dict[int, int] = {}
+        self.slot_tracks = np.full(self.capacity, -1, dtype=np.int64)
+        self.free_slots: List[int] = list(range(self.capacity - 1, -1, -1))
+        self.ended = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _slot_for(self, track_id: int, timestamp: float) -> int:
+        """The track's slot, claimed for the current frame; -1 if the frame has claimed every slot"""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            if not self.free_slots:
+                # Full: end the track seen longest ago,
+                # never one an earlier detection of this frame claimed
+                oldest = int(np.argmin(self.last_seen))
+                if self.last_seen[oldest] == np.inf:
+                    return -1
+                self._end(oldest, 'evicted')
+            slot = self.free_slots.pop()
+            self.slots[track_id] = slot
+            self.slot_tracks[slot] = track_id
+            self.first_seen[slot] = timestamp
+            self.detections[slot] = 0
+            self.max_speed[slot] = 0.0
+            self.speed_count[slot] = 0
+            self.class_votes[slot] = {}
+            self.violation_ids[slot] = None
+        self.last_seen[slot] = np.inf  # Set to the frame time once every detection has a slot
+        return slot
+
+    def observe(self, detections: List[Detection], speeds: Dict[int, float],
+                timestamp: float) -> List[Tuple[str, Detection, float]]:
+        """Record one frame of detections and their current speeds.
+
+        Returns (violation ID, detection, speed) for each vehicle that went
+        over its speed limit for the first time on this frame.
+        """
+        speeding = []
+        claimed = []
+        for det in detections:
+            slot = self._slot_for(det.track_id, timestamp)
+            if slot < 0:
+                continue  # More vehicles in this frame than the store holds
+            claimed.append(slot)
+            self.detections[slot] += 1
+            votes = self.class_votes[slot]
+            votes[det.class_name] = votes.get(det.class_name, 0) + 1
+            speed = speeds.get(det.track_id, 0.0)
+            if speed > 0:
+                self.speed_ring[slot, self.speed_count[slot] % self.samples] = speed
+                self.speed_count[slot] += 1
+                if speed > self.max_speed[slot]:
+                    self.max_speed[slot] = speed
+                if self.violation_ids[slot] is None and speed > get_speed_limit(det.class_name):
+                    self.violation_ids[slot] = f"{self.id_prefix}-{det.track_id}"
+                    speeding.append((self.violation_ids[slot], det, speed))
+        self.last_seen[claimed] = timestamp
+        return speeding
+
+    def expire(self, now: float) -> int:
+        """End tracks not seen for max_age seconds of stream time; returns how many"""
+        stale = np.flatnonzero(now - self.last_seen > self.max_age)
+        for slot in stale.tolist():
+            self._end(slot, 'expired')
+        return len(stale)
+
+    def flush(self) -> int:
+        """End every live track, e.g. at the end of the stream"""
+        slots = list(self.slots.values())
+        for slot in slots:
+            self._end(slot, 'flushed')
+        return len(slots)
+
+    def _summary(self, slot: int, reason: str) -> TrackSummary:
+        votes = self.class_votes[slot]
+        vehicle_type = max(votes, key=votes.get) if votes else ''
+        count = min(int(self.speed_count[slot]), self.samples)
+        median = float(np.median(self.speed_ring[slot, :count])) if count else 0.0
+        max_speed = float(self.max_speed[slot])
+        speed_limit = get_speed_limit(vehicle_type) if vehicle_type else 0.0
+        violation = bool(vehicle_type) and max_speed > speed_limit
+        violation_id = ''
+        if violation:
+            violation_id = self.violation_ids[slot] or f"{self.id_prefix}-{int(self.slot_tracks[slot])}"
+        return TrackSummary(
+            track_id=int(self.slot_tracks[slot]),
+            vehicle_type=vehicle_type,
+            entry_time=float(self.first_seen[slot]),
+            exit_time=float(self.last_seen[slot]),
+            detections=int(self.detections[slot]),
+            max_speed=round(max_speed, 1),
+            median_speed=round(median, 1),
+            speed_limit=speed_limit,
+            violation=violation,
+            reason=reason,
+            violation_id=violation_id
+        )
+
+    def _end(self, slot: int, reason: str):
+        summary = self._summary(slot, reason)
+        self.slots.pop(summary.track_id, None)
+        self.slot_tracks[slot] = -1
+        self.last_seen[slot] = np.inf
+        self.class_votes[slot] = {}
+        self.free_slots.append(slot)
+        self.ended += 1
+        for callback in self.on_evict:
+            callback(summary)
@@ -0,0 +1,215 @@
+"""Standalone IoU multi-object tracker over NumPy arrays"""
+from typing import List, Optional
+import numpy as np
+import config
+from detector import Detection, StreamTracker
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (n, 4) and (m, 4) x1, y1, x2, y2 boxes as an (n, m) array"""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    w = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    h = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _greedy(cost: np.ndarray, max_cost: float) -> np.ndarray:
+    rows, cols = np.nonzero(cost <= max_cost)
+    order = np.argsort(cost[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    matches = []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matches.append((r, c))
+    return np.array(matches, dtype=np.int64).reshape(-1, 2)
+
+
+def assign(cost: np.ndarray, max_cost: float, method: str = 'hungarian') -> np.ndarray:
+    """(k, 2) row, column pairs minimising total cost, each pair at most ``max_cost``.
+
+    'hungarian' solves the assignment optimally (scipy, falling back to
+    greedy without it); 'greedy' takes the cheapest remaining pair first.
+    """
+    if not cost.size:
+        return np.zeros((0, 2), dtype=np.int64)
+    if method == 'hungarian':
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:
+            return _greedy(cost, max_cost)
+        rows, cols = linear_sum_assignment(np.where(cost <= max_cost, cost, max_cost + 1.0))
+        keep = cost[rows, cols] <= max_cost
+        return np.column_stack([rows[keep], cols[keep]]).astype(np.int64)
+    return _greedy(cost, max_cost)
+
+
+class IoUTracker:
+    """ByteTrack-style tracker for one video stream.
+
+    Tracks live in parallel arrays and move at constant velocity between
+    detections, so positions can be predicted for any timestamp, including
+    frames the detector skipped. Each update matches confident boxes
+    against every track by IoU (weighted by score), then the remaining
+    low-score boxes against tracks seen on the previous update. A new track
+    needs ``min_hits`` matches before it gets an ID (immediately on the
+    stream's first frame) and ends ``lost_time`` seconds after its last
+    match. Accepts the same input as ``StreamTracker.update``.
+    """
+    def __init__(self, frame_rate: float = 30, high_threshold: float = None,
+                 low_threshold: float = None, new_track_threshold: float = None,
+                 match_iou: float = None, lost_time: float = None, min_hits: int = None,
+                 assignment: str = None, velocity_smoothing: float = None):
+        self.frame_rate = frame_rate or 30
+        self.high_threshold = config.TRACK_HIGH_THRESHOLD if high_threshold is None else high_threshold
+        self.low_threshold = config.TRACK_LOW_THRESHOLD if low_threshold is None else low_threshold
+        self.new_track_threshold = (config.TRACK_NEW_THRESHOLD if new_track_threshold is None
+                                    else new_track_threshold)
+        self.match_iou = config.TRACK_MATCH_IOU if match_iou is None else match_iou
+        self.lost_time = config.TRACK_LOST_TIME if lost_time is None else lost_time
+        self.min_hits = min_hits or config.TRACK_MIN_HITS
+        self.assignment = assignment or config.TRACK_ASSIGNMENT
+        self.velocity_smoothing = (config.TRACK_VELOCITY_SMOOTHING if velocity_smoothing is None
+                                   else velocity_smoothing)
+
+        self.ids = np.zeros(0, dtype=np.int64)  # -1 until confirmed
+        self.boxes = np.zeros((0, 4))  # Last matched box
+        self.velocity = np.zeros((0, 4))  # Pixels per second, per box edge
+        self.last_seen = np.zeros(0)
+        self.class_ids = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.next_id = 1
+        self.updates = 0
+        self.last_update = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predicted_boxes(self, timestamp: float) -> np.ndarray:
+        """(n, 4) boxes of all tracks moved to ``timestamp`` at constant velocity"""
+        return self.boxes + self.velocity * (timestamp - self.last_seen)[:, None]
+
+    def update(self, boxes, frame=None, timestamp: float = None) -> List[Detection]:
+        """Associate (n, 6) x1, y1, x2, y2, conf, class rows (or ``Boxes``) with tracks"""
+        data = np.asarray(getattr(boxes, 'data', boxes), dtype=np.float64).reshape(-1, 6)
+        self.updates += 1
+        if timestamp is None:
+            now = self.updates / float(self.frame_rate)
+        else:
+            now = float(timestamp)
+        previous = self.last_update
+        self.last_update = now
+
+        predicted = self.predicted_boxes(now)
+        matched_track = np.full(len(data), -1, dtype=np.int64)
+
+        # Stage 1: confident boxes against all tracks, IoU weighted by score
+        high = np.nonzero(data[:, 4] >= self.high_threshold)[0]
+        similarity = iou_matrix(data[high, :4], predicted) * data[high, 4:5]
+        pairs = assign(1.0 - similarity, 1.0 - self.match_iou, self.assignment)
+        matched_track[high[pairs[:, 0]]] = pairs[:, 1]
+
+        # Stage 2: low-score boxes keep tracks seen on the previous update alive
+        free = np.ones(len(self.ids), dtype=bool)
+        free[pairs[:, 1]] = False
+        recent = np.nonzero(free & (self.ids >= 0) & (self.last_seen == previous))[0]
+        low = np.nonzero((data[:, 4] >= self.low_threshold) & (data[:, 4] < self.high_threshold))[0]
+        if len(recent) and len(low):
+            pairs = assign(1.0 - iou_matrix(data[low, :4], predicted[recent]), 0.5, self.assignment)
+            matched_track[low[pairs[:, 0]]] = recent[pairs[:, 1]]
+
+        detected = np.nonzero(matched_track >= 0)[0]
+        tracks = matched_track[detected]
+        self._correct(tracks, data[detected], now)
+
+        # Tentative tracks must match on consecutive updates; others end after lost_time
+        seen = self.last_seen == now
+        alive = seen | ((self.ids >= 0) & (now - self.last_seen <= self.lost_time))
+        reported = tracks
+        if not alive.all():
+            reported = (np.cumsum(alive) - 1)[tracks]
+            self._keep(alive)
+
+        start = len(self.ids)
+        new = np.nonzero((matched_track < 0) & (data[:, 4] >= self.new_track_threshold))[0]
+        self._add(data[new], now)
+        reported = np.concatenate([reported, np.arange(start, start + len(new))])
+
+        confirmed = self.hits >= self.min_hits
+        if self.updates == 1:
+            confirmed[:] = True
+        unnamed = np.nonzero(confirmed & (self.ids < 0))[0]
+        self.ids[unnamed] = np.arange(self.next_id, self.next_id + len(unnamed))
+        self.next_id += len(unnamed)
+        return self._detections(reported[self.ids[reported] >= 0], self.boxes, timestamp)
+
+    def predict(self, timestamp: float) -> List[Detection]:
+        """Tracks matched on the last update, moved to ``timestamp``"""
+        if self.last_update is None:
+            return []
+        if timestamp is None:
+            timestamp = self.last_update
+        current = np.nonzero((self.ids >= 0) & (self.last_seen == self.last_update))[0]
+        return self._detections(current, self.predicted_boxes(timestamp), timestamp)
+
+    def _correct(self, tracks: np.ndarray, rows: np.ndarray, now: float):
+        dt = now - self.last_seen[tracks]
+        measured = (rows[:, :4] - self.boxes[tracks]) / np.maximum(dt, 1e-6)[:, None]
+        first = (self.hits[tracks] == 1)[:, None]
+        smoothed = self.velocity_smoothing * measured + (1 - self.velocity_smoothing) * self.velocity[tracks]
+        velocity = np.where(first, measured, smoothed)
+        self.velocity[tracks] = np.where((dt > 0)[:, None], velocity, self.velocity[tracks])
+        self.boxes[tracks] = rows[:, :4]
+        self.scores[tracks] = rows[:, 4]
+        self.class_ids[tracks] = rows[:, 5].astype(np.int64)
+        self.last_seen[tracks] = now
+        self.hits[tracks] += 1
+
+    def _keep(self, mask: np.ndarray):
+        self.ids = self.ids[mask]
+        self.boxes = self.boxes[mask]
+        self.velocity = self.velocity[mask]
+        self.last_seen = self.last_seen[mask]
+        self.class_ids = self.class_ids[mask]
+        self.scores = self.scores[mask]
+        self.hits = self.hits[mask]
+
+    def _add(self, rows: np.ndarray, now: float):
+        count = len(rows)
+        self.ids = np.concatenate([self.ids, np.full(count, -1, dtype=np.int64)])
+        self.boxes = np.concatenate([self.boxes, rows[:, :4]])
+        self.velocity = np.concatenate([self.velocity, np.zeros((count, 4))])
+        self.last_seen = np.concatenate([self.last_seen, np.full(count, now)])
+        self.class_ids = np.concatenate([self.class_ids, rows[:, 5].astype(np.int64)])
+        self.scores = np.concatenate([self.scores, rows[:, 4]])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+
+    def _detections(self, indices: np.ndarray, boxes: np.ndarray,
+                    timestamp: Optional[float]) -> List[Detection]:
+        detections = []
+        for i in indices.tolist():
+            class_id = int(self.class_ids[i])
+            if class_id not in config.VEHICLE_CLASSES:
+                continue
+            detections.append(Detection(
+                track_id=int(self.ids[i]),
+                class_name=config.VEHICLE_CLASSES[class_id],
+                bbox=tuple(float(v) for v in boxes[i]),
+                confidence=float(self.scores[i]),
+                timestamp=timestamp
+            ))
+        return detections
+
+
+def create_tracker(frame_rate: float = 30):
+    """Tracker for one stream, as chosen by DETECTION_TRACKER"""
+    if config.DETECTION_TRACKER == 'iou':
+        return IoUTracker(frame_rate=frame_rate)
+    return StreamTracker(frame_rate=frame_rate)
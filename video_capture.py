@@ -1,15 +1,222 @@
 """Threaded video capture module"""
 import cv2
-from threading import Thread
-from queue import Queue
+import logging
+import os
+import subprocess
+from collections import deque
+from threading import Thread, Condition, Event
+from queue import Queue, Empty
 import time
+import numpy as np
+import config
+from clock import clock_for_source, is_live_source
+
+logger = logging.getLogger(__name__)
+
+class FrameRingBuffer:
+    """Fixed set of reusable frame buffers shared by one producer and one consumer.
+
+    The producer fills a free slot in place and commits it; the consumer
+    holds one slot at a time, which returns to the free list on its next
+    read. With the 'drop_oldest' policy a producer that finds no free slot
+    reclaims the oldest unread frame, so the consumer always gets the
+    newest ones; with 'block' it waits for the consumer instead. 'latest'
+    drops like 'drop_oldest' and also skips the consumer to the newest
+    ready frame on every read, so no backlog builds up at all.
+    """
+    def __init__(self, slots: int = 3, policy: str = 'block', latency_window: int = 1000):
+        if slots < 2:
+            raise ValueError("A frame ring needs at least 2 slots")
+        if policy not in ('block', 'drop_oldest', 'latest'):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.policy = policy
+        self.buffers = [None] * slots  # Allocated by the first read into each slot
+        self.timestamps = [0.0] * slots
+        self.committed_at = [0.0] * slots
+        self.free = deque(range(slots))
+        self.ready = deque()
+        self.held = None
+        self.closed = False
+        self.cond = Condition()
+        self.dropped = 0
+        self.delivered = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    def acquire(self):
+        """Slot for the producer to fill, or None once closed"""
+        with self.cond:
+            while not self.free:
+                if self.closed:
+                    return None
+                if self.policy != 'block' and self.ready:
+                    self.dropped += 1
+                    return self.ready.popleft()
+                self.cond.wait()
+            return None if self.closed else self.free.popleft()
+
+    def commit(self, slot: int, timestamp: float):
+        with self.cond:
+            self.timestamps[slot] = timestamp
+            self.committed_at[slot] = time.perf_counter()
+            self.ready.append(slot)
+            self.cond.notify_all()
+
+    def abort(self, slot: int):
+        with self.cond:
+            self.free.appendleft(slot)
+            self.cond.notify_all()
+
+    def read(self):
+        """Next frame slot for the consumer, or None once closed and drained"""
+        with self.cond:
+            if self.held is not None:
+                self.free.append(self.held)
+                self.held = None
+                self.cond.notify_all()
+            while not self.ready:
+                if self.closed:
+                    return None
+                self.cond.wait()
+            if self.policy == 'latest':
+                while len(self.ready) > 1:
+                    self.free.append(self.ready.popleft())
+                    self.dropped += 1
+                self.cond.notify_all()
+            slot = self.ready.popleft()
+            self.held = slot
+            self.delivered += 1
+            self.latencies.append(time.perf_counter() - self.committed_at[slot])
+            return slot
+
+    def pending(self) -> int:
+        return len(self.ready)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class FFmpegReader:
+    """Raw BGR frames piped from an ffmpeg process, optionally scaled by ffmpeg.
+
+    Mirrors the parts of cv2.VideoCapture that ThreadedVideoCapture uses;
+    ``read(image=buffer)`` fills the buffer in place. With ``read_timeout``
+    a watchdog kills ffmpeg when a frame takes longer than that (the first
+    one, ``open_timeout``), so a stalled stream ends the read instead of
+    blocking it forever.
+    """
+    def __init__(self, source, size: tuple, scale_to: tuple = None, threads: int = None,
+                 binary: str = None, input_options: list = None, read_timeout: float = None,
+                 open_timeout: float = None):
+        self.size = scale_to or size
+        width, height = self.size
+        self.frame_bytes = width * height * 3
+        command = [binary or config.FFMPEG_BINARY, '-nostdin', '-loglevel', 'error',
+                   '-threads', str(config.FFMPEG_THREADS if threads is None else threads)]
+        command += list(input_options or []) + ['-i', str(source), '-an', '-sn']
+        if scale_to:
+            command += ['-vf', f'scale={width}:{height}:flags=bilinear']
+        command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        self.proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                     bufsize=self.frame_bytes)
+        self.read_timeout = read_timeout
+        self.open_timeout = open_timeout or read_timeout
+        self.deadline = None  # Monotonic time the frame being read is due by
+        self.frames = 0
+        self.timed_out = False
+        self.closed = Event()
+        if read_timeout:
+            Thread(target=self._watchdog, daemon=True).start()
+
+    def _watchdog(self):
+        """Kill ffmpeg once a frame is overdue; the blocked read then sees end of stream"""
+        while not self.closed.wait(min(self.read_timeout / 4, 0.25)):
+            deadline = self.deadline
+            if deadline is not None and time.monotonic() > deadline and self.proc.poll() is None:
+                limit = self.read_timeout if self.frames else self.open_timeout
+                logger.warning(f"No frame from ffmpeg in {limit:g}s; stopping it")
+                self.timed_out = True
+                self.proc.kill()
+
+    def read(self, image=None):
+        width, height = self.size
+        if image is None or image.shape != (height, width, 3):
+            image = np.empty((height, width, 3), dtype=np.uint8)
+        view = memoryview(image.reshape(-1))
+        filled = 0
+        if self.read_timeout:
+            self.deadline = time.monotonic() + (self.read_timeout if self.frames else self.open_timeout)
+        try:
+            while filled < self.frame_bytes:
+                count = self.proc.stdout.readinto(view[filled:])
+                if not count:
+                    return False, None
+                filled += count
+        finally:
+            self.deadline = None
+        self.frames += 1
+        return True, image
+
+    def isOpened(self) -> bool:
+        return not self.proc.stdout.closed
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def release(self):
+        self.closed.set()
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+
 
 class ThreadedVideoCapture:
-    def __init__(self, source, queue_size=3):
+    """Decodes frames on a background thread.
+
+    With ``inference_width`` set (INFERENCE_WIDTH) every frame is also
+    resized once, at decode time, to that width for the detector; see
+    ``inference_frame``. With ``keep_full=False`` only the reduced frame
+    is kept, and the 'ffmpeg' decoder then scales while decoding.
+    ``frame_width``/``frame_height`` always describe the source.
+
+    Network streams (rtsp://, http://, ...) are opened with connect and
+    read timeouts and reopened with exponential backoff when they fail,
+    for up to CAPTURE_RECONNECT_GIVE_UP seconds; by default they use the
+    'latest' drop policy, so reads always return the freshest frame.
+    """
+    def __init__(self, source, queue_size=3, buffer_mode=None, drop_policy=None,
+                 inference_width: int = None, decoder: str = None, keep_full: bool = True):
         self.source = source
+        self.network = is_live_source(source) and not isinstance(source, int)
+        self.buffer_mode = buffer_mode or config.CAPTURE_BUFFER_MODE
+        # Live sources want the newest frame; files must not lose any
+        self.drop_policy = drop_policy or config.CAPTURE_DROP_POLICY
+        if not self.drop_policy:
+            self.drop_policy = 'latest' if self.network else 'drop_oldest' if is_live_source(source) else 'block'
+        # Frames that can wait unread. The consumer always holds one ring
+        # slot, and a dropping producer is nearly always refilling another
+        self.capacity = queue_size
+        if self.buffer_mode == 'ring':
+            self.capacity = queue_size - 1 if self.drop_policy == 'block' else max(1, queue_size - 2)
         self.queue = Queue(maxsize=queue_size)
+        self.ring = FrameRingBuffer(queue_size, self.drop_policy) if self.buffer_mode == 'ring' else None
         self.stopped = False
+        self.released = Event()  # Interrupts a reconnect backoff
+        self.dropped = 0  # Queue mode; the ring counts its own
+        self.reconnects = 0
         self.cap = None
+        self.frame_index = 0
+        self.last_timestamp = None
+        self.latencies = deque(maxlen=1000)
+        self.inference_width = inference_width or config.INFERENCE_WIDTH
+        self.decoder = decoder or config.CAPTURE_DECODER
+        self.keep_full = keep_full
+        self.inference_size = None  # (width, height) when frames are reduced for the detector
+        self.decoder_scales = False
+        self.scratch = None  # Full-size decode buffer when full frames aren't kept
+        self.inference_buffers = [None] * queue_size
+        self.last_inference = None
         self.initialize_capture()
         
     def initialize_capture(self):
@@ -22,6 +229,8 @@ class ThreadedVideoCapture:
                 if self.cap.isOpened():
                     break
                 self.cap.release()
+        elif self.network:
+            self.cap = self._connect()
         else:  # Video file
             self.cap = cv2.VideoCapture(self.source)
             
@@ -36,38 +245,251 @@ class ThreadedVideoCapture:
             
         self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if self.inference_width and self.inference_width < self.frame_width:
+            # Even height keeps ffmpeg's scaler and YUV formats happy
+            height = int(round(self.frame_height * self.inference_width / self.frame_width / 2.0)) * 2
+            self.inference_size = (self.inference_width, max(2, height))
+        
+        if self.decoder == 'ffmpeg':
+            if isinstance(self.source, int):
+                logger.warning("The ffmpeg decoder reads files and streams only; using OpenCV")
+                self.decoder = 'opencv'
+            else:
+                # OpenCV only probed the size and frame rate
+                self.cap.release()
+                self.decoder_scales = self.inference_size is not None and not self.keep_full
+                self.cap = self._ffmpeg_reader()
+        
+        # Files are stamped with their PTS, live sources with capture time
+        self.clock = clock_for_source(self.source, self.fps)
         
         # Set buffer size
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 3)
         
         # Start capture thread
-        self.thread = Thread(target=self._capture, daemon=True)
+        target = self._capture_ring if self.ring is not None else self._capture
+        self.thread = Thread(target=target, daemon=True)
         self.thread.start()
     
+    def _ffmpeg_reader(self):
+        options = []
+        if self.network and config.CAPTURE_FFMPEG_OPTIONS:
+            for option in config.CAPTURE_FFMPEG_OPTIONS.split('|'):
+                name, value = option.split(';', 1)
+                # Private to the RTSP demuxer; other inputs reject them
+                if name.startswith('rtsp_') and not str(self.source).lower().startswith('rtsp'):
+                    continue
+                options += [f'-{name}', value]
+        if self.network and '-rw_timeout' not in options:
+            # Lets ffmpeg itself give up on a silent connection (microseconds)
+            options += ['-rw_timeout', str(int(config.CAPTURE_READ_TIMEOUT * 1e6))]
+        return FFmpegReader(
+            self.source, (self.frame_width, self.frame_height),
+            scale_to=self.inference_size if self.decoder_scales else None,
+            input_options=options,
+            read_timeout=config.CAPTURE_READ_TIMEOUT if self.network else None,
+            open_timeout=config.CAPTURE_OPEN_TIMEOUT
+        )
+    
+    def _open_stream(self):
+        """OpenCV capture of the network stream, or None if it can't be opened in time"""
+        if config.CAPTURE_FFMPEG_OPTIONS:
+            # Read by OpenCV's FFmpeg backend on open; a value set by the user wins
+            os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', config.CAPTURE_FFMPEG_OPTIONS)
+        params = [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(config.CAPTURE_OPEN_TIMEOUT * 1000),
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(config.CAPTURE_READ_TIMEOUT * 1000),
+        ]
+        cap = cv2.VideoCapture(str(self.source), cv2.CAP_FFMPEG, params)
+        if cap.isOpened():
+            return cap
+        cap.release()
+        return None
+    
+    def _connect(self):
+        """Open the network stream, retrying with backoff; None once released or given up"""
+        started = time.monotonic()
+        delay = config.CAPTURE_RECONNECT_INITIAL
+        while not self.stopped:
+            cap = self._open_stream()
+            if cap is not None:
+                return cap
+            give_up = config.CAPTURE_RECONNECT_GIVE_UP
+            if give_up is not None and time.monotonic() - started + delay > give_up:
+                logger.error(f"Giving up on {self.source} after {time.monotonic() - started:.1f}s")
+                return None
+            logger.warning(f"Cannot open {self.source}; retrying in {delay:.1f}s")
+            if self.released.wait(delay):
+                return None
+            delay = min(delay * 2, config.CAPTURE_RECONNECT_MAX)
+        return None
+    
+    def _reconnect(self) -> bool:
+        """Reopen a failed network stream; False for files and webcams, or if it stays down"""
+        if not self.network or self.stopped:
+            return False
+        logger.warning(f"Lost video source {self.source}; reconnecting")
+        lost = time.monotonic()
+        self.cap.release()
+        cap = self._connect()
+        if cap is None:
+            return False
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if (width, height) != (self.frame_width, self.frame_height):
+            logger.warning(f"{self.source} came back at {width}x{height}, not "
+                           f"{self.frame_width}x{self.frame_height}; calibration and ROI assume the latter")
+        if isinstance(self.cap, FFmpegReader):
+            cap.release()
+            cap = self._ffmpeg_reader()
+        self.cap = cap
+        self.reconnects += 1
+        logger.info(f"Reconnected to {self.source} after {time.monotonic() - lost:.1f}s")
+        return True
+    
     def _capture(self):
         while not self.stopped:
-            if not self.queue.full():
-                ret, frame = self.cap.read()
-                if not ret:
-                    self.stopped = True
-                    break
-                    
-                if not self.queue.full():
-                    self.queue.put(frame)
-            else:
+            if self.queue.full() and self.drop_policy == 'block':
                 time.sleep(0.001)
+                continue
+            ret, frame, inference = self._next_frame()
+            if not ret:
+                if self._reconnect():
+                    continue
+                self.stopped = True
+                break
+            timestamp = self._stamp()
+                
+            if self.queue.full():
+                # Make room by dropping the oldest frame
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+            self.queue.put((frame, inference, timestamp, time.perf_counter()))
+
+    def _capture_ring(self):
+        while not self.stopped:
+            slot = self.ring.acquire()
+            if slot is None:
+                break
+            # Decode straight into the slot's buffers; they are replaced on
+            # the first fill or if the stream changes resolution
+            ret, frame, inference = self._next_frame(self.ring.buffers[slot], self.inference_buffers[slot])
+            if not ret:
+                self.ring.abort(slot)
+                if self._reconnect():
+                    continue
+                self.stopped = True
+                break
+            self.ring.buffers[slot] = frame
+            self.inference_buffers[slot] = inference
+            timestamp = self._stamp()
+            self.ring.commit(slot, timestamp)
+        self.ring.close()
     
+    def _read_into(self, image):
+        if image is None:
+            return self.cap.read()
+        return self.cap.read(image=image)
+
+    def _next_frame(self, frame_buffer=None, inference_buffer=None):
+        """Decode one frame: (ret, frame, separate inference-size copy or None)"""
+        size = self.inference_size
+        if size is None or self.decoder_scales:
+            ret, frame = self._read_into(frame_buffer)
+            return ret, frame, None
+        if not self.keep_full:
+            ret, self.scratch = self._read_into(self.scratch)
+            if not ret:
+                return False, None, None
+            return True, cv2.resize(self.scratch, size, frame_buffer, interpolation=cv2.INTER_LINEAR), None
+        ret, frame = self._read_into(frame_buffer)
+        if not ret:
+            return False, None, None
+        return True, frame, cv2.resize(frame, size, inference_buffer, interpolation=cv2.INTER_LINEAR)
+
+    def _stamp(self) -> float:
+        if isinstance(self.cap, FFmpegReader):
+            timestamp = self.clock.stamp_index(self.frame_index)
+        else:
+            timestamp = self.clock.stamp(self.cap, self.frame_index)
+        self.frame_index += 1
+        return timestamp
+
     def read(self):
-        if self.stopped and self.queue.empty():
-            return False, None
-        return True, self.queue.get()
+        ret, frame, _ = self.read_timestamped()
+        return ret, frame
+    
+    def read_timestamped(self):
+        """Return (ret, frame, capture timestamp in seconds).
+
+        In ring mode the frame is a view of a shared buffer that stays valid
+        until the next call; copy it if it must outlive that.
+        """
+        if self.ring is not None:
+            slot = self.ring.read()
+            if slot is None:
+                return False, None, None
+            self.last_timestamp = self.ring.timestamps[slot]
+            frame = self.ring.buffers[slot]
+            inference = self.inference_buffers[slot]
+            self.last_inference = frame if inference is None else inference
+            return True, frame, self.last_timestamp
+
+        while True:
+            if self.stopped and self.queue.empty():
+                return False, None, None
+            try:
+                # Wake up periodically so end of stream can't leave us blocked
+                frame, inference, timestamp, queued_at = self.queue.get(timeout=0.1)
+                while self.drop_policy == 'latest' and not self.queue.empty():
+                    frame, inference, timestamp, queued_at = self.queue.get_nowait()
+                    self.dropped += 1
+                self.latencies.append(time.perf_counter() - queued_at)
+                self.last_timestamp = timestamp
+                self.last_inference = frame if inference is None else inference
+                return True, frame, timestamp
+            except Empty:
+                continue
+
+    def inference_frame(self):
+        """Detector input for the frame last read: the reduced copy, or the frame itself.
+
+        Pass ``frame_size`` to VehicleDetector.detect when ``inference_size``
+        is set so boxes come back in source coordinates.
+        """
+        return self.last_inference
+
+    def backlog(self) -> int:
+        """Frames captured but not yet read"""
+        return self.ring.pending() if self.ring is not None else self.queue.qsize()
+
+    def stats(self) -> dict:
+        """Dropped frames, reconnects and capture-to-consume latency"""
+        latencies = self.ring.latencies if self.ring is not None else self.latencies
+        latencies = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+        return {
+            'captured_frames': self.frame_index,
+            'dropped_frames': self.ring.dropped if self.ring is not None else self.dropped,
+            'reconnects': self.reconnects,
+            'latency_ms_p50': float(np.percentile(latencies, 50)),
+            'latency_ms_p95': float(np.percentile(latencies, 95)),
+        }
     
     def is_opened(self):
         return self.cap is not None and self.cap.isOpened()
     
     def release(self):
         self.stopped = True
+        self.released.set()
+        if self.ring is not None:
+            # Wake a producer blocked waiting for a free slot
+            self.ring.close()
+        if isinstance(self.cap, FFmpegReader):
+            # Ends a read blocked on the pipe
+            self.cap.release()
         if self.thread.is_alive():
             self.thread.join()
         if self.cap:
-            self.cap.release()
\ No newline at end of file
+            self.cap.release()
@@ -1,48 +1,181 @@
 """Main video processing module"""
 import cv2
+import os
 import time
 import logging
 import numpy as np
 from detector import VehicleDetector
-from speed_tracker import SpeedTracker
+from speed_tracker import SpeedTracker, BatchSpeedTracker
+from calibration import get_calibration
+from frame_scheduler import AdaptiveFrameScheduler, propagate_detections
+from motion_gate import MotionGate
+from roi import RegionOfInterest
+import config
 from visualizer import Visualizer
 from video_capture import ThreadedVideoCapture
-from data_logger import SpeedLogger
+from data_logger import SpeedLogger, get_speed_limit
+from evidence import EvidenceRecorder
+from track_store import TrackStore
+from metrics import Metrics, FrameProfiler, start_exporters
+from restream import start_restream
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class VideoProcessor:
-    def __init__(self, source):
+    def __init__(self, source, display: bool = True, detector=None, output_dir: str = None,
+                 on_frame=None):
+        """``display=False`` runs headless (nothing shown; frames are drawn only
+        for RESTREAM); ``detector`` replaces the VehicleDetector; ``output_dir``
+        holds this source's logs, evidence and HLS output instead of the paths
+        in config; ``on_frame(frame_number, timestamp)`` is called after every
+        processed frame, e.g. as a heartbeat."""
         try:
-            self.video = ThreadedVideoCapture(source)
+            # Full frames are kept for display; the detector may get a reduced copy
+            self.video = ThreadedVideoCapture(source, keep_full=True)
+            self.frame_size = (self.video.frame_width, self.video.frame_height)
             logger.info(f"Successfully opened video source: {source}")
             logger.info(f"Resolution: {self.video.frame_width}x{self.video.frame_height}")
+            if self.video.inference_size:
+                logger.info(f"Detector input: {self.video.inference_size[0]}x{self.video.inference_size[1]}")
             logger.info(f"FPS: {self.video.fps}")
             
             # Initialize components
-            self.detector = VehicleDetector()
-            self.speed_tracker = SpeedTracker()
+            self.detector = detector or VehicleDetector()
+            # Positions are stamped with capture time, so speeds don't depend
+            # on how fast this loop runs
+            calibration = get_calibration(self.video.frame_height, config.__dict__,
+                                          self.video.frame_width)
+            if config.TRACKER_MODE == 'batch':
+                self.speed_tracker = BatchSpeedTracker(clock=self.video.clock, calibration=calibration)
+            else:
+                self.speed_tracker = SpeedTracker(clock=self.video.clock, calibration=calibration)
             self.visualizer = Visualizer()
-            self.logger = SpeedLogger()
+            self.logger = SpeedLogger(**self._output_files(output_dir))
+            # Snapshot and clip per violation, encoded off this loop
+            self.evidence = None
+            if config.EVIDENCE_ENABLED:
+                self.evidence = EvidenceRecorder(
+                    directory=os.path.join(output_dir, 'evidence') if output_dir else None)
+            # Every vehicle and sampled speeds, for analytics (pyarrow imported only if on)
+            self.telemetry = None
+            if config.TELEMETRY_ENABLED:
+                from telemetry import TelemetryWriter, source_name
+                self.telemetry = TelemetryWriter(camera=config.TELEMETRY_CAMERA or source_name(source))
+            # Ends idle tracks by video time and frees their tracker state
+            self.track_store = TrackStore(on_evict=[self._end_track])
             
-            # Performance optimization
-            self.process_every_n_frames = 2
+            # Performance optimization: detect every nth frame, with n adapted
+            # to detector latency and capture backlog
+            self.scheduler = AdaptiveFrameScheduler(source_fps=self.video.fps)
             self.frame_counter = 0
             self.last_detections = []
+            # Skips the detector on frames with no change in the road region
+            self.motion_gate = None
+            if config.MOTION_GATE_ENABLED:
+                width, height = self.video.inference_size or self.frame_size
+                scale = (width / float(self.video.frame_width), height / float(self.video.frame_height))
+                self.motion_gate = MotionGate(width, height,
+                                              roi=RegionOfInterest.from_config(width, height, scale))
+            
+            # Instrumentation; near free unless METRICS_ENABLED
+            self.metrics = Metrics()
+            self.exporters = start_exporters(self.metrics)
+            self.show_metrics = self.metrics.enabled and config.METRICS_OVERLAY
+            self.profiler = FrameProfiler()
+            self.profiler.install_signal_handler()
+            
+            # Annotated frames served over HTTP or written as HLS, off this loop
+            self.restream = start_restream(
+                self.video.fps, directory=os.path.join(output_dir, 'hls') if output_dir else None)
+            
+            self.display = display
+            self.draw = display or self.restream is not None
+            self.on_frame = on_frame
+            self.stopped = False
             
         except Exception as e:
             logger.error(f"Failed to initialize video processor: {str(e)}")
             raise
         
+    @staticmethod
+    def _output_files(output_dir):
+        """SpeedLogger paths: config's file names, inside ``output_dir`` if given"""
+        if not output_dir:
+            return {}
+        os.makedirs(output_dir, exist_ok=True)
+        files = {
+            'log_file': os.path.join(output_dir, os.path.basename(config.VIOLATION_LOG_FILE)),
+            'export_file': os.path.join(output_dir, os.path.basename(config.VIOLATION_EXPORT_FILE)),
+        }
+        if config.VEHICLE_SUMMARY_FILE:
+            files['summary_file'] = os.path.join(output_dir, os.path.basename(config.VEHICLE_SUMMARY_FILE))
+        return files
+        
+    def _update_speeds(self, detections):
+        """Feed one frame of detections to the tracker, return track_id -> speed"""
+        if isinstance(self.speed_tracker, BatchSpeedTracker):
+            return self.speed_tracker.update_frame(detections, self.video.frame_height)
+        return {
+            det.track_id: self.speed_tracker.update(det, self.video.frame_height)
+            for det in detections
+        }
+        
+    def _detect(self, timestamp):
+        """Detect on the capture's inference frame; boxes in source coordinates"""
+        if self.video.inference_size:
+            return self.detector.detect(self.video.inference_frame(), timestamp, frame_size=self.frame_size)
+        return self.detector.detect(self.video.inference_frame(), timestamp)
+        
+    def _end_track(self, summary):
+        self.speed_tracker.remove(summary.track_id)
+        self.logger.log_vehicle(summary)
+        if self.telemetry is not None:
+            self.telemetry.log_vehicle(summary)
+        
+    def stop(self):
+        """End process_video after the current frame; safe from other threads and signal handlers"""
+        self.stopped = True
+        
+    def _export_gauges(self):
+        """Copy scheduler, capture and logger state into the metrics gauges"""
+        for name, value in self.scheduler.metrics().items():
+            self.metrics.set_gauge(name, value)
+        # Custom detectors need not have a level policy
+        policy = getattr(self.detector, 'policy', None)
+        if policy is not None:
+            for name, value in policy.metrics().items():
+                self.metrics.set_gauge(name, value)
+        if self.motion_gate is not None:
+            for name, value in self.motion_gate.metrics().items():
+                self.metrics.set_gauge(name, value)
+        if self.evidence is not None:
+            for name, value in self.evidence.metrics().items():
+                self.metrics.set_gauge(name, value)
+        if self.telemetry is not None:
+            for name, value in self.telemetry.metrics().items():
+                self.metrics.set_gauge(name, value)
+        if self.restream is not None:
+            for name, value in self.restream.metrics().items():
+                self.metrics.set_gauge(name, value)
+        capture = self.video.stats()
+        self.metrics.set_gauge('captured_frames', capture['captured_frames'])
+        self.metrics.set_gauge('dropped_frames', capture['dropped_frames'])
+        self.metrics.set_gauge('capture_reconnects', capture['reconnects'])
+        self.metrics.set_gauge('violations_dropped', self.logger.writer.dropped)
+        
     def process_video(self):
         try:
             frame_count = 0
             start_time = time.time()
             fps_update_interval = 30
+            metrics = self.metrics
+            overlay = []
+            display = None
             
-            while True:
-                ret, frame = self.video.read()
+            while not self.stopped:
+                with metrics.stage('read'):
+                    ret, frame, timestamp = self.video.read_timestamped()
                 if not ret or frame is None:
                     break
                     
@@ -50,22 +183,59 @@ class VideoProcessor:
                     continue
                 
                 self.frame_counter += 1
+                frame_start = time.perf_counter()
+                
+                # Before anything is drawn on the frame
+                if self.evidence is not None:
+                    with metrics.stage('evidence'):
+                        self.evidence.add_frame(frame, timestamp)
                 
                 # Process only every nth frame for detection
-                if self.frame_counter % self.process_every_n_frames == 0:
-                    self.last_detections = self.detector.detect(frame)
+                detected = self.scheduler.should_detect()
+                if detected and self.motion_gate is not None:
+                    with metrics.stage('gate'):
+                        detected = self.motion_gate.should_detect(self.video.inference_frame(), timestamp)
+                if detected:
+                    with metrics.stage('detect'):
+                        self.last_detections = self._detect(timestamp)
+                    # A blocking capture (files) is always full because decoding
+                    # runs ahead; only one that drops frames can fall behind
+                    self.scheduler.record_detection(
+                        time.perf_counter() - frame_start,
+                        self.video.backlog() if self.video.drop_policy != 'block' else 0,
+                        self.video.capacity
+                    )
+                    
+                    with metrics.stage('track'):
+                        speeds = self._update_speeds(self.last_detections)
+                    
+                    # Update track lifecycles; finished vehicles are logged once
+                    with metrics.stage('log'):
+                        speeding = self.track_store.observe(self.last_detections, speeds, timestamp)
+                        self.track_store.expire(timestamp)
+                        if self.telemetry is not None:
+                            self.telemetry.observe(self.last_detections, speeds, timestamp)
+                        if self.evidence is not None:
+                            for violation_id, det, speed in speeding:
+                                self.evidence.trigger(violation_id, det, speed,
+                                                      get_speed_limit(det.class_name), frame, timestamp)
                     
-                    # Process each detection
-                    for det in self.last_detections:
-                        speed = self.speed_tracker.update(det, self.video.frame_height)
-                        self.visualizer.draw(frame, det, speed)
-                        # Log speed violation
-                        self.logger.log_violation(det.class_name, speed)
-                else:
-                    # Use last detections for intermediate frames
-                    for det in self.last_detections:
-                        speed = self.speed_tracker.get_last_speed(det.track_id)
-                        self.visualizer.draw(frame, det, speed)
+                    # Draw on the (possibly reduced) display frame
+                    if self.draw:
+                        with metrics.stage('draw'):
+                            display, scale = self.visualizer.preview(frame)
+                            self.visualizer.draw_all(display, self.last_detections, speeds, scale)
+                    metrics.record('detections_per_frame', len(self.last_detections))
+                elif self.draw:
+                    # Move last detections along their tracks for intermediate frames
+                    with metrics.stage('draw'):
+                        moved = self.detector.predict(timestamp)
+                        if moved is None:
+                            moved = propagate_detections(self.last_detections, self.speed_tracker, timestamp)
+                        speeds = {det.track_id: self.speed_tracker.get_last_speed(det.track_id)
+                                  for det in moved}
+                        display, scale = self.visualizer.preview(frame)
+                        self.visualizer.draw_all(display, moved, speeds, scale)
                 
                 # Update FPS counter
                 frame_count += 1
@@ -73,20 +243,70 @@ class VideoProcessor:
                     current_time = time.time()
                     fps = fps_update_interval / (current_time - start_time)
                     start_time = current_time
-                    self.visualizer.draw_fps(frame, fps)
+                    if self.draw:
+                        self.visualizer.draw_fps(display, fps)
+                    metrics.set_gauge('fps', fps)
+                    if metrics.enabled:
+                        self._export_gauges()
+                    if self.show_metrics:
+                        overlay = metrics.overlay_lines()
+                
+                if self.draw and overlay:
+                    self.visualizer.draw_metrics(display, overlay)
+                if self.restream is not None:
+                    with metrics.stage('restream'):
+                        self.restream.publish(display, timestamp)
                 
                 # Display frame
-                cv2.imshow('Vehicle Speed Detection', frame)
+                if self.display:
+                    with metrics.stage('display'):
+                        cv2.imshow('Vehicle Speed Detection', display)
+                        key = cv2.waitKey(1) & 0xFF
+                    
+                    if key == ord('q'):
+                        break
+                    if key == ord('p'):
+                        self.profiler.request()
                 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                if not detected:
+                    self.scheduler.record_skipped_frame(time.perf_counter() - frame_start)
+                
+                if metrics.enabled:
+                    metrics.observe_stage('frame', time.perf_counter() - frame_start)
+                    metrics.inc('frames')
+                    metrics.set_gauge('capture_backlog', self.video.backlog())
+                    metrics.set_gauge('active_tracks', self.speed_tracker.track_count())
+                    metrics.set_gauge('live_vehicles', len(self.track_store))
+                self.profiler.frame_done()
+                if self.on_frame is not None:
+                    self.on_frame(self.frame_counter, timestamp)
                     
         except Exception as e:
             logger.error(f"Error processing video: {str(e)}")
             raise
             
         finally:
+            logger.info(f"Detection scheduling: {self.scheduler.metrics()}")
+            if getattr(self.detector, 'policy', None) is not None:
+                logger.info(f"Detector levels: {self.detector.policy.metrics()}")
+            if self.motion_gate is not None:
+                logger.info(f"Motion gate: {self.motion_gate.metrics()}")
+            self.track_store.flush()
+            if self.telemetry is not None:
+                self.telemetry.close()
+            if self.evidence is not None:
+                self.evidence.close()
+                logger.info(f"Evidence: {self.evidence.metrics()}")
+            if self.metrics.enabled:
+                self._export_gauges()
+            self.profiler.close()
+            if self.restream is not None:
+                self.restream.close()
+                logger.info(f"Restream: {self.restream.metrics()}")
+            for exporter in self.exporters:
+                exporter.close()
             # Save violations before closing
             self.logger.save()
             self.video.release()
-            cv2.destroyAllWindows()
+            if self.display:
+                cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""Append-only violation sinks and a background batching writer"""
+import csv
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Column order shared by every sink and by the Excel export
+VIOLATION_FIELDS = ["timestamp", "vehicle_type", "speed", "speed_limit", "excess", "violation_id"]
+
+
+class ViolationSink:
+    """Base class for append-only violation storage"""
+
+    def write_batch(self, records: List[Dict]):
+        raise NotImplementedError
+
+    def read_all(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvViolationSink(ViolationSink):
+    def __init__(self, path: str):
+        self.path = path
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        fieldnames = VIOLATION_FIELDS
+        if not write_header:
+            # Keep appending in the columns the file already has
+            with open(path, newline='') as f:
+                fieldnames = next(csv.reader(f), None) or VIOLATION_FIELDS
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def write_batch(self, records: List[Dict]):
+        self._writer.writerows(records)
+        self._file.flush()
+
+    def read_all(self) -> List[Dict]:
+        with open(self.path, newline='') as f:
+            return [
+                {**row, 'speed': float(row['speed']), 'speed_limit': float(row['speed_limit']),
+                 'excess': float(row['excess'])}
+                for row in csv.DictReader(f)
+            ]
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlViolationSink(ViolationSink):
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a')
+
+    def write_batch(self, records: List[Dict]):
+        self._file.write(''.join(json.dumps(r) + '\n' for r in records))
+        self._file.flush()
+
+    def read_all(self) -> List[Dict]:
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def close(self):
+        self._file.close()
+
+
+class SqliteViolationSink(ViolationSink):
+    def __init__(self, path: str):
+        self.path = path
+        # Created on the caller's thread but used by the writer thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS violations ("
+            "timestamp TEXT, vehicle_type TEXT, speed REAL, speed_limit REAL, excess REAL, "
+            "violation_id TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(violations)")}
+        if 'violation_id' not in columns:  # Logs from before violation IDs
+            self._conn.execute("ALTER TABLE violations ADD COLUMN violation_id TEXT")
+        self._conn.commit()
+
+    def write_batch(self, records: List[Dict]):
+        rows = [tuple(r.get(k) for k in VIOLATION_FIELDS) for r in records]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO violations ({', '.join(VIOLATION_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(VIOLATION_FIELDS))})",
+                rows
+            )
+            self._conn.commit()
+
+    def read_all(self) -> List[Dict]:
+        # A separate connection keeps exports working after the writer closes
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(VIOLATION_FIELDS)} FROM violations ORDER BY rowid"
+            )
+            return [dict(zip(VIOLATION_FIELDS, row)) for row in cursor]
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+SINKS = {
+    'csv': CsvViolationSink,
+    'jsonl': JsonlViolationSink,
+    'sqlite': SqliteViolationSink,
+}
+
+
+def create_sink(kind: str, path: str) -> ViolationSink:
+    """Create a violation sink by name ('csv', 'jsonl' or 'sqlite')"""
+    if kind not in SINKS:
+        raise ValueError(f"Unknown violation sink: {kind}")
+    return SINKS[kind](path)
+
+
+class BufferedSinkWriter:
+    """Writes records to a sink from a background thread in batches.
+
+    A batch is flushed once it holds ``flush_count`` records or its oldest
+    record has waited ``flush_interval`` seconds, whichever comes first.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink: ViolationSink, queue_size: int = 1024,
+                 flush_count: int = 50, flush_interval: float = 1.0,
+                 enqueue_timeout: float = 0.5):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.written = 0
+        self.dropped = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, record: Dict) -> bool:
+        """Queue a record without touching the disk. Returns False if dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put(record, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.error("Violation queue full, record dropped")
+            return False
+
+    def flush(self, timeout: float = None):
+        """Block until everything submitted so far has been written"""
+        if self.closed or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush pending records, stop the writer thread and close the sink"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join()
+        self.sink.close()
+
+    def _write(self, batch: List[Dict]):
+        if not batch:
+            return
+        try:
+            self.sink.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"Error writing violations: {str(e)}")
+        batch.clear()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                deadline = None
+                continue
+
+            if item is self._STOP:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                deadline = None
+                item.set()
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.flush_count:
+                self._write(batch)
+                deadline = None
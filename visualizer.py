@@ -3,8 +3,11 @@ import cv2
 import numpy as np
 import config
 
+SPRITE_CACHE_SIZE = 2048  # Label bitmaps kept (about 9 KB each); oldest go first
+
 class Visualizer:
-    def __init__(self):
+    """Draws boxes and labels; labels are rendered once and pasted as bitmaps"""
+    def __init__(self, preview_width: int = None):
         self.colors = {
             'Car': (0, 255, 0),      # Green
             'Bus': (255, 165, 0),    # Orange
@@ -17,11 +20,24 @@ class Visualizer:
             'bus': 80,
             'truck': 100
         }
+        self.text_scale = 0.7
+        self.thickness = 2
+        self.padding = 5
+        self.preview_width = preview_width or config.PREVIEW_WIDTH
+        self._limits = {}
+        self._sprites = {}
+        
+    def speed_limit(self, vehicle_type: str) -> float:
+        """Colouring limit for a vehicle type, looked up once per type"""
+        limit = self._limits.get(vehicle_type)
+        if limit is None:
+            key = vehicle_type.lower()
+            default = self.default_limits.get(key, 100)
+            limit = self._limits[vehicle_type] = config.VEHICLE_SPEED_LIMITS.get(key, default)
+        return limit
         
     def get_speed_color(self, speed: float, vehicle_type: str):
-        vehicle_type = vehicle_type.lower()
-        default = self.default_limits.get(vehicle_type, 100)
-        speed_limit = config.VEHICLE_SPEED_LIMITS.get(vehicle_type, default)
+        speed_limit = self.speed_limit(vehicle_type)
         
         if speed < speed_limit * 0.8:  # Under 80% of limit
             return (0, 255, 0)  # Green
@@ -29,59 +45,67 @@ class Visualizer:
             return (0, 255, 255)  # Yellow
         return (0, 0, 255)  # Red - Over limit
         
-    def draw(self, frame, detection, speed):
-        """Draw detection box and speed"""
+    def _sprite(self, text: str, color: tuple) -> np.ndarray:
+        """White text on a solid background, padded as the label box"""
+        key = (text, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            if len(self._sprites) >= SPRITE_CACHE_SIZE:
+                del self._sprites[next(iter(self._sprites))]
+            (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX,
+                                                  self.text_scale, self.thickness)
+            pad = self.padding
+            sprite = np.empty((text_h + 2 * pad + 1, text_w + 2 * pad + 1, 3), dtype=np.uint8)
+            sprite[:] = color
+            cv2.putText(sprite, text, (pad, text_h + pad), cv2.FONT_HERSHEY_SIMPLEX,
+                        self.text_scale, (255, 255, 255), self.thickness)
+            self._sprites[key] = sprite
+        return sprite
+        
+    @staticmethod
+    def _paste(frame, sprite, x: int, y: int):
+        """Copy a sprite with its top-left corner at (x, y), clipped to the frame"""
+        height, width = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite.shape[1], width), min(y + sprite.shape[0], height)
+        if x1 > x0 and y1 > y0:
+            frame[y0:y1, x0:x1] = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+        
+    def draw_all(self, frame, detections, speeds: dict, scale: float = 1.0):
+        """Draw every detection of a frame; ``scale`` maps boxes onto a resized frame"""
+        pad = self.padding
         try:
-            x1, y1, x2, y2 = [int(c) for c in detection.bbox]
-            
-            # Get colors
-            vehicle_color = self.colors.get(detection.class_name.lower(), (0, 255, 0))
-            speed_color = self.get_speed_color(speed, detection.class_name)
-            
-            # Draw box
-            cv2.rectangle(frame, (x1, y1), (x2, y2), vehicle_color, 2)
-            
-            # Prepare text
-            vehicle_type = detection.class_name.lower()
-            default = self.default_limits.get(vehicle_type, 100)
-            speed_limit = config.VEHICLE_SPEED_LIMITS.get(vehicle_type, default)
-            
-            # Prepare text
-            speed_limit = config.VEHICLE_SPEED_LIMITS.get(detection.class_name.lower(), 150)
-            speed_text = f"{speed:.1f} km/h"
-            class_text = f"{detection.class_name}"
-            
-            # Draw background for text
-            text_scale = 0.7
-            thickness = 2
-            padding = 5
-            
-            for i, text in enumerate([class_text, speed_text]):
-                (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, text_scale, thickness)
-                text_y = y1 - 10 - (i * (text_h + padding))
-                
-                # Background rectangle
-                cv2.rectangle(
-                    frame,
-                    (x1, text_y - text_h - padding),
-                    (x1 + text_w + padding * 2, text_y + padding),
-                    vehicle_color if i == 0 else speed_color,
-                    -1
-                )
-                
-                # Text
-                cv2.putText(
-                    frame,
-                    text,
-                    (x1 + padding, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    text_scale,
-                    (255, 255, 255),
-                    thickness
-                )
+            for det in detections:
+                speed = speeds.get(det.track_id, 0.0)
+                x1, y1, x2, y2 = [int(c * scale) for c in det.bbox]
+                # Keys are capitalised, so as before every box falls back to green
+                vehicle_color = self.colors.get(det.class_name.lower(), (0, 255, 0))
+                speed_color = self.get_speed_color(speed, det.class_name)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), vehicle_color, 2)
                 
+                # Class name, with the speed stacked above it
+                labels = ((det.class_name, vehicle_color), (f"{speed:.1f} km/h", speed_color))
+                for i, (text, color) in enumerate(labels):
+                    sprite = self._sprite(text, color)
+                    text_h = sprite.shape[0] - 2 * pad - 1
+                    # Each label steps up by its own height
+                    text_y = y1 - 10 - i * (text_h + pad)
+                    self._paste(frame, sprite, x1, text_y - text_h - pad)
         except Exception as e:
-            print(f"Error drawing detection: {e}")
+            print(f"Error drawing detections: {e}")
+            
+    def draw(self, frame, detection, speed):
+        """Draw detection box and speed"""
+        self.draw_all(frame, [detection], {detection.track_id: speed})
+            
+    def preview(self, frame):
+        """Frame for display, shrunk to preview_width, and the scale applied"""
+        height, width = frame.shape[:2]
+        if not self.preview_width or width <= self.preview_width:
+            return frame, 1.0
+        scale = self.preview_width / float(width)
+        size = (self.preview_width, max(1, int(round(height * scale))))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA), scale
             
     def draw_fps(self, frame, fps):
         """Draw FPS counter"""
@@ -93,4 +117,17 @@ class Visualizer:
             1,
             (0, 255, 0),
             2
-        )
\ No newline at end of file
+        )
+        
+    def draw_metrics(self, frame, lines):
+        """Draw a block of metric lines under the FPS counter"""
+        for i, line in enumerate(lines):
+            cv2.putText(
+                frame,
+                line,
+                (10, 60 + i * 20),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (0, 255, 255),
+                1
+            )
\ No newline at end of file